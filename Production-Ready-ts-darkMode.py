@@ -1,13 +1,34 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from PIL import Image
+from PIL import Image, ImageOps, ImageStat, ImageFilter
+try:
+    import numpy as np
+except ImportError:
+    np = None  # Perceptual metrics are disabled without NumPy
 import os
+import sys
+import io
+import zlib
+import struct
 from pathlib import Path
 import subprocess
 import shutil
+import tempfile
+import signal
 import threading
+import heapq
 from queue import Queue
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 import json
+import re
+import hashlib
+import sqlite3
+import uuid
+import socket
+import argparse
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 import time
 import math
 import ctypes
@@ -15,6 +36,8 @@ from ctypes import wintypes
 
 # --- Constants & Themes ---
 CONFIG_FILE = "optimizer_config.json"
+ENGINE_CACHE_FILE = "engine_cache.json"
+APP_START_TIME = time.perf_counter()
 
 LIGHT_THEME = {
     "bg": "#f4f5f7",
@@ -50,73 +73,1325 @@ DARK_THEME = {
     "terminal_fg": "#00FF00"
 }
 
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp', '.tiff', '.tif'}
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm', '.m4v', '.mpg', '.mpeg', '.3gp', '.ogv', '.ts'}
+
+# --- Memory Budget ---
+# Bytes PIL allocates per decoded pixel (RGB is stored padded to 4 bytes)
+MODE_BYTES_PER_PIXEL = {
+    '1': 1, 'L': 1, 'P': 1, 'LA': 4, 'PA': 4, 'La': 4,
+    'I;16': 2, 'I;16B': 2, 'I;16L': 2,
+    'RGB': 4, 'RGBA': 4, 'RGBa': 4, 'RGBX': 4, 'CMYK': 4,
+    'YCbCr': 4, 'LAB': 4, 'HSV': 4, 'I': 4, 'F': 4
+}
+LARGE_IMAGE_BYTES = 256 * 1024 * 1024   # Above this, an image is treated as "large"
+DEFAULT_MEMORY_FRACTION = 0.5           # Share of physical RAM images may occupy
+IMAGE_BATCH_WORKERS = max(1, min(8, (os.cpu_count() or 2) - 1))
+# Batch files already run in parallel, so each PNG tool gets only its share of the cores
+PNG_TOOL_THREADS = max(1, (os.cpu_count() or 2) // IMAGE_BATCH_WORKERS)
+# Bytes per value of each TIFF field type (BYTE, ASCII, SHORT, LONG, RATIONAL, ... IFD)
+TIFF_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8, 13: 4}
+
+# --- Resource Governor ---
+# All pipelines draw on one pool of CPU cores and hardware encoder sessions
+PIPELINES = ('single', 'images', 'videos')
+PRIORITY_SINGLE = 0     # Interactive single-image jobs go ahead of any batch work
+PRIORITY_IMAGES = 1
+PRIORITY_VIDEOS = 2
+PRIORITY_DELAY = 5.0    # Seconds of queueing each priority level is worth (lower levels age past higher ones)
+CPU_SLOTS = os.cpu_count() or 2
+# A software encode takes most of the cores and leaves the rest to image work running beside it
+VIDEO_ENCODE_THREADS = max(1, CPU_SLOTS * 3 // 4)
+GPU_SLOTS = 1           # Consumer NVENC/QSV/AMF parts allow few sessions; one at a time is safe
+
+# --- Batch Ordering ---
+# Files are started longest-job-first so no large file is left running alone at the end
+VIDEO_MODE_PRESETS = {'fast': 'veryfast', 'balanced': 'medium', 'quality': 'slow', 'maximum': 'slow'}
+# Relative x264 encode time per preset (medium = 1)
+X264_PRESET_COST = {'ultrafast': 0.2, 'superfast': 0.3, 'veryfast': 0.45, 'faster': 0.65, 'fast': 0.8,
+                    'medium': 1.0, 'slow': 1.6, 'slower': 2.6, 'veryslow': 5.0}
+TARGET_SIZE_COST = 1.4      # Two-pass encode: a quick analysis pass plus the full pass
+DOWNSCALE_PIXELS = 1920 * 1080
+SMALL_VIDEO_BYTES = 5 * 1024 * 1024   # "Skip small videos" passes these through untouched
+
+# --- PNG Effort Tiers ---
+# oxipng optimization level, zopfli deflate (also needs "png_zopfli" in the config, it is
+# very slow) and pngquant speed (1 = slowest/best, 11 = fastest)
+PNG_EFFORT_TIERS = {
+    'fast': {'oxipng_level': 1, 'zopfli': False, 'pngquant_speed': 10},
+    'balanced': {'oxipng_level': 3, 'zopfli': False, 'pngquant_speed': 4},
+    'thorough': {'oxipng_level': 4, 'zopfli': False, 'pngquant_speed': 3},
+    'max': {'oxipng_level': 6, 'zopfli': True, 'pngquant_speed': 1},
+}
+
+# --- Animated Images ---
+# Where multi-frame GIF/APNG/WebP files go: 'webp' (animated WebP), 'mp4' / 'webm' (a short
+# clip via ffmpeg; MP4 cannot carry transparency) or 'keep' (same format, frames re-optimized)
+ANIMATED_OUTPUTS = ['webp', 'mp4', 'webm', 'keep']
+ANIMATED_EXTENSIONS = {'.gif', '.png', '.webp'}
+ANIMATED_ENCODERS = {'mp4': 'libx264', 'webm': 'libvpx-vp9'}
+# Profile -> CRF for animation clips (x264 and VP9 use different scales)
+ANIMATED_CRF = {
+    'mp4': {'fast': 26, 'balanced': 28, 'quality': 23, 'maximum': 32, 'auto': 28},
+    'webm': {'fast': 36, 'balanced': 38, 'quality': 32, 'maximum': 42, 'auto': 38},
+}
+# Profile -> size of the one palette shared by every frame of a kept GIF (None = keep palettes)
+GIF_PALETTE_COLORS = {'fast': 256, 'balanced': 128, 'quality': None, 'maximum': 64, 'auto': 128}
+GIF_PALETTE_SAMPLE_FRAMES = 8   # Frames, spread across the animation, the shared palette is built from
+
+# --- Early Exit ---
+SMALL_IMAGE_BYTES = 4 * 1024   # Below this, container overhead dominates and re-encoding rarely helps
+EARLY_EXIT_MIN_GAIN = 0.02     # A file "shrinks" only if it loses at least this share of its size
+PNG_OPTIMIZED_RATIO = 0.98     # IDAT that re-deflates to >= this share is already well compressed
+# Baseline libjpeg luminance table (IJG quality 50) used to estimate a JPEG's quality
+JPEG_STD_LUMINANCE = [
+    16, 11, 10, 16, 24, 40, 51, 61, 12, 12, 14, 19, 26, 58, 60, 55,
+    14, 13, 16, 24, 40, 57, 69, 56, 14, 17, 22, 29, 51, 87, 80, 62,
+    18, 22, 37, 56, 68, 109, 103, 77, 24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101, 72, 92, 95, 98, 112, 100, 103, 99
+]
+
+# --- Metadata Policy ---
+# 'strip' drops everything, 'safe' keeps the colour profile, 'all' also keeps EXIF, XMP
+# and PNG text. Orientation is always baked into the pixels first, whatever the policy.
+METADATA_POLICIES = ['strip', 'safe', 'all']
+EXIF_ORIENTATION = 0x0112
+# EXIF orientation -> jpegtran transform that applies it losslessly
+JPEGTRAN_TRANSFORMS = {2: ['-flip', 'horizontal'], 3: ['-rotate', '180'], 4: ['-flip', 'vertical'],
+                       5: ['-transpose'], 6: ['-rotate', '90'], 7: ['-transverse'], 8: ['-rotate', '270']}
+PNG_METADATA_CHUNKS = {b'tEXt', b'zTXt', b'iTXt', b'eXIf', b'iCCP', b'tIME'}
+XMP_JPEG_HEADER = b'http://ns.adobe.com/xap/1.0/\x00'
+
+# --- Perceptual Metric ---
+SSIM_MAX_SIDE = 512   # Luma plane is downsampled to this before SSIM
+SSIM_WINDOW = 7       # Sliding window size (pixels)
+
+
+def get_total_memory():
+    """Return total physical memory in bytes (0 if it cannot be determined)."""
+    try:
+        if os.name == 'nt':
+            class MEMORYSTATUSEX(ctypes.Structure):
+                _fields_ = [('dwLength', wintypes.DWORD), ('dwMemoryLoad', wintypes.DWORD),
+                            ('ullTotalPhys', ctypes.c_ulonglong), ('ullAvailPhys', ctypes.c_ulonglong),
+                            ('ullTotalPageFile', ctypes.c_ulonglong), ('ullAvailPageFile', ctypes.c_ulonglong),
+                            ('ullTotalVirtual', ctypes.c_ulonglong), ('ullAvailVirtual', ctypes.c_ulonglong),
+                            ('ullAvailExtendedVirtual', ctypes.c_ulonglong)]
+            status = MEMORYSTATUSEX()
+            status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+            ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status))
+            return int(status.ullTotalPhys)
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except Exception:
+        return 0
+
+
+class MemoryBudget:
+    """FIFO admission controller bounding the decoded bytes of images in flight.
+
+    A job larger than the whole budget is still admitted, but only once
+    nothing else is running, so every job can always make progress.
+    """
+
+    def __init__(self, budget_bytes):
+        self.budget = max(int(budget_bytes), 1)
+        self.in_use = 0
+        self._cond = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+
+    def acquire(self, cost):
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            while ticket != self._serving or (self.in_use > 0 and self.in_use + cost > self.budget):
+                self._cond.wait()
+            self.in_use += cost
+            self._serving += 1
+            self._cond.notify_all()
+
+    def release(self, cost):
+        with self._cond:
+            self.in_use = max(0, self.in_use - cost)
+            self._cond.notify_all()
+
+    @contextmanager
+    def reserve(self, cost):
+        self.acquire(cost)
+        try:
+            yield
+        finally:
+            self.release(cost)
+
+
+class ResourceGovernor:
+    """Priority admission for the CPU cores and hardware encoder sessions shared by all pipelines.
+
+    Waiting jobs are served in order of arrival time plus PRIORITY_DELAY per
+    priority level, so a single-image job overtakes queued batch work while a
+    video waiting behind a stream of image files still gets its turn. The head
+    of the queue holds back later jobs until its cores are free; a request
+    larger than the pool is clamped to it.
+    """
+
+    def __init__(self, cpu_slots, gpu_slots):
+        self.cpu_slots = max(1, int(cpu_slots))
+        self.gpu_slots = max(0, int(gpu_slots))
+        self.cpu_used = 0
+        self.gpu_used = 0
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._next_ticket = 0
+
+    def acquire(self, priority, cpu=1, gpu=0):
+        cpu, gpu = min(cpu, self.cpu_slots), min(gpu, self.gpu_slots)
+        with self._cond:
+            entry = (time.monotonic() + priority * PRIORITY_DELAY, self._next_ticket)
+            self._next_ticket += 1
+            heapq.heappush(self._waiting, entry)
+            while (self._waiting[0] != entry or self.cpu_used + cpu > self.cpu_slots
+                   or self.gpu_used + gpu > self.gpu_slots):
+                self._cond.wait()
+            heapq.heappop(self._waiting)
+            self.cpu_used += cpu
+            self.gpu_used += gpu
+            self._cond.notify_all()
+        return cpu, gpu
+
+    def release(self, cpu, gpu):
+        with self._cond:
+            self.cpu_used = max(0, self.cpu_used - cpu)
+            self.gpu_used = max(0, self.gpu_used - gpu)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority, cpu=1, gpu=0):
+        granted = self.acquire(priority, cpu, gpu)
+        try:
+            yield
+        finally:
+            self.release(*granted)
+
+    def status(self):
+        with self._cond:
+            text = f"CPU {self.cpu_used}/{self.cpu_slots}"
+            if self.gpu_slots:
+                text += f" | GPU {self.gpu_used}/{self.gpu_slots}"
+            if self._waiting:
+                text += f" | {len(self._waiting)} queued"
+            return text
+
+
+# --- Watchdog ---
+# Every external tool runs under a deadline scaled from the work it was handed
+TOOL_BASE_TIMEOUT = 60              # Seconds any tool run gets regardless of input size
+IMAGE_SECONDS_PER_MEGAPIXEL = 10    # Allowance per decoded megapixel for image tools
+ZOPFLI_TIMEOUT_FACTOR = 10          # Zopfli deflate is an order of magnitude slower
+VIDEO_TIMEOUT_REALTIME = 20         # Encode allowance in clip durations (at 1080p, medium preset)
+REMUX_BYTES_PER_SECOND = 2 * 1024 * 1024   # Stream copies are disk-bound; this is a slow disk
+STALL_SECONDS = 120                 # ffmpeg whose progress has not moved for this long is hung
+WATCHDOG_POLL_SECONDS = 1.0
+
+
+def kill_process_tree(proc):
+    """Kill a tool started in its own process group, along with everything it spawned."""
+    try:
+        if os.name == 'nt':
+            subprocess.run(['taskkill', '/F', '/T', '/PID', str(proc.pid)], capture_output=True, timeout=30)
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except (OSError, subprocess.SubprocessError):
+        pass
+    try:
+        proc.kill()
+    except OSError:
+        pass
+
+
+# --- File Transfer ---
+FICLONE = 0x40049409  # Linux ioctl: share extents with another file (btrfs, XFS, bcachefs)
+
+
+class TransferStats:
+    """Per-pipeline tally of how passthrough files were placed in the output folder."""
+
+    # Methods that place a file without writing its bytes again
+    ZERO_COPY = ('move', 'reflink', 'link')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.methods = {}
+            self.files = 0
+            self.bytes_total = 0
+            self.bytes_avoided = 0
+            self.seconds = 0.0
+
+    def record(self, method, nbytes, seconds):
+        with self._lock:
+            self.methods[method] = self.methods.get(method, 0) + 1
+            self.files += 1
+            self.bytes_total += nbytes
+            if method in self.ZERO_COPY:
+                self.bytes_avoided += nbytes
+            self.seconds += seconds
+
+    def summary(self, format_bytes):
+        with self._lock:
+            if not self.files:
+                return None
+            methods = ", ".join(f"{k}: {v}" for k, v in self.methods.items())
+            return (f"{self.files} passthrough files ({methods}) in {self.seconds:.2f}s, "
+                    f"{format_bytes(self.bytes_avoided)} of {format_bytes(self.bytes_total)} not rewritten")
+
+
+# --- Audio & Subtitle Planning ---
+# Audio codecs each output container can carry as-is (stream copy)
+AUDIO_COPY_CODECS = {
+    '.mp4': {'aac', 'mp3', 'ac3', 'eac3'},
+    '.m4v': {'aac', 'mp3', 'ac3', 'eac3'},
+    '.mov': {'aac', 'mp3', 'ac3', 'eac3', 'alac'},
+    '.mkv': {'aac', 'mp3', 'ac3', 'eac3', 'opus', 'vorbis'},
+    '.webm': {'opus', 'vorbis'},
+}
+DEFAULT_AUDIO_COPY_CODECS = {'aac', 'mp3'}
+EFFICIENT_AUDIO_CODECS = {'aac', 'opus', 'vorbis', 'mp3'}
+AUDIO_COPY_HEADROOM = 1.15   # Copy a track unless re-encoding would cut its bitrate by more than this
+OPUS_BITRATE_FACTOR = 0.75   # Opus matches AAC quality at roughly three quarters of the bitrate
+TEXT_SUBTITLE_CODECS = {'subrip', 'srt', 'ass', 'ssa', 'mov_text', 'webvtt', 'text'}
+# Subtitle codec to convert text subtitles to per container (None = keep as-is)
+SUBTITLE_TARGETS = {'.mp4': 'mov_text', '.m4v': 'mov_text', '.mov': 'mov_text', '.webm': 'webvtt', '.mkv': None}
+
+# --- Scene Complexity ---
+COMPLEXITY_SAMPLES = 8       # Points across the clip where a frame pair is decoded
+COMPLEXITY_WIDTH = 160       # Sampled frames are downscaled to this width (greyscale)
+SCENE_CUT_DIFF = 30.0        # Mean abs frame difference above this is a cut, not motion
+# Content class -> CRF offset (positive = compress harder)
+COMPLEXITY_CRF_OFFSETS = {'static': 4, 'low': 2, 'medium': 0, 'high': -2}
+
+# --- Streaming Ladder ---
+# 'hls' / 'dash' package each video as a bitrate ladder instead of one compressed file
+STREAMING_OUTPUTS = ['off', 'hls', 'dash']
+LADDER_HEIGHTS = [1080, 720, 480, 360]   # Rung sizes (short side); the top rung never upscales
+LADDER_MIN_STEP = 0.85         # A rung must be this much smaller than the one above it
+LADDER_MAX_RUNGS = 4
+LADDER_SEGMENT_SECONDS = 4     # Also the keyframe interval, so every rung switches on the same frames
+LADDER_DEFAULT_BPP = 0.08      # Top-rung budget (bits per pixel per frame) when the source bitrate is unknown
+LADDER_MAX_BPP = 0.12          # Ceiling for any rung; streaming needs no more than this at CRF quality
+LADDER_BITRATE_EXPONENT = 0.75 # Bitrate grows slower than pixel count
+
+# --- Video Previews ---
+# Poster and seek-preview sprite are extra outputs of the encode itself, so nothing is decoded twice
+POSTER_CANDIDATES = 12          # Shot-change frames considered for the poster, spread over the clip
+POSTER_MIN_SPACING = 2.0        # Seconds between poster candidates
+POSTER_SCENE_THRESHOLD = 0.3    # ffmpeg scene score that counts as a shot change
+POSTER_MAX_SIZE = 1280          # Long side of the poster
+POSTER_LUMA_RANGE = (30, 225)   # Mean brightness outside this is a fade, or a black or white frame
+SPRITE_TILE_SIZE = 160          # Long side of one sprite tile
+SPRITE_COLUMNS = 10
+SPRITE_MAX_TILES = 100
+SPRITE_MIN_INTERVAL = 2.0       # Seconds of video one tile stands for, at least
+PREVIEW_QUALITY = {'poster': 82, 'sprite': 70}
+PREVIEW_FORMATS = ['jpg', 'webp']   # jpg goes through MozJPEG when available
+
+# --- Target Size Mode ---
+CONTAINER_OVERHEAD = 0.02          # Share of the size budget reserved for muxing overhead
+MIN_TARGET_VIDEO_BITRATE = 100000  # Below this (bits/s) a target is not worth attempting
+TARGET_SIZE_PASSES = 3             # Second passes allowed (the analysis pass is run once)
+
+# --- Engine Registry ---
+# Tool name -> arguments that make it print its version
+ENGINE_TOOLS = {
+    'ffmpeg': ['-version'],
+    'ffprobe': ['-version'],
+    'cjpeg': ['-version'],
+    'djpeg': ['-version'],
+    'jpegtran': ['-version'],
+    'oxipng': ['--version'],
+    'pngquant': ['--version'],
+}
+# ffmpeg encoders worth knowing about when picking a pipeline
+FFMPEG_FEATURES = ['h264_nvenc', 'h264_qsv', 'h264_amf', 'hevc_nvenc', 'libx264', 'libx265',
+                   'libvpx-vp9', 'libsvtav1', 'libaom-av1', 'libopus', 'libwebp', 'aac']
+
+
+def get_engine_dir():
+    """The bundled engine folder (next to the EXE when frozen, else next to the script)."""
+    if getattr(sys, 'frozen', False):
+        return Path(sys.executable).parent / "engine"
+    return Path(__file__).parent / "engine"
+
+
+class EngineRegistry:
+    """Resolves external tools and caches their version and supported features.
+
+    Each tool is looked up in the configured paths ("engine_paths" in the
+    config), then the bundled engine folder (with or without .exe), then the
+    system PATH. Probe results are cached on disk keyed by the binary's
+    path, mtime and size, so they are recomputed only when a binary changes.
+    """
+
+    def __init__(self, engine_dir, configured_paths=None, cache_path=ENGINE_CACHE_FILE):
+        self.engine_dir = Path(engine_dir)
+        self.configured_paths = configured_paths or {}
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        try:
+            with open(cache_path, 'r') as f:
+                self.cache = json.load(f)
+        except Exception:
+            self.cache = {}
+        self.paths = {name: self._resolve(name) for name in ENGINE_TOOLS}
+
+    def _resolve(self, name):
+        candidates = []
+        if self.configured_paths.get(name):
+            candidates.append(Path(self.configured_paths[name]))
+        candidates += [self.engine_dir / f"{name}.exe", self.engine_dir / name]
+        for candidate in candidates:
+            if candidate.is_file():
+                return str(candidate)
+        return shutil.which(name)
+
+    def path(self, name):
+        return self.paths.get(name)
+
+    def available(self, name):
+        return self.paths.get(name) is not None
+
+    def fingerprint(self, name):
+        tool_path = self.paths.get(name)
+        if not tool_path:
+            return None
+        try:
+            st = os.stat(tool_path)
+            return f"{tool_path}|{st.st_mtime_ns}|{st.st_size}"
+        except OSError:
+            return None
+
+    def info(self, name):
+        """Cached {'path', 'version', 'features'} for a tool, or None if stale/unprobed."""
+        entry = self.cache.get(name)
+        fingerprint = self.fingerprint(name)
+        if entry and fingerprint and entry.get('fingerprint') == fingerprint:
+            return entry
+        return None
+
+    def version(self, name):
+        entry = self.info(name)
+        return entry['version'] if entry else None
+
+    def has_feature(self, name, feature):
+        entry = self.info(name)
+        return bool(entry) and feature in entry.get('features', [])
+
+    def probe(self, name):
+        """Run a tool once to record its version (and ffmpeg's encoders), then cache it."""
+        tool_path = self.paths.get(name)
+        if not tool_path:
+            return None
+        version, features = "unknown", []
+        try:
+            result = subprocess.run([tool_path] + ENGINE_TOOLS[name], capture_output=True,
+                                    text=True, encoding='utf-8', errors='replace', timeout=10)
+            # Some tools (cjpeg) print their banner on stderr
+            banner = (result.stdout.strip() or result.stderr.strip()).splitlines()
+            if banner:
+                match = re.search(r'\d+(?:\.\d+)+', banner[0])
+                version = match.group(0) if match else banner[0][:60]
+            if name == 'ffmpeg':
+                result = subprocess.run([tool_path, '-hide_banner', '-encoders'], capture_output=True,
+                                        text=True, encoding='utf-8', errors='replace', timeout=10)
+                encoders = {line.split()[1] for line in result.stdout.splitlines() if len(line.split()) > 1}
+                features = [f for f in FFMPEG_FEATURES if f in encoders]
+        except Exception:
+            pass
+
+        entry = {'path': tool_path, 'version': version, 'features': features,
+                 'fingerprint': self.fingerprint(name)}
+        with self._lock:
+            self.cache[name] = entry
+            try:
+                with open(self.cache_path, 'w') as f:
+                    json.dump(self.cache, f, indent=2)
+            except Exception:
+                pass
+        return entry
+
+    def stale_tools(self):
+        return [name for name in ENGINE_TOOLS if self.available(name) and self.info(name) is None]
+
+    def probe_all(self):
+        """Probe every available tool whose cached info is missing or stale."""
+        for name in self.stale_tools():
+            self.probe(name)
+
+
+# --- Watch Mode ---
+WATCH_POLL_SECONDS = 2.0     # Idle cost is one directory listing per poll
+WATCH_SETTLE_SECONDS = 3.0   # Size/mtime must hold still this long before a file is picked up
+
+
+class FolderWatcher:
+    """Polls a folder for new or changed files that have finished being written.
+
+    Processed files are remembered by (size, mtime) in a JSON state file, so a
+    restarted watch only picks up work it has not done yet.
+    """
+
+    def __init__(self, folder, extensions, state_path, settle_seconds=WATCH_SETTLE_SECONDS):
+        self.folder = Path(folder)
+        self.extensions = extensions
+        self.state_path = Path(state_path)
+        self.settle_seconds = settle_seconds
+        self.pending = {}  # path -> (signature, time it was first seen with that signature)
+        try:
+            with open(self.state_path, 'r') as f:
+                self.processed = json.load(f)
+        except Exception:
+            self.processed = {}
+
+    def poll(self):
+        """Return files that are new or changed and have been stable for settle_seconds."""
+        ready = []
+        seen = set()
+        now = time.monotonic()
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if not entry.is_file() or Path(entry.name).suffix.lower() not in self.extensions:
+                    continue
+                key = os.path.abspath(entry.path)
+                st = entry.stat()
+                signature = [st.st_size, st.st_mtime_ns]
+                seen.add(key)
+                if self.processed.get(key) == signature:
+                    continue
+                previous = self.pending.get(key)
+                if previous is None or previous[0] != signature:
+                    self.pending[key] = (signature, now)  # New, or still being written
+                elif now - previous[1] >= self.settle_seconds:
+                    ready.append(Path(entry.path))
+
+        for key in list(self.pending):
+            if key not in seen:
+                del self.pending[key]  # Removed before it settled
+        return ready
+
+    def mark_done(self, paths):
+        """Record files as processed and persist the state atomically."""
+        for path in paths:
+            key = os.path.abspath(path)
+            self.pending.pop(key, None)
+            try:
+                st = os.stat(path)
+                self.processed[key] = [st.st_size, st.st_mtime_ns]
+            except OSError:
+                pass
+        tmp_path = str(self.state_path) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.processed, f)
+        os.replace(tmp_path, self.state_path)
+
+
+# --- Results History ---
+HISTORY_DB_FILE = "shrinkify_history.db"
+HISTORY_REPORTS = ['profiles', 'engines', 'quality', 'slowest', 'failures']
+
+# --- Dry Run ---
+# Estimates use sample encodes from the batch first, then the results history, then these defaults
+DRY_RUN_HISTORY_DAYS = 90
+DRY_RUN_MIN_HISTORY = 5             # Past files needed before a history rate is trusted
+DRY_RUN_SAMPLE_SECONDS = 4          # Length of a video sample encode, cut from mid-clip
+IMAGE_PIXELS_PER_SECOND = 8e6       # Per worker, all engines and SSIM search included
+VIDEO_PIXELS_PER_SECOND = 1920 * 1080 * 40   # Software x264 at 'medium' on VIDEO_ENCODE_THREADS
+
+
+def throughput_rates(rows, min_files=1):
+    """Summarize (source, original, new, seconds, cost) rows per file extension ('*' = all).
+
+    Returns {ext: {'files', 'ratio' (new/original bytes), 'seconds_per_cost' or None}}.
+    """
+    groups = {}
+    for source, original, new, seconds, cost in rows:
+        for key in (Path(source).suffix.lower(), '*'):
+            group = groups.setdefault(key, [0, 0, 0, 0.0, 0.0])
+            group[0] += 1
+            group[1] += original
+            group[2] += new
+            if cost and seconds is not None:
+                group[3] += seconds
+                group[4] += cost
+    return {key: {'files': n, 'ratio': new / original, 'seconds_per_cost': secs / cost if cost else None}
+            for key, (n, original, new, secs, cost) in groups.items() if n >= min_files and original}
+
+
+class ResultsHistory:
+    """SQLite log of every processed file, for reports across runs."""
+
+    FIELDS = ['recorded', 'pipeline', 'source', 'output', 'source_hash', 'profile', 'status', 'engine',
+              'quality', 'crf', 'preset', 'original_size', 'new_size', 'seconds', 'attempts', 'error', 'cost']
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("""CREATE TABLE IF NOT EXISTS files (
+                id INTEGER PRIMARY KEY, recorded REAL, pipeline TEXT, source TEXT, output TEXT,
+                source_hash TEXT, profile TEXT, status TEXT, engine TEXT, quality INTEGER, crf INTEGER,
+                preset TEXT, original_size INTEGER, new_size INTEGER, seconds REAL, attempts INTEGER,
+                error TEXT, cost REAL)""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS files_recorded ON files (recorded)")
+            # Histories written before batch cost was recorded
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(files)")}
+            if 'cost' not in columns:
+                self._db.execute("ALTER TABLE files ADD COLUMN cost REAL")
+
+    def record(self, **fields):
+        fields.setdefault('recorded', time.time())
+        values = [fields.get(name) for name in self.FIELDS]
+        with self._lock, self._db:
+            self._db.execute(f"INSERT INTO files ({', '.join(self.FIELDS)}) "
+                             f"VALUES ({', '.join('?' * len(self.FIELDS))})", values)
+
+    def query(self, sql, params=()):
+        with self._lock:
+            cursor = self._db.execute(sql, params)
+            return [col[0] for col in cursor.description], cursor.fetchall()
+
+    def rates(self, pipeline, profile, days=DRY_RUN_HISTORY_DAYS):
+        """Past size ratio and seconds per unit of batch cost for a profile (see throughput_rates)."""
+        _, rows = self.query("""SELECT source, original_size, new_size, seconds, cost FROM files
+            WHERE pipeline = ? AND profile = ? AND status != 'failed' AND recorded >= ?
+            AND original_size > 0 AND new_size IS NOT NULL""", (pipeline, profile, time.time() - days * 86400))
+        return throughput_rates(rows, DRY_RUN_MIN_HISTORY)
+
+    def report(self, name, days=None, limit=20):
+        """Run one of HISTORY_REPORTS; returns (column names, rows)."""
+        since = time.time() - days * 86400 if days else 0
+        saved = "ROUND(100.0 * (SUM(original_size) - SUM(new_size)) / MAX(SUM(original_size), 1), 1)"
+        if name == 'profiles':
+            return self.query(f"""SELECT pipeline, profile, COUNT(*) AS files, SUM(original_size) AS original,
+                SUM(new_size) AS final, {saved} AS saved_pct, ROUND(AVG(seconds), 2) AS avg_s
+                FROM files WHERE recorded >= ? AND status != 'failed'
+                GROUP BY pipeline, profile ORDER BY pipeline, files DESC""", (since,))
+        if name == 'engines':
+            return self.query(f"""SELECT pipeline, engine, COUNT(*) AS files,
+                ROUND(100.0 * SUM(status = 'compressed') / COUNT(*), 1) AS success_pct,
+                {saved} AS saved_pct, ROUND(AVG(seconds), 2) AS avg_s
+                FROM files WHERE recorded >= ? GROUP BY pipeline, engine ORDER BY pipeline, files DESC""", (since,))
+        if name == 'quality':
+            # Outcome per chosen quality / CRF, to tune the profile tables
+            return self.query(f"""SELECT pipeline, profile, COALESCE(crf, quality) AS quality_or_crf,
+                COUNT(*) AS files, {saved} AS saved_pct, ROUND(AVG(attempts), 2) AS avg_attempts,
+                ROUND(100.0 * SUM(status = 'kept') / COUNT(*), 1) AS kept_pct
+                FROM files WHERE recorded >= ? AND status != 'failed' AND COALESCE(crf, quality) IS NOT NULL
+                GROUP BY pipeline, profile, quality_or_crf ORDER BY pipeline, profile, quality_or_crf""", (since,))
+        if name == 'slowest':
+            return self.query("""SELECT source, pipeline, engine, original_size, ROUND(seconds, 1) AS seconds, attempts
+                FROM files WHERE recorded >= ? ORDER BY seconds DESC LIMIT ?""", (since, limit))
+        if name == 'failures':
+            return self.query("""SELECT datetime(recorded, 'unixepoch', 'localtime') AS time, source, pipeline,
+                engine, error FROM files WHERE recorded >= ? AND status = 'failed'
+                ORDER BY recorded DESC LIMIT ?""", (since, limit))
+        raise ValueError(f"Unknown report '{name}' (choose from {', '.join(HISTORY_REPORTS)})")
+
+
+def print_history_report(history, name, days=None, limit=20):
+    """Print a report from the results history as an aligned text table."""
+    columns, rows = history.report(name, days, limit)
+    cells = [[str(value) if value is not None else '-' for value in row] for row in rows]
+    widths = [max([len(col)] + [len(row[i]) for row in cells]) for i, col in enumerate(columns)]
+    print("  ".join(col.ljust(width) for col, width in zip(columns, widths)))
+    print("  ".join("-" * width for width in widths))
+    for row in cells:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
+    if not rows:
+        print("(no files recorded)")
+
+
+# --- Headless Mode ---
+class SettingVar:
+    """Stand-in for a Tk variable when the engine runs without a window."""
+
+    def __init__(self, value=""):
+        self._value = value
+
+    def get(self):
+        return self._value
+
+    def set(self, value):
+        self._value = value
+
+
+class HeadlessRoot:
+    """Stand-in for the Tk root: UI callbacks scheduled with after() are dropped."""
+
+    def after(self, ms, func=None, *args):
+        return None
+
+    def after_idle(self, func, *args):
+        return None
+
+
+# --- Job Server ---
+JOB_SERVER_HOST = "127.0.0.1"   # Local services only; there is no authentication
+JOB_SERVER_PORT = 8765
+JOB_DB_FILE = "shrinkify_jobs.db"
+JOB_LOG_LINES = 500             # Log lines kept per job
+JOB_POLL_SECONDS = 1.0
+# Settings a job may override, per pipeline (anything else keeps the server's defaults)
+JOB_OPTIONS = {
+    'images': ['dedup_images', 'dedup_similar_images', 'perceptual_target', 'skip_optimal_images',
+               'metadata_policy', 'move_passthrough_images', 'animated_output'],
+    'videos': ['skip_small_videos', 'use_hardware_accel', 'convert_ts_to_mp4', 'keep_all_streams',
+               'downmix_audio', 'prefer_opus_audio', 'use_target_size', 'target_size_mb', 'scene_aware_crf',
+               'unify_extension', 'target_extension', 'dedup_videos', 'move_passthrough_videos',
+               'streaming_output', 'video_previews'],
+}
+JOB_MODES = ['auto', 'fast', 'balanced', 'quality', 'maximum']
+
+
+class JobStore:
+    """SQLite-backed job queue, so queued and finished jobs survive a server restart."""
+
+    COLUMNS = ['id', 'kind', 'source', 'output', 'mode', 'options', 'status', 'progress',
+               'message', 'result', 'log', 'created', 'started', 'finished']
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        with self._connect() as db:
+            db.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY, kind TEXT, source TEXT, output TEXT, mode TEXT, options TEXT,
+                status TEXT, progress REAL, message TEXT, result TEXT, log TEXT,
+                created REAL, started REAL, finished REAL)""")
+            # Jobs cut off by a crash or restart run again from the start
+            db.execute("UPDATE jobs SET status = 'queued', progress = 0, started = NULL WHERE status = 'running'")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _row(self, row):
+        if row is None:
+            return None
+        job = dict(zip(self.COLUMNS, row))
+        job['options'] = json.loads(job['options'] or '{}')
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def add(self, kind, source, output, mode, options):
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock, self._connect() as db:
+            db.execute("INSERT INTO jobs (id, kind, source, output, mode, options, status, progress, message, created) "
+                       "VALUES (?, ?, ?, ?, ?, ?, 'queued', 0, 'Queued', ?)",
+                       (job_id, kind, source, output, mode, json.dumps(options), time.time()))
+        return job_id
+
+    def claim(self, kind):
+        """Mark the oldest queued job of a pipeline as running and return it (None if there is none)."""
+        with self._lock, self._connect() as db:
+            row = db.execute(f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE kind = ? AND status = 'queued' "
+                             "ORDER BY created LIMIT 1", (kind,)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE jobs SET status = 'running', message = 'Starting', started = ? WHERE id = ?",
+                       (time.time(), row[0]))
+        return self._row(row)
+
+    def update(self, job_id, **fields):
+        if 'result' in fields:
+            fields['result'] = json.dumps(fields['result'])
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._connect() as db:
+            db.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", list(fields.values()) + [job_id])
+
+    def get(self, job_id):
+        with self._connect() as db:
+            return self._row(db.execute(f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?",
+                                        (job_id,)).fetchone())
+
+    def list(self, limit=100):
+        with self._connect() as db:
+            rows = db.execute(f"SELECT {', '.join(self.COLUMNS)} FROM jobs ORDER BY created DESC LIMIT ?",
+                              (limit,)).fetchall()
+        return [self._row(row) for row in rows]
+
+    def cancel_queued(self, job_id):
+        """Cancel a job that has not started; returns False if it is not queued."""
+        with self._lock, self._connect() as db:
+            cursor = db.execute("UPDATE jobs SET status = 'cancelled', message = 'Cancelled', finished = ? "
+                                "WHERE id = ? AND status = 'queued'", (time.time(), job_id))
+            return cursor.rowcount > 0
+
+    def counts(self):
+        with self._connect() as db:
+            return dict(db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+class JobServer:
+    """Runs submitted jobs on one warm headless engine: one worker per pipeline.
+
+    Image and video jobs run side by side under the engine's resource governor;
+    jobs of the same pipeline run one after another, since a job's settings are
+    applied to the shared engine for as long as it runs.
+    """
+
+    def __init__(self, app, db_path=JOB_DB_FILE):
+        self.app = app
+        self.store = JobStore(db_path)
+        self.wake = threading.Event()
+        self.running = {}   # pipeline -> (job id, cancel event, log lines)
+        self._lock = threading.Lock()
+        self.defaults = {name: getattr(app, name).get() for names in JOB_OPTIONS.values() for name in names}
+
+    def start_workers(self):
+        for kind in JOB_OPTIONS:
+            threading.Thread(target=self._worker, args=(kind,), daemon=True).start()
+
+    def submit(self, request):
+        """Validate a job request (dict from the API) and queue it; returns (job id, error)."""
+        source = request.get('source')
+        output = request.get('output')
+        if not source or not os.path.exists(source):
+            return None, "'source' must be an existing file or folder"
+        if not output:
+            return None, "'output' folder is required"
+        source, output = os.path.abspath(source), os.path.abspath(output)
+        source_dir = source if os.path.isdir(source) else os.path.dirname(source)
+        if Path(source_dir).resolve() == Path(output).resolve():
+            return None, "'output' must differ from the source folder"
+
+        kind = request.get('type')
+        if kind is None and os.path.isfile(source):
+            suffix = Path(source).suffix.lower()
+            kind = 'images' if suffix in IMAGE_EXTENSIONS else 'videos' if suffix in VIDEO_EXTENSIONS else None
+        if kind not in JOB_OPTIONS:
+            return None, "'type' must be 'images' or 'videos'"
+        mode = request.get('mode', 'auto')
+        if mode not in JOB_MODES:
+            return None, f"'mode' must be one of {', '.join(JOB_MODES)}"
+        options = request.get('options') or {}
+        if not isinstance(options, dict):
+            return None, "'options' must be an object"
+        unknown = [name for name in options if name not in JOB_OPTIONS[kind]]
+        if unknown:
+            return None, f"Unknown {kind} options: {', '.join(unknown)}"
+        choices = {'metadata_policy': METADATA_POLICIES, 'animated_output': ANIMATED_OUTPUTS,
+                   'streaming_output': STREAMING_OUTPUTS, 'target_extension': sorted(VIDEO_EXTENSIONS)}
+        for name, value in options.items():
+            if name in choices:
+                if value not in choices[name]:
+                    return None, f"'{name}' must be one of {', '.join(choices[name])}"
+            elif name == 'target_size_mb':
+                # bool is an int subclass, so `true` would otherwise pass as 1 MB
+                if (isinstance(value, bool) or not isinstance(value, (int, float))
+                        or not math.isfinite(value) or value <= 0):
+                    return None, "'target_size_mb' must be a positive number"
+            elif not isinstance(value, bool):
+                return None, f"'{name}' must be true or false"
+
+        job_id = self.store.add(kind, source, output, mode, options)
+        self.wake.set()
+        return job_id, None
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; returns its status afterwards (None if unknown)."""
+        if self.store.cancel_queued(job_id):
+            return 'cancelled'
+        with self._lock:
+            for running_id, cancel, _ in self.running.values():
+                if running_id == job_id:
+                    cancel.set()
+                    return 'cancelling'
+        job = self.store.get(job_id)
+        return job['status'] if job else None
+
+    def job_log(self, job_id):
+        with self._lock:
+            for running_id, _, lines in self.running.values():
+                if running_id == job_id:
+                    return list(lines)
+        job = self.store.get(job_id)
+        return job['log'].splitlines() if job and job['log'] else []
+
+    def health(self):
+        return {'status': 'ok', 'jobs': self.store.counts(),
+                'engines': {name: self.app.engines.available(name) for name in ENGINE_TOOLS},
+                'hardware_encoder': self.app.hw_accel_type, 'resources': self.app.governor.status(),
+                'pipelines': {kind: self.app.pipeline_status[kind] for kind in JOB_OPTIONS}}
+
+    def _worker(self, kind):
+        while True:
+            job = self.store.claim(kind)
+            if job is None:
+                self.wake.wait(JOB_POLL_SECONDS)
+                self.wake.clear()
+                continue
+            self._run_job(job)
+
+    def _run_job(self, job):
+        kind, job_id = job['kind'], job['id']
+        cancel = threading.Event()
+        lines = deque(maxlen=JOB_LOG_LINES)
+        with self._lock:
+            self.running[kind] = (job_id, cancel, lines)
+
+        def on_status(text, fraction):
+            fields = {'message': text}
+            if fraction is not None:
+                fields['progress'] = round(fraction, 4)
+            self.store.update(job_id, **fields)
+
+        for name in JOB_OPTIONS[kind]:
+            getattr(self.app, name).set(job['options'].get(name, self.defaults[name]))
+        self.app.log_sinks[kind] = lines.append
+        self.app.status_sinks[kind] = on_status
+        self.app._tool_cancel.event = cancel
+        self.app.busy[kind] = True
+        status, message, result = 'failed', '', None
+        try:
+            source, out_dir = Path(job['source']), Path(job['output'])
+            extensions = IMAGE_EXTENSIONS if kind == 'images' else VIDEO_EXTENSIONS
+            if source.is_dir():
+                files = [f for f in source.iterdir() if f.is_file() and f.suffix.lower() in extensions]
+            else:
+                files = [source]
+            out_dir.mkdir(parents=True, exist_ok=True)
+
+            if kind == 'images':
+                self.app.image_transfers.reset()
+                batch = self.app.run_image_batch(files, out_dir, job['mode'], cancel)
+            else:
+                batch = self.app.run_video_batch(files, out_dir, job['mode'], cancel)
+            result = {key: batch[key] for key in ('total_orig', 'total_new', 'compressed', 'failed')}
+            result['skipped'] = batch.get('skipped', 0)
+            result['duplicates'] = batch['dedup'][0]
+            result['outputs'] = {str(src): str(dst) for src, dst in batch['outputs'].items()}
+            saved = batch['total_orig'] - batch['total_new']
+            status = 'cancelled' if cancel.is_set() else 'done'
+            message = f"{len(files)} files, saved {self.app.format_bytes(saved)}"
+        except Exception as e:
+            lines.append(f"[FATAL] {e}")
+            message = str(e)
+        finally:
+            self.app.busy[kind] = False
+            self.app.log_sinks[kind] = None
+            self.app.status_sinks[kind] = None
+            self.app._tool_cancel.event = None
+            self.app.set_pipeline_status(kind, "idle")
+            with self._lock:
+                self.running.pop(kind, None)
+            fields = {'progress': 1.0} if status == 'done' else {}
+            self.store.update(job_id, status=status, message=message, result=result,
+                              log="\n".join(lines), finished=time.time(), **fields)
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """JSON API: POST /jobs, GET /jobs, GET /jobs/<id>, GET /jobs/<id>/log,
+    GET /jobs/<id>/result, POST /jobs/<id>/cancel (or DELETE /jobs/<id>), GET /health."""
+
+    server_version = "Shrinkify"
+
+    def _send(self, code, payload):
+        body = json.dumps(payload, indent=2).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _parts(self):
+        return [part for part in self.path.split('?')[0].split('/') if part]
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        jobs = self.server.jobs
+        parts = self._parts()
+        if parts == ['health']:
+            return self._send(200, jobs.health())
+        if parts == ['jobs']:
+            listed = [{key: job[key] for key in ('id', 'kind', 'source', 'status', 'progress', 'message', 'created')}
+                      for job in jobs.store.list()]
+            return self._send(200, listed)
+        if len(parts) in (2, 3) and parts[0] == 'jobs':
+            job = jobs.store.get(parts[1])
+            if job is None:
+                return self._send(404, {'error': 'unknown job'})
+            if len(parts) == 2:
+                job.pop('log')
+                return self._send(200, job)
+            if parts[2] == 'log':
+                return self._send(200, {'id': job['id'], 'log': jobs.job_log(job['id'])})
+            if parts[2] == 'result':
+                if job['status'] in ('queued', 'running'):
+                    return self._send(409, {'error': f"job is {job['status']}"})
+                return self._send(200, {'id': job['id'], 'status': job['status'], 'result': job['result']})
+        self._send(404, {'error': 'not found'})
+
+    def do_POST(self):
+        jobs = self.server.jobs
+        parts = self._parts()
+        if parts == ['jobs']:
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length) or b'{}')
+            except (ValueError, json.JSONDecodeError):
+                return self._send(400, {'error': 'body must be JSON'})
+            if not isinstance(request, dict):
+                return self._send(400, {'error': 'body must be a JSON object'})
+            job_id, error = jobs.submit(request)
+            if error:
+                return self._send(400, {'error': error})
+            return self._send(201, {'id': job_id, 'status': 'queued'})
+        if len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'cancel':
+            return self._cancel(parts[1])
+        self._send(404, {'error': 'not found'})
+
+    def do_DELETE(self):
+        parts = self._parts()
+        if len(parts) == 2 and parts[0] == 'jobs':
+            return self._cancel(parts[1])
+        self._send(404, {'error': 'not found'})
+
+    def _cancel(self, job_id):
+        status = self.server.jobs.cancel(job_id)
+        if status is None:
+            return self._send(404, {'error': 'unknown job'})
+        self._send(200, {'id': job_id, 'status': status})
+
+
+def run_job_server(host=JOB_SERVER_HOST, port=JOB_SERVER_PORT, db_path=JOB_DB_FILE):
+    """Serve the job API until interrupted, on one headless engine that stays loaded."""
+    app = EnterpriseMediaOptimizer()
+    jobs = JobServer(app, db_path)
+    jobs.start_workers()
+    httpd = ThreadingHTTPServer((host, port), JobRequestHandler)
+    httpd.daemon_threads = True
+    httpd.jobs = jobs
+    print(f"[SERVER] Shrinkify job server on http://{host}:{httpd.server_address[1]}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+# --- Distributed Batches ---
+SHARD_DIR_NAME = ".shrinkify_shard"   # Lease, done and result files, kept in the shared output folder
+SHARD_HEARTBEAT_SECONDS = 15
+SHARD_LEASE_TIMEOUT = 120             # A lease not renewed for this long belongs to a dead or hung worker
+SHARD_RESCAN_SECONDS = 10             # Wait between scans while other workers still hold the last files
+
+
+class ShardWorker:
+    """One of several processes (or machines) working through the same input folder.
+
+    Files are claimed with lease files created exclusively (O_EXCL) in the shared
+    state folder. The holder renews its leases by touching them every heartbeat;
+    a lease left untouched for SHARD_LEASE_TIMEOUT is taken over by the first
+    worker to rename it aside. Finished files get a done marker, and every
+    worker appends its own results to results-<worker>.jsonl. Worker clocks are
+    assumed to agree to well within the lease timeout.
+    """
+
+    def __init__(self, app, input_dir, output_dir, kind, mode, worker_id=None):
+        self.app = app
+        self.input_dir = Path(input_dir)
+        self.output_dir = Path(output_dir)
+        self.kind = kind
+        self.mode = mode
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.state_dir = self.output_dir / SHARD_DIR_NAME
+        self.results_path = self.state_dir / f"results-{self.worker_id}.jsonl"
+        self.log = app.log_to_image_terminal if kind == 'images' else app.log_to_video_terminal
+        self.held = set()
+        self.counts = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _marker(self, path, suffix):
+        return self.state_dir / (hashlib.sha1(path.name.encode('utf-8')).hexdigest()[:20] + suffix)
+
+    def claim(self, path):
+        """Try to take the lease on a file; returns True if this worker now holds it."""
+        if self._marker(path, '.done').exists():
+            return False
+        lease = self._marker(path, '.lease')
+        try:
+            age = time.time() - lease.stat().st_mtime
+        except FileNotFoundError:
+            age = None
+        if age is not None:
+            if age < SHARD_LEASE_TIMEOUT:
+                return False
+            # Expired: only one worker's rename of it can succeed
+            moved = Path(f"{lease}.expired-{self.worker_id}")
+            try:
+                os.rename(lease, moved)
+            except OSError:
+                return False
+            if time.time() - moved.stat().st_mtime < SHARD_LEASE_TIMEOUT:
+                # Lost a race: another worker had just renewed or re-taken it, so put it back
+                try: os.link(moved, lease)
+                except OSError: pass
+                moved.unlink()
+                return False
+            moved.unlink()
+            self.log(f"[SHARD] Reclaiming {path.name} from a worker that stopped renewing its lease")
+        try:
+            fd = os.open(lease, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'worker': self.worker_id, 'file': path.name, 'claimed': time.time()}, f)
+        if self._marker(path, '.done').exists():
+            # Finished by its previous holder between our check and the claim
+            lease.unlink()
+            return False
+        with self._lock:
+            self.held.add(path)
+        return True
+
+    def _heartbeat(self):
+        while not self._stop.wait(SHARD_HEARTBEAT_SECONDS):
+            with self._lock:
+                held = list(self.held)
+            for path in held:
+                try:
+                    os.utime(self._marker(path, '.lease'))
+                except OSError:
+                    pass
+
+    def finish(self, path, record):
+        """Write the file's done marker and result line, then drop its lease."""
+        done = self._marker(path, '.done')
+        tmp_path = f"{done}.{self.worker_id}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(record, f)
+        os.replace(tmp_path, done)
+        with self._lock:
+            with open(self.results_path, 'a') as f:
+                f.write(json.dumps(record) + "\n")
+            self.counts[record['status']] = self.counts.get(record['status'], 0) + 1
+            self.held.discard(path)
+        try:
+            self._marker(path, '.lease').unlink()
+        except OSError:
+            pass
+
+    def process(self, path, idx, total):
+        record = {'file': path.name, 'worker': self.worker_id, 'status': 'failed',
+                  'original_size': os.path.getsize(path), 'new_size': None, 'output': None,
+                  'started': time.time()}
+        try:
+            if self.kind == 'images':
+                _, result = self.app._compress_image_file(path, self.output_dir, self.mode, idx, total)
+                if isinstance(result, dict):
+                    record.update(status='compressed', new_size=result['new_size'],
+                                  method=result['method'], output=str(result['output_path']))
+                elif result is None:
+                    record.update(status='kept', new_size=record['original_size'],
+                                  output=str(self.output_dir / path.name))
+            else:
+                self.log(f"\n[VIDEO] Processing [{idx + 1}/{total}]: {path.name}")
+                result = self.app.process_video_file(path, self.output_dir, self.temp_folder, self.mode)
+                record.update(status=result['status'], new_size=result['final_size'] or None,
+                              output=str(result['output_path']) if result['output_path'] else None)
+        except Exception as e:
+            self.log(f"[ERR] {path.name}: {e}")
+        record['finished'] = time.time()
+        self.finish(path, record)
+
+    def _claim_loop(self, files):
+        while not self._stop.is_set():
+            pending = False
+            for idx, path in enumerate(files):
+                if self._marker(path, '.done').exists():
+                    continue
+                pending = True
+                if self.claim(path):
+                    self.process(path, idx, len(files))
+                    break  # Rescan from the top so the largest unclaimed file goes next
+            else:
+                if not pending:
+                    return
+                # Everything left is leased by other workers: wait for them to finish or stall
+                time.sleep(SHARD_RESCAN_SECONDS)
+
+    def run(self):
+        """Work until every file in the input folder has a done marker; returns this worker's counts."""
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self.temp_folder = self.output_dir / f"_temp_work_{self.worker_id}"
+        if self.kind == 'videos':
+            self.temp_folder.mkdir(exist_ok=True)
+            estimate = lambda f: self.app.estimate_video_cost(f, self.mode)
+        else:
+            estimate = self.app.estimate_image_cost
+        extensions = IMAGE_EXTENSIONS if self.kind == 'images' else VIDEO_EXTENSIONS
+        files = [f for f in self.input_dir.iterdir() if f.is_file() and f.suffix.lower() in extensions]
+        # Every worker walks the same largest-first order
+        files, _ = self.app.plan_by_cost(files, estimate)
+        self.log(f"[SHARD] Worker {self.worker_id}: {len(files)} {self.kind} in {self.input_dir}")
+
+        heartbeat = threading.Thread(target=self._heartbeat, daemon=True)
+        heartbeat.start()
+        lanes = IMAGE_BATCH_WORKERS if self.kind == 'images' else 1
+        try:
+            with ThreadPoolExecutor(max_workers=lanes) as pool:
+                for future in [pool.submit(self._claim_loop, files) for _ in range(lanes)]:
+                    future.result()
+        finally:
+            self._stop.set()
+            if self.kind == 'videos':
+                try: self.temp_folder.rmdir()
+                except OSError: pass
+
+        summary = ", ".join(f"{count} {status}" for status, count in sorted(self.counts.items())) or "nothing left to claim"
+        self.log(f"[SHARD] Worker {self.worker_id} finished: {summary}")
+        return self.counts
+
+
 class EnterpriseMediaOptimizer:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("Shrinkify")
-        self.root.geometry("1280x900")
+    def __init__(self, root=None):
+        # Without a root the engine runs headless (job-server mode): settings live in
+        # SettingVars and UI callbacks are dropped
+        self.headless = root is None
+        self.root = HeadlessRoot() if self.headless else root
+        if self.headless:
+            StringVar, IntVar, BooleanVar = SettingVar, SettingVar, SettingVar
+        else:
+            StringVar, IntVar, BooleanVar = tk.StringVar, tk.IntVar, tk.BooleanVar
+            self.root.title("Shrinkify")
+            self.root.geometry("1280x900")
         
         # --- Theme State ---
         self.config = self.load_config()
         self.is_dark_mode = self.config.get("dark_mode", False)
         self.theme = DARK_THEME if self.is_dark_mode else LIGHT_THEME
         
-        self.root.configure(bg=self.theme["bg"])
+        if not self.headless:
+            self.root.configure(bg=self.theme["bg"])
 
-        # --- Styles ---
-        self.style = ttk.Style()
-        self.style.theme_use('clam')
-        self.update_styles()
+            # --- Styles ---
+            self.style = ttk.Style()
+            self.style.theme_use('clam')
+            self.update_styles()
 
         # --- Variables: Image ---
-        self.single_image_path = tk.StringVar()
-        self.single_output_folder = tk.StringVar()
-        self.single_quality = tk.IntVar(value=85)
-
-        self.batch_input_folder = tk.StringVar()
-        self.batch_output_folder = tk.StringVar()
-        self.batch_quality = tk.IntVar(value=85)
-        self.copy_videos_in_image_batch = tk.BooleanVar(value=True)
-        self.image_compression_mode = tk.StringVar(value="auto")
-
-        self.original_size = tk.StringVar(value="N/A")
-        self.compressed_size = tk.StringVar(value="N/A")
-        self.compression_details = tk.StringVar(value="Ready for processing...")
+        self.single_image_path = StringVar()
+        self.single_output_folder = StringVar()
+        self.single_quality = IntVar(value=85)
+
+        self.batch_input_folder = StringVar()
+        self.batch_output_folder = StringVar()
+        self.batch_quality = IntVar(value=85)
+        self.copy_videos_in_image_batch = BooleanVar(value=True)
+        self.move_passthrough_images = BooleanVar(value=False)
+        self.dedup_images = BooleanVar(value=True)
+        self.dedup_similar_images = BooleanVar(value=False)
+        self.image_compression_mode = StringVar(value="auto")
+        self.perceptual_target = BooleanVar(value=False)
+        self.skip_optimal_images = BooleanVar(value=True)
+        self.metadata_policy = StringVar(value=self.config.get("metadata_policy", "safe"))
+        self.animated_output = StringVar(value=self.config.get("animated_output", "webp"))
+
+        self.original_size = StringVar(value="N/A")
+        self.compressed_size = StringVar(value="N/A")
+        self.compression_details = StringVar(value="Ready for processing...")
 
         # --- Variables: Video ---
-        self.video_input_folder = tk.StringVar()
-        self.video_output_folder = tk.StringVar()
-        self.video_compression_mode = tk.StringVar(value="auto")
-        self.skip_small_videos = tk.BooleanVar(value=True)
-        self.use_hardware_accel = tk.BooleanVar(value=True)
-        self.convert_ts_to_mp4 = tk.BooleanVar(value=False)
-        self.unify_extension = tk.BooleanVar(value=False)
-        self.target_extension = tk.StringVar(value=".mp4")
+        self.video_input_folder = StringVar()
+        self.video_output_folder = StringVar()
+        self.video_compression_mode = StringVar(value="auto")
+        self.skip_small_videos = BooleanVar(value=True)
+        self.use_hardware_accel = BooleanVar(value=True)
+        self.convert_ts_to_mp4 = BooleanVar(value=False)
+        self.keep_all_streams = BooleanVar(value=True)
+        self.downmix_audio = BooleanVar(value=False)
+        self.prefer_opus_audio = BooleanVar(value=True)
+        self.use_target_size = BooleanVar(value=False)
+        self.scene_aware_crf = BooleanVar(value=True)
+        self.target_size_mb = StringVar(value=str(self.config.get("target_size_mb", 25)))
+        self.unify_extension = BooleanVar(value=False)
+        self.target_extension = StringVar(value=".mp4")
+        self.dedup_videos = BooleanVar(value=True)
+        self.move_passthrough_videos = BooleanVar(value=False)
+        self.streaming_output = StringVar(value="off")
+        self.video_previews = BooleanVar(value=False)
+        self.preview_format = self.config.get("preview_format", "jpg")
+        if self.preview_format not in PREVIEW_FORMATS:
+            self.preview_format = "jpg"
+        self.image_transfers = TransferStats()
+        self.video_transfers = TransferStats()
 
         # --- System State ---
-        self.is_processing = False
+        # Each pipeline runs one job at a time; all of them share the governor's cores
+        self.busy = dict.fromkeys(PIPELINES, False)
+        self.pipeline_status = dict.fromkeys(PIPELINES, "idle")
+        self.governor = ResourceGovernor(CPU_SLOTS, GPU_SLOTS)
         self.compression_queue = Queue()
-
-        # Engine Configuration (PyInstaller compatible)
-        if getattr(sys, 'frozen', False):
-            # If running as EXE, look next to the EXE
-            base_path = Path(sys.executable).parent
+        self.image_watch_stop = None
+        self.video_watch_stop = None
+        self._log_buffer = threading.local()
+        # Hooks a job server uses to capture each pipeline's log and progress
+        self.log_sinks = dict.fromkeys(PIPELINES)
+        self.status_sinks = dict.fromkeys(PIPELINES)
+        # Per-thread event that makes run_tool kill the tool it is supervising
+        self._tool_cancel = threading.local()
+
+        # Bound the decoded size of images held in memory at once
+        budget_mb = self.config.get("memory_budget_mb")
+        if budget_mb:
+            budget_bytes = int(budget_mb) * 1024 * 1024
         else:
-            # If running as script, look next to the script
-            base_path = Path(__file__).parent
-            
-        self.engine_dir = base_path / "engine"
-        self.has_ffmpeg = self.check_tool_availability('ffmpeg.exe')
-        self.has_ffprobe = self.check_tool_availability('ffprobe.exe')
-        self.has_mozjpeg = self.check_tool_availability('cjpeg.exe')
-        self.has_oxipng = self.check_tool_availability('oxipng.exe')
-        self.has_pngquant = self.check_tool_availability('pngquant.exe')
+            budget_bytes = int(get_total_memory() * DEFAULT_MEMORY_FRACTION) or 2 * 1024 ** 3
+        self.memory_budget = MemoryBudget(budget_bytes)
+        # Verify mode still compresses skippable files, to measure how often the predictor is right
+        self.early_exit_verify = bool(self.config.get("early_exit_verify", False))
+        # Tool runs the watchdog had to kill: tool path, input, reason, runtime
+        self.watchdog_events = []
+        # Every processed file is logged here for the --report analytics
+        try:
+            self.history = ResultsHistory(self.config.get("history_db", HISTORY_DB_FILE))
+        except sqlite3.Error as e:
+            print(f"[WARN] Results history unavailable: {e}")
+            self.history = None
+
+        # Engine Configuration (PyInstaller compatible; falls back to tools on PATH)
+        self.engine_dir = get_engine_dir()
+        self.engines = EngineRegistry(self.engine_dir, self.config.get("engine_paths"))
+        self.has_ffmpeg = self.check_tool_availability('ffmpeg')
+        self.has_ffprobe = self.check_tool_availability('ffprobe')
+        self.has_mozjpeg = self.check_tool_availability('cjpeg')
+        self.has_jpegtran = self.check_tool_availability('jpegtran')
+        self.has_oxipng = self.check_tool_availability('oxipng')
+        self.has_pngquant = self.check_tool_availability('pngquant')
 
         # --- Hardware Acceleration Detection ---
+        # Probing ffmpeg takes seconds, so reuse the cached result while the binary is unchanged
         self.hw_accel_type = self.detect_hardware_acceleration()
+        self.engines_probing = bool(self.engines.stale_tools())
+
+        if self.headless:
+            # No window to keep responsive: probe now so jobs see the real capabilities
+            if self.engines_probing:
+                self.engines.probe_all()
+                self.hw_accel_type = self.detect_hardware_acceleration()
+                self.engines_probing = False
+            return
 
         # --- UI Setup ---
         self.setup_ui()
+        self.root.after_idle(self.report_time_to_interactive)
+        if self.engines_probing:
+            threading.Thread(target=self._probe_engines_worker, daemon=True).start()
         
         # Apply dark title bar if in dark mode on startup
         if self.is_dark_mode:
@@ -137,11 +1412,20 @@ class EnterpriseMediaOptimizer:
 
     def save_config(self):
         try:
+            self.config["dark_mode"] = self.is_dark_mode
             with open(CONFIG_FILE, 'w') as f:
-                json.dump({"dark_mode": self.is_dark_mode}, f)
+                json.dump(self.config, f)
         except:
             pass
 
+    def save_metadata_policy(self):
+        self.config["metadata_policy"] = self.metadata_policy.get()
+        self.save_config()
+
+    def save_animated_output(self):
+        self.config["animated_output"] = self.animated_output.get()
+        self.save_config()
+
     def update_styles(self):
         """Update ttk styles for the current theme."""
         bg = self.theme["bg"]
@@ -296,26 +1580,42 @@ class EnterpriseMediaOptimizer:
     # =========================================================================
 
     def check_tool_availability(self, tool_name):
-        """Check if an external compression tool is available in the local engine folder."""
-        tool_path = self.engine_dir / tool_name
-        return tool_path.exists()
+        """Check if an external compression tool was resolved (engine folder, config or PATH)."""
+        return self.engines.available(tool_name)
+
+    def _probe_engines_worker(self):
+        """Run slow engine probes off the UI thread, then fill in the capabilities."""
+        self.engines.probe_all()
+        self.root.after(0, self.on_engines_probed, self.detect_hardware_acceleration())
+
+    def on_engines_probed(self, hw_accel):
+        self.hw_accel_type = hw_accel
+        self.engines_probing = False
+        self.engine_status_label.config(text=self.engine_status_text())
+        if hw_accel and self.has_ffmpeg:
+            self.hw_accel_check.config(text=f"Enable Hardware Acceleration ({hw_accel.upper()})")
+            self.hw_accel_check.pack(anchor="w", before=self.dedup_videos_check)
+
+    def report_time_to_interactive(self):
+        """Log how long the app took from launch until the main window could take input."""
+        self.time_to_interactive_ms = (time.perf_counter() - APP_START_TIME) * 1000
+        print(f"[STARTUP] Time to interactive: {self.time_to_interactive_ms:.0f} ms")
 
     def detect_hardware_acceleration(self):
-        """Detect available hardware acceleration (NVENC, QSV, AMF)."""
+        """Detect available hardware acceleration (NVENC, QSV, AMF) from the cached ffmpeg probe."""
         if not self.has_ffmpeg:
             return None
-        try:
-            ffmpeg_path = str(self.engine_dir / 'ffmpeg.exe')
-            result = subprocess.run([ffmpeg_path, '-hide_banner', '-encoders'],
-                                    capture_output=True, text=True, encoding='utf-8', timeout=5)
-            output = result.stdout
-            if 'h264_nvenc' in output: return 'nvenc'
-            elif 'h264_qsv' in output: return 'qsv'
-            elif 'h264_amf' in output: return 'amf'
-        except:
-            pass
+        if self.engines.has_feature('ffmpeg', 'h264_nvenc'): return 'nvenc'
+        elif self.engines.has_feature('ffmpeg', 'h264_qsv'): return 'qsv'
+        elif self.engines.has_feature('ffmpeg', 'h264_amf'): return 'amf'
         return None
 
+    def log_engine_versions(self, names, log):
+        """Log which build of each engine a batch runs on (useful when comparing builds)."""
+        for name in names:
+            if self.engines.available(name):
+                log(f"[ENGINE] {name} {self.engines.version(name) or '?'} @ {self.engines.path(name)}")
+
     def format_bytes(self, size):
         """Convert bytes to human readable format."""
         for unit in ['B', 'KB', 'MB', 'GB']:
@@ -323,14 +1623,52 @@ class EnterpriseMediaOptimizer:
             size /= 1024.0
         return f"{size:.2f} TB"
 
+    def format_duration(self, seconds):
+        seconds = int(seconds)
+        if seconds < 60: return f"{seconds}s"
+        if seconds < 3600: return f"{seconds // 60}m {seconds % 60:02d}s"
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+
+    def eta_text(self, start_time, done_cost, total_cost):
+        """Remaining time extrapolated from the share of the batch cost finished so far."""
+        elapsed = time.time() - start_time
+        if done_cost <= 0 or done_cost >= total_cost:
+            return ""
+        return f"ETA {self.format_duration(elapsed * (total_cost - done_cost) / done_cost)}"
+
+    def plan_by_cost(self, files, estimate):
+        """Order files longest-job-first, returning (files, {file: relative cost}).
+
+        estimate(path) gives a cost in any unit or None; unknown files are costed
+        by size at the average cost per byte of the files that could be estimated.
+        """
+        sizes = {f: os.path.getsize(f) for f in files}
+        costs = {f: estimate(f) for f in files}
+        known = [f for f in files if costs[f]]
+        known_bytes = sum(sizes[f] for f in known)
+        per_byte = sum(costs[f] for f in known) / known_bytes if known_bytes else 1.0
+        for f in files:
+            if costs[f] is None:
+                costs[f] = sizes[f] * per_byte
+        return sorted(files, key=lambda f: costs[f], reverse=True), costs
+
     def log_to_video_terminal(self, message):
         """Thread-safe logging to the video terminal."""
+        if self.log_sinks['videos']:
+            self.log_sinks['videos'](message)
         self.root.after(0, lambda: self.video_stats_text.insert(tk.END, message + "\n"))
         self.root.after(0, lambda: self.video_stats_text.see(tk.END))
         print(message)
 
     def log_to_image_terminal(self, message):
         """Thread-safe logging to the image terminal."""
+        # Parallel batch workers buffer their lines so each file's log stays together
+        buffered = getattr(self._log_buffer, 'lines', None)
+        if buffered is not None:
+            buffered.append(message)
+            return
+        if self.log_sinks['images']:
+            self.log_sinks['images'](message)
         self.root.after(0, lambda: self.image_stats_text.insert(tk.END, message + "\n"))
         self.root.after(0, lambda: self.image_stats_text.see(tk.END))
         print(message)
@@ -338,11 +1676,18 @@ class EnterpriseMediaOptimizer:
     def analyze_image(self, image_path):
         """Analyze image to determine optimal compression strategy."""
         try:
-            img = Image.open(image_path)
+            # Only the header is read here; pixels are decoded later under the memory budget
+            with Image.open(image_path) as img:
+                width, height = img.size
+                mode = img.mode
+                format_type = img.format or Path(image_path).suffix.lower().replace('.', '').upper()
+                frames = getattr(img, 'n_frames', 1)
+                is_animated = getattr(img, 'is_animated', False)
+                tiff_compression = img.info.get('compression') if format_type == 'TIFF' else None
+                jpeg_quality = self.estimate_jpeg_quality(img) if format_type == 'JPEG' else None
+                progressive = bool(img.info.get('progressive') or img.info.get('progression'))
+                source_meta = self.read_image_metadata(img)
             file_size = os.path.getsize(image_path)
-            width, height = img.size
-            mode = img.mode
-            format_type = img.format or Path(image_path).suffix.lower().replace('.', '').upper()
             
             # Calculate image complexity (simple heuristic based on file size vs dimensions)
             pixels = width * height
@@ -355,7 +1700,7 @@ class EnterpriseMediaOptimizer:
                 complexity = "medium"
             else:
                 complexity = "low"
-            
+
             return {
                 'width': width,
                 'height': height,
@@ -364,20 +1709,176 @@ class EnterpriseMediaOptimizer:
                 'format': format_type,
                 'file_size': file_size,
                 'bytes_per_pixel': bytes_per_pixel,
-                'complexity': complexity
+                'complexity': complexity,
+                'frames': frames,
+                'is_animated': is_animated,
+                'tiff_compression': tiff_compression,
+                'jpeg_quality': jpeg_quality,
+                'progressive': progressive,
+                'orientation': source_meta['orientation'],
+                'source_meta': source_meta,
+                'memory_cost': self.estimate_decoded_size(width, height, mode, is_animated)
             }
         except Exception as e:
             return None
 
-    def get_profile_settings(self, mode, complexity="medium"):
-        """Get compression settings based on profile and image complexity."""
-        # Profile definitions: (target_reduction%, quality_floor, quality_ceiling)
+    def estimate_jpeg_quality(self, img):
+        """Estimate the IJG quality a JPEG was saved at from its luminance quantization table."""
+        tables = getattr(img, 'quantization', None)
+        if not tables or 0 not in tables or len(tables[0]) != 64:
+            return None
+        # Sums are order-independent, so zigzag vs natural table order does not matter
+        scale = sum(tables[0]) * 100 / sum(JPEG_STD_LUMINANCE)
+        quality = (200 - scale) / 2 if scale <= 100 else 5000 / scale
+        return max(1, min(100, round(quality)))
+
+    def jpeg_dropped_bytes(self, image_path):
+        """Bytes of APPn/COM segments every metadata policy drops (None if unreadable).
+
+        Reads the headers up to the first scan only; JFIF, EXIF, XMP, ICC and Adobe are not counted.
+        """
+        kept = (b'JFIF', b'Exif\x00\x00', XMP_JPEG_HEADER, b'ICC_PROFILE\x00', b'Adobe')
+        try:
+            dropped = 0
+            with open(image_path, 'rb') as f:
+                if f.read(2) != b'\xff\xd8':
+                    return None
+                while True:
+                    header = f.read(4)
+                    if len(header) < 4 or header[0] != 0xFF or header[1] == 0xDA:
+                        break
+                    length = struct.unpack('>H', header[2:])[0]
+                    body = f.read(length - 2)
+                    if (0xE0 <= header[1] <= 0xEF or header[1] == 0xFE) and not body.startswith(kept):
+                        dropped += length + 2
+            return dropped
+        except OSError:
+            return None
+
+    def png_recompress_ratio(self, image_path):
+        """Re-deflate a PNG's IDAT at maximum level and return new/old size (None if unreadable).
+
+        Streams the image data, so memory stays flat; far cheaper than a full optimizer run.
+        """
+        try:
+            inflate = zlib.decompressobj()
+            deflate = zlib.compressobj(9, zlib.DEFLATED, 15, 9)
+            idat_size, redeflated = 0, 0
+            with open(image_path, 'rb') as f:
+                if f.read(8) != b'\x89PNG\r\n\x1a\n':
+                    return None
+                while True:
+                    header = f.read(8)
+                    if len(header) < 8:
+                        break
+                    length, chunk_type = struct.unpack('>I4s', header)
+                    if chunk_type == b'IDAT':
+                        data = f.read(length)
+                        idat_size += length
+                        redeflated += len(deflate.compress(inflate.decompress(data)))
+                        f.seek(4, 1)
+                    elif chunk_type == b'IEND':
+                        break
+                    else:
+                        f.seek(length + 4, 1)
+            redeflated += len(deflate.flush())
+            return redeflated / idat_size if idat_size else None
+        except Exception:
+            return None
+
+    def predict_no_gain(self, input_path, metadata, mode):
+        """Cheap pre-check for files that almost certainly will not shrink.
+
+        Returns the reason to skip, or None when the file is worth compressing.
+        A skipped file is copied as is, so files carrying metadata the policy
+        drops are never skipped.
+        """
+        if self.policy_drops_metadata(metadata['source_meta']):
+            return None
+        if metadata['file_size'] < SMALL_IMAGE_BYTES:
+            return f"Under {self.format_bytes(SMALL_IMAGE_BYTES)}; nothing worth re-encoding"
+        if metadata['is_animated']:
+            return None
+
+        if metadata['format'] == 'JPEG' and metadata['jpeg_quality'] is not None:
+            # Re-encoding at or above the source quality cannot drop information,
+            # and a progressive file has already had its entropy coding optimized
+            # (unless jpegtran would still drop enough non-image segments to count as a gain)
+            floor = self.get_profile_settings(mode, metadata['complexity'])['floor']
+            if metadata['jpeg_quality'] <= floor and metadata['progressive']:
+                extra = self.jpeg_dropped_bytes(input_path)
+                if extra is not None and extra < metadata['file_size'] * EARLY_EXIT_MIN_GAIN:
+                    return f"JPEG already at ~Q{metadata['jpeg_quality']} (profile floor {floor}), progressive"
+
+        elif metadata['format'] == 'PNG' and metadata['mode'] in ('1', 'L', 'P'):
+            # Indexed/greyscale leaves quantization nothing to do; only deflate could still gain
+            ratio = self.png_recompress_ratio(input_path)
+            if ratio is not None and ratio >= PNG_OPTIMIZED_RATIO:
+                return f"Indexed PNG already well compressed (re-deflate {ratio*100:.0f}%)"
+
+        return None
+
+    def analyze_content(self, img, max_side=256):
+        """Cheap content features from a thumbnail: edges, colours, alpha, noise and class."""
+        if np is None:
+            return None
+        try:
+            scale = min(1.0, max_side / max(img.size))
+            size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+            # Nearest-neighbour keeps a graphic's exact palette instead of blending new colours
+            rgba = np.asarray(img.resize(size, Image.NEAREST).convert('RGBA'), dtype=np.int32)
+            rgb, alpha = rgba[..., :3], rgba[..., 3]
+            height, width = alpha.shape
+
+            colors = int(np.unique((rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]).size)
+            alpha_usage = float((alpha < 255).mean())
+            luma = rgb @ np.array([0.299, 0.587, 0.114])
+
+            edge_density = 0.0
+            noise = 0.0
+            if width > 2 and height > 2:
+                grad = np.abs(np.diff(luma, axis=1))[:-1, :] + np.abs(np.diff(luma, axis=0))[:, :-1]
+                edge_density = float((grad > 32).mean())
+                # Immerkaer noise estimate: Laplacian-difference kernel response
+                lap = (luma[:-2, :-2] - 2 * luma[:-2, 1:-1] + luma[:-2, 2:]
+                       - 2 * luma[1:-1, :-2] + 4 * luma[1:-1, 1:-1] - 2 * luma[1:-1, 2:]
+                       + luma[2:, :-2] - 2 * luma[2:, 1:-1] + luma[2:, 2:])
+                noise = float(math.sqrt(math.pi / 2) * np.abs(lap).sum() / (6 * (width - 2) * (height - 2)))
+
+            if colors <= 256 and noise < 2:
+                content_class = 'flat'
+            elif colors < luma.size * 0.1:
+                content_class = 'graphic'  # Limited palette with antialiasing: UI, charts, text
+            else:
+                content_class = 'photo'
+
+            if edge_density > 0.2 or noise > 6:
+                complexity = 'high'
+            elif edge_density < 0.05 and noise < 2:
+                complexity = 'low'
+            else:
+                complexity = 'medium'
+
+            return {'class': content_class, 'complexity': complexity, 'edge_density': edge_density,
+                    'colors': colors, 'noise': noise, 'alpha_usage': alpha_usage}
+        except Exception:
+            return None
+
+    def estimate_decoded_size(self, width, height, mode, is_animated=False):
+        """Estimate peak memory needed to decode and re-encode an image from its header."""
+        frame_bytes = width * height * MODE_BYTES_PER_PIXEL.get(mode, 4)
+        # Decoded frame + converted copy; animations also keep the previous frame
+        return frame_bytes * (3 if is_animated else 2)
+
+    def get_profile_settings(self, mode, complexity="medium", content=None):
+        """Get compression settings based on profile, image complexity and content class."""
+        # Profile definitions: (target_reduction%, quality_floor, quality_ceiling, min SSIM)
         profiles = {
-            'fast': {'reduction': 0.25, 'floor': 75, 'ceiling': 90},
-            'balanced': {'reduction': 0.40, 'floor': 65, 'ceiling': 85},
-            'quality': {'reduction': 0.25, 'floor': 80, 'ceiling': 95},
-            'maximum': {'reduction': 0.60, 'floor': 45, 'ceiling': 75},
-            'auto': {'reduction': 0.35, 'floor': 60, 'ceiling': 90}  # Will be adjusted
+            'fast': {'reduction': 0.25, 'floor': 75, 'ceiling': 90, 'ssim': 0.970, 'png_tier': 'fast'},
+            'balanced': {'reduction': 0.40, 'floor': 65, 'ceiling': 85, 'ssim': 0.965, 'png_tier': 'balanced'},
+            'quality': {'reduction': 0.25, 'floor': 80, 'ceiling': 95, 'ssim': 0.985, 'png_tier': 'thorough'},
+            'maximum': {'reduction': 0.60, 'floor': 45, 'ceiling': 75, 'ssim': 0.945, 'png_tier': 'max'},
+            'auto': {'reduction': 0.35, 'floor': 60, 'ceiling': 90, 'ssim': 0.970, 'png_tier': 'balanced'}  # Will be adjusted
         }
         
         settings = profiles.get(mode, profiles['balanced'])
@@ -385,47 +1886,118 @@ class EnterpriseMediaOptimizer:
         # For AUTO mode, adjust based on complexity
         if mode == 'auto':
             if complexity == 'high':
-                settings = {'reduction': 0.30, 'floor': 70, 'ceiling': 92}
+                settings = {'reduction': 0.30, 'floor': 70, 'ceiling': 92, 'ssim': 0.975, 'png_tier': 'balanced'}
             elif complexity == 'low':
-                settings = {'reduction': 0.50, 'floor': 55, 'ceiling': 85}
+                settings = {'reduction': 0.50, 'floor': 55, 'ceiling': 85, 'ssim': 0.965, 'png_tier': 'balanced'}
+
+        # Sharp-edged graphics show ringing early, so keep lossy quality higher
+        settings = dict(settings)
+        if content and content['class'] == 'graphic':
+            settings['floor'] = min(settings['floor'] + 10, settings['ceiling'])
+
+        # PNG tool effort for this profile
+        settings['png'] = dict(PNG_EFFORT_TIERS[settings['png_tier']])
+        settings['png']['zopfli'] = settings['png']['zopfli'] and bool(self.config.get("png_zopfli", False))
+        settings['png']['threads'] = PNG_TOOL_THREADS
         
         return settings
 
-    def find_optimal_quality(self, image_path, output_path, target_size, min_quality, max_quality, ext):
-        """Binary search to find optimal quality that achieves target size."""
-        import tempfile
-        
+    def luma_plane(self, img, size=None):
+        """Downsampled luma plane as a float array (first frame of animations)."""
+        if size is None:
+            scale = min(1.0, SSIM_MAX_SIDE / max(img.size))
+            size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        return np.asarray(img.convert('L').resize(size, Image.BOX), dtype=np.float64)
+
+    def compute_ssim(self, reference, candidate):
+        """Mean SSIM of two equally sized luma planes, using box-filtered local statistics."""
+        win = min(SSIM_WINDOW, *reference.shape)
+        c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+
+        def box_mean(a):
+            # Integral image: every window sum costs four lookups
+            c = np.pad(a, ((1, 0), (1, 0))).cumsum(0).cumsum(1)
+            return (c[win:, win:] - c[:-win, win:] - c[win:, :-win] + c[:-win, :-win]) / (win * win)
+
+        mu_x, mu_y = box_mean(reference), box_mean(candidate)
+        var_x = box_mean(reference * reference) - mu_x * mu_x
+        var_y = box_mean(candidate * candidate) - mu_y * mu_y
+        cov = box_mean(reference * candidate) - mu_x * mu_y
+
+        ssim_map = ((2 * mu_x * mu_y + c1) * (2 * cov + c2)) / ((mu_x ** 2 + mu_y ** 2 + c1) * (var_x + var_y + c2))
+        return float(ssim_map.mean())
+
+    def measure_ssim(self, reference_luma, output_path):
+        """SSIM of an encoded file against the source luma plane (None if not measurable)."""
+        try:
+            with Image.open(output_path) as out:
+                out = ImageOps.exif_transpose(out)
+                out_luma = self.luma_plane(out, (reference_luma.shape[1], reference_luma.shape[0]))
+            return self.compute_ssim(reference_luma, out_luma)
+        except Exception:
+            return None
+
+    def find_quality_for_ssim(self, img, reference_luma, min_quality, max_quality, ext, threshold):
+        """Binary search for the lowest quality whose output still meets the SSIM threshold."""
+        best_quality, best_ssim = max_quality, None
+        probe = img.convert('RGB') if ext in ['.jpg', '.jpeg'] else img
+        size = (reference_luma.shape[1], reference_luma.shape[0])
+
+        low, high = min_quality, max_quality
+        while low <= high:
+            mid = (low + high) // 2
+            buffer = io.BytesIO()
+            if ext == '.webp':
+                probe.save(buffer, format='WEBP', quality=mid, method=4)
+            else:
+                probe.save(buffer, format='JPEG', quality=mid, optimize=True)
+            buffer.seek(0)
+            with Image.open(buffer) as decoded:
+                score = self.compute_ssim(reference_luma, self.luma_plane(decoded, size))
+
+            if score >= threshold:
+                best_quality, best_ssim = mid, score
+                high = mid - 1  # Good enough, try smaller
+            else:
+                low = mid + 1
+
+        return best_quality, best_ssim
+
+    def find_optimal_quality(self, img, target_size, min_quality, max_quality, ext):
+        """Binary search to find optimal quality that achieves target size.
+
+        The image is decoded once by the caller and every probe is encoded
+        in memory, so the search never re-reads the source file.
+        """
+        if ext == '.png':
+            return max_quality  # PNG quality is controlled differently
+        if getattr(img, 'is_animated', False):
+            # Probing every frame per iteration is too costly; take the middle of the range
+            return (min_quality + max_quality) // 2
+
         best_quality = max_quality
         best_size = float('inf')
         
         low, high = min_quality, max_quality
         iterations = 0
         max_iterations = 8  # Limit iterations for speed
+
+        probe = img.convert('RGB') if ext in ['.jpg', '.jpeg'] else img
         
         while low <= high and iterations < max_iterations:
             mid = (low + high) // 2
             iterations += 1
             
-            # Create temp file to test compression
-            with tempfile.NamedTemporaryFile(suffix=ext, delete=False) as tmp:
-                tmp_path = tmp.name
-            
+            buffer = io.BytesIO()
             try:
-                img = Image.open(image_path)
                 if ext in ['.jpg', '.jpeg']:
-                    img = img.convert('RGB')
-                    img.save(tmp_path, format='JPEG', quality=mid, optimize=True, progressive=True)
-                elif ext == '.png':
-                    img.save(tmp_path, format='PNG', optimize=True, compress_level=9)
-                    # PNG quality is controlled differently
-                    os.remove(tmp_path)
-                    return max_quality  # For PNG, just use max quality
+                    probe.save(buffer, format='JPEG', quality=mid, optimize=True, progressive=True)
                 elif ext == '.webp':
-                    img.save(tmp_path, format='WEBP', quality=mid, method=6)
+                    probe.save(buffer, format='WEBP', quality=mid, method=6)
                 else:
-                    img.save(tmp_path, quality=mid)
+                    probe.save(buffer, format=img.format or 'JPEG', quality=mid)
                 
-                current_size = os.path.getsize(tmp_path)
+                current_size = buffer.tell()
                 
                 if current_size <= target_size:
                     # We achieved target, but can we do better quality?
@@ -435,177 +2007,465 @@ class EnterpriseMediaOptimizer:
                     low = mid + 1  # Try higher quality
                 else:
                     high = mid - 1  # Need more compression
-                
-                os.remove(tmp_path)
             except Exception as e:
-                if os.path.exists(tmp_path):
-                    os.remove(tmp_path)
                 break
         
         return best_quality
 
-    def compress_image_intelligent(self, input_path, output_path, mode):
-        """Intelligently compress an image based on its characteristics."""
+    def compress_image_intelligent(self, input_path, output_path, mode, transfers=None, move=None):
+        """Intelligently compress an image based on its characteristics.
+
+        Originals that are kept are copied or moved per the batch settings unless
+        transfers/move are given (the dry run passes its own so it never moves files).
+        Returns a result dict (sizes, engine, quality, output path) or None on failure.
+        """
+        if transfers is None:
+            transfers = self.image_transfers
+        if move is None:
+            move = self.move_passthrough_images.get()
+        oriented_path = None
         try:
             # Analyze the image
             metadata = self.analyze_image(input_path)
             if not metadata:
-                return None, "Analysis failed"
+                self.log_to_image_terminal("[ERR] Analysis failed")
+                return None
             
             original_size = metadata['file_size']
             ext = Path(input_path).suffix.lower()
-            
-            # Get profile settings
-            settings = self.get_profile_settings(mode, metadata['complexity'])
-            target_reduction = settings['reduction']
-            quality_floor = settings['floor']
-            quality_ceiling = settings['ceiling']
-            
-            target_size = int(original_size * (1 - target_reduction))
-            
-            self.log_to_image_terminal(f"[SCAN] {metadata['width']}x{metadata['height']} | {metadata['complexity'].upper()} complexity")
+
+            if metadata['is_animated']:
+                self.log_to_image_terminal(f"[SCAN] Animated: {metadata['frames']} frames")
             self.log_to_image_terminal(f"[SIZE] Original: {self.format_bytes(original_size)}")
-            self.log_to_image_terminal(f"[TARGET] Aiming for {self.format_bytes(target_size)} ({int(target_reduction*100)}% reduction)")
-            
-            # Find optimal quality
-            optimal_quality = self.find_optimal_quality(
-                input_path, output_path, target_size, 
-                quality_floor, quality_ceiling, ext
-            )
-            
-            self.log_to_image_terminal(f"[DECISION] Using Quality: {optimal_quality}")
-            
-            # Apply compression with optimal quality
-            method = "PIL"
-            success = False
-            
-            if ext in ['.jpg', '.jpeg']:
-                if self.has_mozjpeg and self.compress_jpeg_mozjpeg(input_path, output_path, optimal_quality):
-                    method = "MozJPEG"
-                    success = True
-                else:
-                    img = Image.open(input_path)
-                    self.compress_image_pil(img, output_path, ext, optimal_quality)
-                    success = True
-            
-            elif ext == '.png':
-                # For PNG, try pngquant first for lossy, then oxipng for lossless
-                if mode in ['maximum', 'balanced'] and self.has_pngquant:
-                    if self.compress_png_pngquant(input_path, output_path, optimal_quality):
-                        method = "PNGQuant"
+
+            # Predict files that are already optimal before paying for decode, search and encode
+            skip_reason = None
+            if self.skip_optimal_images.get():
+                skip_reason = self.predict_no_gain(input_path, metadata, mode)
+                if skip_reason and not self.early_exit_verify:
+                    self.log_to_image_terminal(f"[SKIP] {skip_reason}")
+                    self.transfer_file(input_path, output_path, transfers, move)
+                    return {'original_size': original_size, 'new_size': original_size, 'method': "Skip",
+                            'quality': metadata['jpeg_quality'] or 100, 'reduction': 0,
+                            'output_path': output_path, 'ssim': None, 'predicted_skip': True}
+                if skip_reason:
+                    self.log_to_image_terminal(f"[VERIFY] Predicted skip: {skip_reason}")
+
+            def scored(result):
+                # Verify mode scores every route that runs after a prediction, not just the decode route
+                if result and self.early_exit_verify and self.skip_optimal_images.get():
+                    result['predicted_skip'] = bool(skip_reason)
+                return result
+
+            # Raw TIFF scans are repacked strip by strip without decoding any pixels
+            # (rotated ones take the decode route, which bakes the orientation in)
+            if (ext in ['.tif', '.tiff'] and metadata['tiff_compression'] == 'raw' and metadata['frames'] == 1
+                    and metadata['orientation'] == 1):
+                if self.compress_tiff_strips(input_path, output_path):
+                    return scored(self._finish_image_result(input_path, output_path, original_size,
+                                                            "TIFF-Strip", 100, transfers, move))
+
+            # Lossless JPEG tier: rewrite the entropy coding without touching pixels
+            if ext in ['.jpg', '.jpeg'] and self.choose_jpeg_tier(mode, metadata) == 'lossless':
+                self.log_to_image_terminal("[ROUTE] JPEG -> LOSSLESS (Huffman + progressive)")
+                if self.compress_jpeg_lossless(input_path, output_path, metadata['orientation']):
+                    self.apply_metadata_policy(output_path, metadata['source_meta'])
+                    return scored(self._finish_image_result(input_path, output_path, original_size, "JPEGTran",
+                                                            metadata['jpeg_quality'] or 100, transfers, move))
+                self.log_to_image_terminal("[WARN] jpegtran failed. Re-encoding instead.")
+
+            # Animations have their own route; the still-image search only ever sees one frame
+            if metadata['is_animated'] and ext in ANIMATED_EXTENSIONS:
+                with self.memory_budget.reserve(metadata['memory_cost']):
+                    return scored(self.compress_animation(input_path, output_path, metadata, mode, transfers, move))
+
+            cost = metadata['memory_cost']
+            if metadata['orientation'] != 1:
+                cost *= 2  # The rotated copy coexists with the decoded original
+            if cost > LARGE_IMAGE_BYTES:
+                self.log_to_image_terminal(f"[MEM] Large image (~{self.format_bytes(cost)} decoded). Waiting for memory budget...")
+
+            with self.memory_budget.reserve(cost):
+                with Image.open(input_path) as img:
+                    if not metadata['is_animated']:
+                        img.load()
+
+                    # Bake EXIF orientation into the pixels so every engine writes an upright image
+                    img, oriented_path = self.orient_image(img, metadata, output_path)
+                    engine_input = oriented_path or input_path
+                    source_meta = metadata['source_meta']
+
+                    # Content features from a thumbnail replace the bytes-per-pixel guess
+                    content = self.analyze_content(img)
+                    if content:
+                        metadata['complexity'] = content['complexity']
+                        self.log_to_image_terminal(
+                            f"[CONTENT] {content['class'].upper()} | Edges: {content['edge_density']*100:.0f}% | "
+                            f"Colors: {content['colors']} | Noise: {content['noise']:.1f} | Alpha: {content['alpha_usage']*100:.0f}%")
+
+                    self.log_to_image_terminal(f"[SCAN] {metadata['width']}x{metadata['height']} | {metadata['complexity'].upper()} complexity")
+
+                    # Get profile settings
+                    settings = self.get_profile_settings(mode, metadata['complexity'], content)
+                    target_reduction = settings['reduction']
+                    quality_floor = settings['floor']
+                    quality_ceiling = settings['ceiling']
+
+                    target_size = int(original_size * (1 - target_reduction))
+
+                    # Pick the engine route before probing so only useful encodes are tried
+                    target_ext = ext
+                    png_route = None
+                    if ext == '.png' and not metadata['is_animated']:
+                        png_route = self.choose_png_route(mode, content)
+                        if png_route == 'webp':
+                            target_ext = '.webp'
+                            output_path = str(Path(output_path).with_suffix('.webp'))
+                        self.log_to_image_terminal(f"[ROUTE] PNG -> {png_route.upper()}")
+
+                    if not self.perceptual_target.get():
+                        self.log_to_image_terminal(f"[TARGET] Aiming for {self.format_bytes(target_size)} ({int(target_reduction*100)}% reduction)")
+
+                    reference_luma = None
+                    if np is not None and not metadata['is_animated']:
+                        reference_luma = self.luma_plane(img)
+
+                    # Find optimal quality
+                    if (self.perceptual_target.get() and reference_luma is not None
+                            and target_ext in ['.jpg', '.jpeg', '.webp']):
+                        self.log_to_image_terminal(f"[TARGET] Perceptual: SSIM >= {settings['ssim']:.3f}")
+                        optimal_quality, probe_ssim = self.find_quality_for_ssim(
+                            img, reference_luma, quality_floor, quality_ceiling, target_ext, settings['ssim']
+                        )
+                        if probe_ssim is None:
+                            self.log_to_image_terminal("[TARGET] Threshold not reachable in range. Using ceiling.")
+                    else:
+                        optimal_quality = self.find_optimal_quality(
+                            img, target_size, quality_floor, quality_ceiling, target_ext
+                        )
+
+                    self.log_to_image_terminal(f"[DECISION] Using Quality: {optimal_quality}")
+
+                    # Apply compression with optimal quality
+                    method = "PIL"
+                    success = False
+
+                    if ext in ['.jpg', '.jpeg']:
+                        if self.has_mozjpeg and self.compress_jpeg_mozjpeg(engine_input, output_path, optimal_quality):
+                            method = "MozJPEG"
+                            success = True
+                        else:
+                            output_path = self.compress_image_pil(img, output_path, ext, optimal_quality, source_meta)
+                            success = True
+
+                    elif png_route == 'webp':
+                        output_path = self.compress_image_pil(img, output_path, '.webp', optimal_quality, source_meta)
+                        method = "WebP"
                         success = True
-                
-                if not success and self.has_oxipng:
-                    if self.compress_png_oxipng(input_path, output_path):
-                        method = "OxiPNG"
+
+                    elif png_route:
+                        # Lossy graphics go through pngquant; flat art and photos stay lossless
+                        png_effort = settings['png']
+                        tool_start = time.perf_counter()
+                        if png_route == 'lossy' and self.has_pngquant:
+                            if self.compress_png_pngquant(engine_input, output_path, optimal_quality, png_effort):
+                                method = "PNGQuant"
+                                success = True
+
+                        if not success and self.has_oxipng:
+                            if self.compress_png_oxipng(engine_input, output_path, png_effort):
+                                method = "OxiPNG"
+                                success = True
+                        png_seconds = time.perf_counter() - tool_start
+
+                        if not success:
+                            fallback_quality = optimal_quality if png_route == 'lossy' else 100
+                            output_path = self.compress_image_pil(img, output_path, ext, fallback_quality, source_meta)
+                            success = True
+
+                    else:
+                        output_path = self.compress_image_pil(img, output_path, ext, optimal_quality, source_meta)
+                        method = "WebP" if ext == '.webp' else "PIL"
                         success = True
-                
-                if not success:
-                    img = Image.open(input_path)
-                    self.compress_image_pil(img, output_path, ext, optimal_quality)
-                    success = True
-            
-            elif ext == '.webp':
-                img = Image.open(input_path)
-                img.save(output_path, format='WEBP', quality=optimal_quality, method=6, optimize=True)
-                method = "WebP"
-                success = True
-            
-            else:
-                img = Image.open(input_path)
-                self.compress_image_pil(img, output_path, ext, optimal_quality)
-                success = True
             
-            if success and os.path.exists(output_path):
-                new_size = os.path.getsize(output_path)
-                
-                # Check if we actually saved space
-                if new_size >= original_size:
-                    # Just copy original if compression didn't help
-                    shutil.copy2(input_path, output_path)
-                    new_size = original_size
-                    self.log_to_image_terminal(f"[WARN] No savings. Keeping original.")
-                    return original_size, new_size, "Copy", optimal_quality, 0
-                
-                saved = original_size - new_size
-                reduction = (saved / original_size) * 100
-                
-                return original_size, new_size, method, optimal_quality, reduction
+                    if success and os.path.exists(output_path):
+                        self.apply_metadata_policy(output_path, source_meta)
+                        result = self._finish_image_result(input_path, output_path, original_size, method,
+                                                           optimal_quality, transfers, move)
+                        if reference_luma is not None:
+                            result['ssim'] = self.measure_ssim(reference_luma, result['output_path'])
+                        scored(result)
+                        if png_route and png_route != 'webp':
+                            result['png_tier'] = settings['png_tier']
+                            result['png_seconds'] = png_seconds
+                        return result
             
-            return None, "Compression failed"
+            self.log_to_image_terminal("[ERR] Compression failed")
+            return None
             
         except Exception as e:
             self.log_to_image_terminal(f"[ERR] {str(e)}")
-            return None, str(e)
+            return None
+        finally:
+            if oriented_path and os.path.exists(oriented_path):
+                os.remove(oriented_path)
+
+    def choose_jpeg_tier(self, mode, metadata):
+        """Pick 'lossless' (jpegtran) or 'reencode' for a JPEG, before any pixels are decoded."""
+        if not self.has_jpegtran or metadata['is_animated']:
+            return 'reencode'
+        if mode == 'fast':
+            return 'lossless'
+        # Already at or below the profile's quality floor: a re-encode can only lose
+        # detail, while lossless entropy optimization still trims a few percent
+        quality = metadata['jpeg_quality']
+        floor = self.get_profile_settings(mode, metadata['complexity'])['floor']
+        if quality is not None and quality <= floor:
+            return 'lossless'
+        return 'reencode'
+
+    def choose_png_route(self, mode, content):
+        """Pick the PNG engine route: 'lossy' (pngquant), 'lossless' (oxipng) or 'webp'."""
+        default = 'lossy' if mode in ['maximum', 'balanced'] else 'lossless'
+        if not content:
+            return default
+        if content['class'] == 'flat':
+            return 'lossless'  # Few colours already; quantizing gains nothing
+        if content['class'] == 'graphic':
+            return 'lossless' if mode == 'quality' else 'lossy'
+        # Photos stored as PNG shrink far more as lossy WebP
+        return 'webp' if mode in ['auto', 'maximum'] else default
+
+    def _finish_image_result(self, input_path, output_path, original_size, method, quality, transfers, move):
+        """Build the result dict, keeping the original when compression did not help."""
+        new_size = os.path.getsize(output_path)
+
+        # Check if we actually saved space
+        if new_size >= original_size:
+            # Just copy original if compression didn't help
+            if Path(output_path).suffix.lower() != Path(input_path).suffix.lower():
+                os.remove(output_path)
+                output_path = str(Path(output_path).with_suffix(Path(input_path).suffix))
+            self.transfer_file(input_path, output_path, transfers, move)
+            self.log_to_image_terminal(f"[WARN] No savings. Keeping original.")
+            return {'original_size': original_size, 'new_size': original_size, 'method': "Copy",
+                    'quality': quality, 'reduction': 0, 'output_path': output_path, 'ssim': None}
+
+        saved = original_size - new_size
+        reduction = (saved / original_size) * 100
+
+        return {'original_size': original_size, 'new_size': new_size, 'method': method,
+                'quality': quality, 'reduction': reduction, 'output_path': output_path, 'ssim': None}
+
+    def compress_tiff_strips(self, input_path, output_path):
+        """Repack an uncompressed TIFF with Deflate, one strip or tile at a time.
+
+        Memory use is bounded by the largest strip instead of the decoded image,
+        which keeps gigapixel scans from exhausting RAM. The output keeps the
+        source's byte order and its tags are copied as raw bytes, so 16-bit
+        samples and tag values need no swapping.
+        """
+        # Structure tags copied verbatim; metadata blocks follow the metadata policy
+        copied_tags = {256, 257, 258, 262, 274, 277, 278, 282, 283, 284, 296, 320, 322, 323, 338, 339}
+        policy = self.metadata_policy.get()
+        if policy != 'strip':
+            copied_tags.add(34675)  # ICC profile
+        if policy == 'all':
+            # Description, make, model, software, date, artist, copyright; XMP, IPTC, EXIF sub-IFD
+            copied_tags |= {269, 270, 271, 272, 305, 306, 315, 33432, 700, 33723, 34665}
+        try:
+            with open(input_path, 'rb') as src:
+                header = src.read(8)
+                order = {b'II': '<', b'MM': '>'}.get(header[:2])
+                if order is None or struct.unpack(order + 'H', header[2:4])[0] != 42:
+                    return False  # BigTIFF and anything unusual go through Pillow instead
+                entries = self._read_tiff_ifd(src, struct.unpack(order + 'I', header[4:8])[0], order)
+                exif = None
+                if 34665 in copied_tags and 34665 in entries:
+                    exif = self._read_tiff_ifd(src, self._tiff_values(entries[34665], order)[0], order)
+                    exif.pop(40965, None)  # Interoperability IFD pointer would dangle
+            tiled = 324 in entries
+            offsets = self._tiff_values(entries.get(324 if tiled else 273), order)
+            counts = self._tiff_values(entries.get(325 if tiled else 279), order)
+            if not offsets or not counts or len(offsets) != len(counts):
+                return False
+            entries = {tag: entry for tag, entry in entries.items() if tag in copied_tags and tag != 34665}
+
+            new_offsets, new_counts = [], []
+            with open(input_path, 'rb') as src, open(output_path, 'wb') as dst:
+                dst.write(header[:4] + b'\x00\x00\x00\x00')  # IFD offset patched below
+                for offset, count in zip(offsets, counts):
+                    src.seek(offset)
+                    packed = zlib.compress(src.read(count), 6)
+                    new_offsets.append(dst.tell())
+                    new_counts.append(len(packed))
+                    dst.write(packed)
+                    if dst.tell() % 2:
+                        dst.write(b'\x00')
+
+                entries[259] = (3, 1, struct.pack(order + 'H', 8))  # Compression: Adobe Deflate
+                entries[324 if tiled else 273] = (4, len(new_offsets),
+                                                  struct.pack(f'{order}{len(new_offsets)}I', *new_offsets))
+                entries[325 if tiled else 279] = (4, len(new_counts),
+                                                  struct.pack(f'{order}{len(new_counts)}I', *new_counts))
+                if exif:
+                    exif_offset = dst.tell()
+                    dst.write(self._pack_tiff_ifd(exif, exif_offset, order))
+                    if dst.tell() % 2:
+                        dst.write(b'\x00')
+                    entries[34665] = (4, 1, struct.pack(order + 'I', exif_offset))
+
+                ifd_offset = dst.tell()
+                ifd = self._pack_tiff_ifd(entries, ifd_offset, order)
+                if ifd_offset + len(ifd) >= 2 ** 32:
+                    raise ValueError("Output exceeds classic TIFF size limit")
+                dst.write(ifd)
+                dst.seek(4)
+                dst.write(struct.pack(order + 'I', ifd_offset))
+            return True
+        except Exception as e:
+            self.log_to_image_terminal(f"[WARN] Strip repack failed: {e}")
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            return False
+
+    def _read_tiff_ifd(self, src, offset, order):
+        """Entries of the IFD at offset as {tag: (type, count, raw value bytes)}; unknown types are dropped."""
+        src.seek(offset)
+        raw = src.read(2)
+        raw += src.read(12 * struct.unpack(order + 'H', raw)[0])
+        entries = {}
+        for pos in range(2, len(raw) - 11, 12):
+            tag, typ, count = struct.unpack(order + 'HHI', raw[pos:pos + 8])
+            size = TIFF_TYPE_SIZES.get(typ, 0) * count
+            if not size:
+                continue
+            field = raw[pos + 8:pos + 12]
+            if size > 4:
+                src.seek(struct.unpack(order + 'I', field)[0])
+                field = src.read(size)
+            entries[tag] = (typ, count, field[:size])
+        return entries
+
+    def _tiff_values(self, entry, order):
+        """Integer values of a SHORT/LONG entry from _read_tiff_ifd, or None."""
+        if entry is None or entry[0] not in (3, 4):
+            return None
+        typ, count, payload = entry
+        return struct.unpack(f"{order}{count}{'H' if typ == 3 else 'I'}", payload)
+
+    def _pack_tiff_ifd(self, entries, base, order):
+        """Serialize {tag: (type, count, raw bytes)} as an IFD written at file offset base, values after it."""
+        data_offset = base + 2 + 12 * len(entries) + 4
+        ifd, extra = [], b''
+        for tag in sorted(entries):
+            typ, count, payload = entries[tag]
+            if len(payload) <= 4:
+                field = payload.ljust(4, b'\x00')
+            else:
+                field = struct.pack(order + 'I', data_offset + len(extra))
+                extra += payload + (b'\x00' if len(payload) % 2 else b'')
+            ifd.append(struct.pack(order + 'HHI', tag, typ, count) + field)
+        return struct.pack(order + 'H', len(ifd)) + b''.join(ifd) + struct.pack(order + 'I', 0) + extra
 
 
     def compress_single_image(self):
-        if self.is_processing: return
-        if not self.single_image_path.get() or not self.single_output_folder.get():
+        if self.busy['single']: return
+        out_dir = self.single_output_folder.get() or self.batch_output_folder.get()
+        if not self.single_image_path.get() or not out_dir:
             messagebox.showerror("Error", "Select image and output folder.")
             return
+        if Path(out_dir).resolve() == Path(self.single_image_path.get()).resolve().parent:
+            messagebox.showerror("Error", "Output folder must differ from the image's folder.")
+            return
 
-        self.is_processing = True
+        self.busy['single'] = True
         self.single_compress_btn.config(state='disabled', text="Processing...")
         self.compression_details.set("Optimizing...")
-        threading.Thread(target=self._compress_single_worker, daemon=True).start()
+        threading.Thread(target=self._compress_single_worker, args=(out_dir,), daemon=True).start()
 
-    def _compress_single_worker(self):
+    def _compress_single_worker(self, out_dir):
         try:
             src = self.single_image_path.get()
-            orig_size = os.path.getsize(src)
-            self.root.after(0, self.original_size.set, self.format_bytes(orig_size))
+            self.set_pipeline_status('single', f"waiting ({Path(src).name})")
+            digest = self.source_hash(src)
+            with self.governor.slot(PRIORITY_SINGLE):
+                self.set_pipeline_status('single', f"optimizing {Path(src).name}")
+                started = time.time()
+                try:
+                    record = self._compress_single_image(src, out_dir)
+                except Exception as e:
+                    record = {'status': 'failed', 'error': str(e)}
+                    raise
+                finally:
+                    self.record_history('single', src, "single", started, source_hash=digest,
+                                        quality=self.single_quality.get(), **record)
+        except Exception as e:
+            self.root.after(0, messagebox.showerror, "Error", str(e))
+        finally:
+            self.busy['single'] = False
+            self.set_pipeline_status('single', "idle")
+            self.root.after(0, lambda: self.single_compress_btn.config(state='normal', text="Compress Single Image"))
+
+    def _compress_single_image(self, src, out_dir):
+        """Compress one image at the single-image quality and show the result in the panel.
 
-            fname = Path(src).stem
-            ext = Path(src).suffix.lower()
-            dest = os.path.join(self.single_output_folder.get(), f"{fname}{ext}")
+        Returns the fields recorded in the results history.
+        """
+        orig_size = os.path.getsize(src)
+        self.root.after(0, self.original_size.set, self.format_bytes(orig_size))
 
-            method = "PIL"
+        fname = Path(src).stem
+        ext = Path(src).suffix.lower()
+        dest = os.path.join(out_dir, f"{fname}{ext}")
+        self.release_output(dest, src)
+
+        metadata = self.analyze_image(src)
+        img, oriented_path = self.orient_image(Image.open(src), metadata, dest)
+        engine_input = oriented_path or src
+        source_meta = metadata['source_meta']
+        method = "PIL"
+        
+        if ext in ['.jpg', '.jpeg']:
+            if self.has_mozjpeg and self.compress_jpeg_mozjpeg(engine_input, dest, self.single_quality.get()):
+                method = "MozJPEG"
+            else:
+                dest = self.compress_image_pil(img, dest, ext, self.single_quality.get(), source_meta)
+        
+        elif ext == '.png':
+            success = False
+            if self.has_pngquant and self.single_quality.get() < 95:
+                if self.compress_png_pngquant(engine_input, dest, self.single_quality.get()):
+                    method = "PNGQuant"
+                    success = True
             
-            if ext in ['.jpg', '.jpeg']:
-                if self.has_mozjpeg and self.compress_jpeg_mozjpeg(src, dest, self.single_quality.get()):
-                    method = "MozJPEG"
-                else:
-                    img = Image.open(src)
-                    dest = self.compress_image_pil(img, dest, ext, self.single_quality.get())
+            if not success and self.has_oxipng:
+                if self.compress_png_oxipng(engine_input, dest):
+                    method = "OxiPNG"
+                    success = True
             
-            elif ext == '.png':
-                success = False
-                if self.has_pngquant and self.single_quality.get() < 95:
-                    if self.compress_png_pngquant(src, dest, self.single_quality.get()):
-                        method = "PNGQuant"
-                        success = True
-                
-                if not success and self.has_oxipng:
-                    if self.compress_png_oxipng(src, dest):
-                        method = "OxiPNG"
-                        success = True
-                
-                if not success:
-                    img = Image.open(src)
-                    dest = self.compress_image_pil(img, dest, ext, self.single_quality.get())
-            else:
-                img = Image.open(src)
-                dest = self.compress_image_pil(img, dest, ext, self.single_quality.get())
+            if not success:
+                dest = self.compress_image_pil(img, dest, ext, self.single_quality.get(), source_meta)
+        else:
+            dest = self.compress_image_pil(img, dest, ext, self.single_quality.get(), source_meta)
 
-            new_size = os.path.getsize(dest)
-            self.root.after(0, self.compressed_size.set, self.format_bytes(new_size))
+        if oriented_path:
+            os.remove(oriented_path)
+        self.apply_metadata_policy(dest, source_meta)
+        new_size = os.path.getsize(dest)
+        self.root.after(0, self.compressed_size.set, self.format_bytes(new_size))
 
-            saved = orig_size - new_size
-            percent = (saved / orig_size) * 100
+        saved = orig_size - new_size
+        percent = (saved / orig_size) * 100
 
-            details = f"Method: {method} | Quality: {self.single_quality.get()}% | Saved: {self.format_bytes(saved)} ({percent:.2f}%)"
-            self.root.after(0, self.compression_details.set, details)
-            self.root.after(0, messagebox.showinfo, "Success", "Image optimized successfully.")
-
-        except Exception as e:
-            self.root.after(0, messagebox.showerror, "Error", str(e))
-        finally:
-            self.is_processing = False
-            self.root.after(0, lambda: self.single_compress_btn.config(state='normal', text="Compress Single Image"))
+        details = f"Method: {method} | Quality: {self.single_quality.get()}% | Saved: {self.format_bytes(saved)} ({percent:.2f}%)"
+        self.root.after(0, self.compression_details.set, details)
+        self.root.after(0, messagebox.showinfo, "Success", "Image optimized successfully.")
+        return {'status': 'compressed' if saved > 0 else 'kept', 'engine': method, 'output': str(dest),
+                'original_size': orig_size, 'new_size': new_size}
 
     def compress_batch(self):
-        if self.is_processing: return
+        if self.busy['images']: return
         if not self.batch_input_folder.get() or not self.batch_output_folder.get():
             messagebox.showerror("Error", "Select image and output folder.")
             return
@@ -614,8 +2474,9 @@ class EnterpriseMediaOptimizer:
             messagebox.showerror("Error", "Input and Output folders must be different.")
             return
 
-        self.is_processing = True
+        self.busy['images'] = True
         self.batch_compress_btn.config(state='disabled', text="Processing...")
+        self.image_watch_btn.config(state='disabled')
         self.image_stats_text.delete(1.0, tk.END)
         
         mode = self.image_compression_mode.get()
@@ -629,22 +2490,20 @@ class EnterpriseMediaOptimizer:
 
     def _compress_batch_worker(self):
         try:
-            img_exts = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp', '.tiff'}
-            vid_exts = {'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm', '.m4v', '.mpg', '.mpeg', '.3gp', '.ts'}
-            
             in_dir = Path(self.batch_input_folder.get())
             out_dir = Path(self.batch_output_folder.get())
             out_dir.mkdir(parents=True, exist_ok=True)
 
             all_files = [f for f in in_dir.iterdir() if f.is_file()]
-            image_files = [f for f in all_files if f.suffix.lower() in img_exts]
-            video_files = [f for f in all_files if f.suffix.lower() in vid_exts]
+            image_files = [f for f in all_files if f.suffix.lower() in IMAGE_EXTENSIONS]
+            video_files = [f for f in all_files if f.suffix.lower() in VIDEO_EXTENSIONS]
 
             if not image_files and not video_files:
                 self.root.after(0, messagebox.showwarning, "Warning", "No supported files found.")
                 return
 
             # --- Handle Video Copying ---
+            self.image_transfers.reset()
             videos_copied = 0
             if self.copy_videos_in_image_batch.get() and video_files:
                 video_dest_folder = out_dir / "your_videos"
@@ -653,7 +2512,8 @@ class EnterpriseMediaOptimizer:
                 
                 for v_file in video_files:
                     try:
-                        shutil.copy2(v_file, video_dest_folder / v_file.name)
+                        self.transfer_file(v_file, video_dest_folder / v_file.name, self.image_transfers,
+                                           self.move_passthrough_images.get())
                         videos_copied += 1
                     except Exception as e:
                         self.log_to_image_terminal(f"[ERR] Failed to copy {v_file.name}: {e}")
@@ -661,53 +2521,13 @@ class EnterpriseMediaOptimizer:
                 self.log_to_image_terminal(f"[DONE] Moved {videos_copied} videos.")
 
             # --- Handle Image Compression ---
-            total_files = len(image_files)
-            self.root.after(0, lambda: self.progress.configure(maximum=total_files, value=0))
-            self.log_to_image_terminal(f"\n[SCAN] Found {total_files} images to optimize.")
-            self.log_to_image_terminal("-" * 60)
-
-            total_orig = 0
-            total_new = 0
-            stats = {}
             mode = self.image_compression_mode.get()
             start_time = time.time()
-            
-            compressed = 0
-            failed = 0
-
-            for idx, f in enumerate(image_files):
-                self.root.after(0, self.progress_label.config, {'text': f"Processing: {f.name}"})
-                self.log_to_image_terminal(f"\n[IMAGE] Processing [{idx + 1}/{total_files}]: {f.name}")
-                
-                try:
-                    dest = out_dir / f.name
-                    
-                    # Use intelligent compression
-                    result = self.compress_image_intelligent(str(f), str(dest), mode)
-                    
-                    if result and len(result) == 5:
-                        orig_size, new_size, method, quality, reduction = result
-                        total_orig += orig_size
-                        total_new += new_size
-                        stats[method] = stats.get(method, 0) + 1
-                        compressed += 1
-                        
-                        self.log_to_image_terminal(f"[DONE] {self.format_bytes(orig_size)} -> {self.format_bytes(new_size)} (Saved {reduction:.1f}%)")
-                        self.log_to_image_terminal(f"[ENGINE] {method} @ Quality {quality}")
-                    else:
-                        # Fallback: just copy
-                        shutil.copy2(f, dest)
-                        size = os.path.getsize(f)
-                        total_orig += size
-                        total_new += size
-                        failed += 1
-                        self.log_to_image_terminal(f"[WARN] Could not compress. Copied original.")
-                        
-                except Exception as e:
-                    self.log_to_image_terminal(f"[ERR] {str(e)}")
-                    failed += 1
-                    
-                self.root.after(0, lambda v=idx+1: self.progress.configure(value=v))
+            batch = self.run_image_batch(image_files, out_dir, mode)
+            total_orig, total_new = batch['total_orig'], batch['total_new']
+            compressed, failed = batch['compressed'], batch['failed']
+            stats, ssim_scores = batch['methods'], batch['ssim_scores']
+            dedup_count, dedup_skipped, dedup_shared = batch['dedup']
 
             # Final Summary
             duration = time.time() - start_time
@@ -722,9 +2542,27 @@ class EnterpriseMediaOptimizer:
                 self.log_to_image_terminal(f"[STAT] Videos Moved: {videos_copied}")
             self.log_to_image_terminal(f"[SIZE] {self.format_bytes(total_orig)} -> {self.format_bytes(total_new)}")
             self.log_to_image_terminal(f"[SAVED] {self.format_bytes(saved)} ({percent:.1f}% reduction)")
+            if dedup_count:
+                self.log_to_image_terminal(f"[DEDUP] {dedup_count} duplicates skipped ({self.format_bytes(dedup_skipped)} not re-encoded, "
+                                           f"{self.format_bytes(dedup_shared)} shared via links)")
+            self.log_transfer_summary(self.image_transfers, self.log_to_image_terminal)
+            self.log_watchdog_summary(['cjpeg', 'jpegtran', 'oxipng', 'pngquant'], start_time, self.log_to_image_terminal)
             
             methods_str = ", ".join([f"{k}: {v}" for k,v in stats.items()])
             self.log_to_image_terminal(f"[ENGINES] {methods_str}")
+            if ssim_scores:
+                self.log_to_image_terminal(f"[SSIM] Mean: {sum(ssim_scores) / len(ssim_scores):.4f} | Min: {min(ssim_scores):.4f}")
+            for tier_name, tier in batch['png_tiers'].items():
+                tier_saved = (tier['orig'] - tier['new']) / tier['orig'] * 100 if tier['orig'] else 0
+                self.log_to_image_terminal(
+                    f"[PNG] {tier_name} effort: {tier['files']} files | {tier['seconds']:.1f}s tool time "
+                    f"({tier['seconds'] / tier['files']:.2f}s/file) | {tier_saved:.1f}% saved")
+            predictor = batch['predictor']
+            if predictor['checked']:
+                self.log_to_image_terminal(
+                    f"[VERIFY] Predictor accuracy: {predictor['correct'] / predictor['checked'] * 100:.1f}% of {predictor['checked']} | "
+                    f"False skips: {predictor['false_skips']} ({self.format_bytes(predictor['missed_bytes'])} missed) | "
+                    f"Wasted encodes: {predictor['wasted_encodes']}")
             self.log_to_image_terminal("=" * 60)
 
             self.root.after(0, self.progress_label.config, {'text': "Optimization Complete!"})
@@ -743,46 +2581,239 @@ class EnterpriseMediaOptimizer:
             self.log_to_image_terminal(f"[FATAL] {str(e)}")
             self.root.after(0, messagebox.showerror, "Error", str(e))
         finally:
-            self.is_processing = False
+            self.busy['images'] = False
+            self.set_pipeline_status('images', "idle")
             self.root.after(0, lambda: self.batch_compress_btn.config(state='normal', text="Start Image Optimization"))
+            self.root.after(0, lambda: self.image_watch_btn.config(state='normal'))
+
+
+    def run_image_batch(self, image_files, out_dir, mode, stop_event=None):
+        """Deduplicate and compress a list of images in parallel, returning aggregate stats.
+
+        When stop_event is set, files that have not started yet are dropped and the
+        engines of files in flight are killed; batch['finished'] lists the files
+        (duplicates included) that completed before that.
+        """
+        # --- Handle Duplicates ---
+        image_duplicates = {}
+        if self.dedup_images.get() and len(image_files) > 1:
+            self.log_to_image_terminal("\n[DEDUP] Hashing images to find duplicates...")
+            image_files, image_duplicates = self.find_duplicates(image_files, perceptual=self.dedup_similar_images.get())
+            self.log_to_image_terminal(f"[DEDUP] {len(image_duplicates)} duplicates will reuse another file's result.")
+
+        image_files, costs = self.plan_by_cost(image_files, self.estimate_image_cost)
+        total_cost = sum(costs.values()) or 1
+        total_files = len(image_files)
+        self.root.after(0, lambda: self.progress.configure(maximum=100, value=0))
+        self.log_to_image_terminal(f"\n[SCAN] Found {total_files} images to optimize (largest first).")
+        self.log_engine_versions(['cjpeg', 'jpegtran', 'oxipng', 'pngquant'], self.log_to_image_terminal)
+        self.log_to_image_terminal("-" * 60)
 
+        batch = {'total_orig': 0, 'total_new': 0, 'compressed': 0, 'failed': 0,
+                 'methods': {}, 'ssim_scores': [], 'dedup': (0, 0, 0),
+                 'predictor': {'checked': 0, 'correct': 0, 'false_skips': 0, 'missed_bytes': 0, 'wasted_encodes': 0},
+                 'png_tiers': {}}
+        outputs = {}
+        finished = []
+        done = 0
+        done_cost = 0
+        start_time = time.time()
+
+        # Files run in parallel, each holding one governor core; the memory budget inside
+        # compress_image_intelligent keeps the number of large decoded images in flight bounded
+        with ThreadPoolExecutor(max_workers=IMAGE_BATCH_WORKERS) as pool:
+            futures = [pool.submit(self._compress_image_file, f, out_dir, mode, idx, total_files, stop_event)
+                       for idx, f in enumerate(image_files)]
+
+            for future in as_completed(futures):
+                stopped = stop_event is not None and stop_event.is_set()
+                if stopped:
+                    for pending in futures:
+                        pending.cancel()
+                if future.cancelled():
+                    continue
+                f, result = future.result()
+                if not stopped:
+                    finished.append(f)  # Otherwise its engine may have been killed midway
+                outputs[f] = result['output_path'] if isinstance(result, dict) else out_dir / f.name
+                if result == 'error':
+                    batch['failed'] += 1
+                elif result:
+                    batch['total_orig'] += result['original_size']
+                    batch['total_new'] += result['new_size']
+                    batch['methods'][result['method']] = batch['methods'].get(result['method'], 0) + 1
+                    batch['compressed'] += 1
+                    if result.get('ssim') is not None:
+                        batch['ssim_scores'].append(result['ssim'])
+                    if result.get('png_tier'):
+                        tier = batch['png_tiers'].setdefault(result['png_tier'], {'files': 0, 'seconds': 0.0, 'orig': 0, 'new': 0})
+                        tier['files'] += 1
+                        tier['seconds'] += result['png_seconds']
+                        tier['orig'] += result['original_size']
+                        tier['new'] += result['new_size']
+                    if result.get('predicted_skip') is not None and result['method'] != "Skip":
+                        self.score_prediction(batch['predictor'], result)
+                else:
+                    size = os.path.getsize(f)
+                    batch['total_orig'] += size
+                    batch['total_new'] += size
+                    batch['failed'] += 1
+
+                done += 1
+                done_cost += costs[f]
+                eta = self.eta_text(start_time, done_cost, total_cost)
+                self.set_pipeline_status('images', f"{done}/{total_files} {eta}".rstrip(), done_cost / total_cost)
+                self.root.after(0, lambda t=f"Processed: {f.name}  {eta}".rstrip(): self.progress_label.config(text=t))
+                self.root.after(0, lambda v=done_cost / total_cost * 100: self.progress.configure(value=v))
+
+        if stop_event is not None and stop_event.is_set():
+            self.log_to_image_terminal(f"[STOP] Batch stopped with {total_files - done} images left.")
+        if image_duplicates:
+            self.log_to_image_terminal("")
+            batch['dedup'] = self.materialize_duplicates(
+                image_duplicates, outputs, out_dir, self.log_to_image_terminal, self.image_transfers)
+            done_files = set(finished)
+            finished += [dup for dup, rep in image_duplicates.items() if rep in done_files]
+        batch['outputs'] = outputs
+        batch['finished'] = finished
+        return batch
+
+    def estimate_image_cost(self, path):
+        """Relative compression time of an image: its decoded pixel count, read from the header."""
+        try:
+            with Image.open(path) as img:
+                return img.width * img.height * getattr(img, 'n_frames', 1)
+        except Exception:
+            return None
+
+    def score_prediction(self, stats, result):
+        """Tally a verify-mode prediction against what the full compression achieved."""
+        saved = result['original_size'] - result['new_size']
+        shrank = saved >= result['original_size'] * EARLY_EXIT_MIN_GAIN
+        stats['checked'] += 1
+        if result['predicted_skip'] != shrank:
+            stats['correct'] += 1
+        elif result['predicted_skip']:
+            stats['false_skips'] += 1
+            stats['missed_bytes'] += saved
+        else:
+            stats['wasted_encodes'] += 1
+
+    def _compress_image_file(self, f, out_dir, mode, idx, total_files, cancel=None):
+        """Compress one batch image, returning (path, result dict / None / 'error').
+
+        Runs on pool threads, so the cancel event is handed to run_tool through this thread's state.
+        """
+        self._log_buffer.lines = []
+        outer_cancel = getattr(self._tool_cancel, 'event', None)
+        self._tool_cancel.event = cancel or outer_cancel
+        started = time.time()
+        digest = self.source_hash(f)
+        record = {'status': 'failed', 'original_size': os.path.getsize(f), 'source_hash': digest,
+                  'cost': self.estimate_image_cost(f)}
+        try:
+            self.log_to_image_terminal(f"\n[IMAGE] Processing [{idx + 1}/{total_files}]: {f.name}")
+            dest = out_dir / f.name
+            self.release_output(dest, f)
+
+            # Use intelligent compression
+            with self.governor.slot(PRIORITY_IMAGES):
+                result = self.compress_image_intelligent(str(f), str(dest), mode)
+
+            if result:
+                record.update(status='skipped' if result['method'] == "Skip" else
+                              'kept' if result['method'] == "Copy" else 'compressed',
+                              engine=result['method'], quality=result['quality'],
+                              new_size=result['new_size'], output=str(result['output_path']))
+                self.log_to_image_terminal(f"[DONE] {self.format_bytes(result['original_size'])} -> {self.format_bytes(result['new_size'])} (Saved {result['reduction']:.1f}%)")
+                self.log_to_image_terminal(f"[ENGINE] {result['method']} @ Quality {result['quality']}")
+                if result.get('ssim') is not None:
+                    self.log_to_image_terminal(f"[SSIM] {result['ssim']:.4f}")
+            else:
+                # Fallback: just copy
+                self.transfer_file(f, dest, self.image_transfers, self.move_passthrough_images.get())
+                self.log_to_image_terminal(f"[WARN] Could not compress. Copied original.")
+                record.update(status='kept', engine="Copy", new_size=record['original_size'], output=str(dest),
+                              error="no engine could compress it")
+            return f, result
+
+        except Exception as e:
+            self.log_to_image_terminal(f"[ERR] {str(e)}")
+            record['error'] = str(e)
+            return f, 'error'
+        finally:
+            self.record_history('images', f, mode, started, **record)
+            self._tool_cancel.event = outer_cancel
+            lines = self._log_buffer.lines
+            self._log_buffer.lines = None
+            self.log_to_image_terminal("\n".join(lines))
 
     def compress_jpeg_mozjpeg(self, input_path, output_path, quality):
         """Compress JPEG using MozJPEG"""
         try:
-            cjpeg_path = str(self.engine_dir / 'cjpeg.exe')
+            cjpeg_path = self.engines.path('cjpeg')
             cmd = [cjpeg_path, '-quality', str(quality), '-optimize',
                    '-progressive', '-outfile', output_path, input_path]
-            subprocess.run(cmd, check=True, capture_output=True)
+            self.run_tool(cmd, self.image_tool_timeout(input_path), self.log_to_image_terminal, check=True)
             return True
         except:
             return False
 
-    def compress_png_oxipng(self, input_path, output_path):
-        """Compress PNG using OxiPNG"""
+    def compress_jpeg_lossless(self, input_path, output_path, orientation=1):
+        """Losslessly shrink a JPEG with jpegtran: optimized Huffman tables, progressive scans, no metadata.
+
+        Works on the DCT coefficients directly, so no pixels are decoded or re-quantized.
+        A non-default EXIF orientation is applied as a lossless transform; if the image
+        size is not a whole number of blocks (-perfect fails), this returns False.
+        """
         try:
-            shutil.copy2(input_path, output_path)
-            oxipng_path = str(self.engine_dir / 'oxipng.exe')
-            cmd = [oxipng_path, '-o', '6', '-i', '0', '--strip', 'safe', output_path]
-            subprocess.run(cmd, check=True, capture_output=True)
+            jpegtran_path = self.engines.path('jpegtran')
+            cmd = [jpegtran_path, '-copy', 'none', '-optimize', '-progressive']
+            if orientation in JPEGTRAN_TRANSFORMS:
+                cmd += JPEGTRAN_TRANSFORMS[orientation] + ['-perfect']
+            cmd += ['-outfile', output_path, input_path]
+            self.run_tool(cmd, self.image_tool_timeout(input_path), self.log_to_image_terminal, check=True)
             return True
         except:
             return False
 
-    def compress_png_pngquant(self, input_path, output_path, quality):
-        """Compress PNG using pngquant"""
+    def compress_png_oxipng(self, input_path, output_path, effort=None):
+        """Compress PNG using OxiPNG at the given effort tier (PNG_EFFORT_TIERS entry)"""
         try:
-            pngquant_path = str(self.engine_dir / 'pngquant.exe')
+            effort = effort or PNG_EFFORT_TIERS['balanced']
+            oxipng_path = self.engines.path('oxipng')
+            cmd = [oxipng_path, '-o', str(effort['oxipng_level']), '-i', '0', '--strip', 'safe']
+            if effort.get('zopfli'):
+                cmd.append('--zopfli')
+            if effort.get('threads'):
+                cmd += ['-t', str(effort['threads'])]
+            cmd += ['--out', output_path, input_path]
+            factor = ZOPFLI_TIMEOUT_FACTOR if effort.get('zopfli') else 1
+            self.run_tool(cmd, self.image_tool_timeout(input_path, factor), self.log_to_image_terminal, check=True)
+            return True
+        except:
+            return False
+
+    def compress_png_pngquant(self, input_path, output_path, quality, effort=None):
+        """Compress PNG using pngquant at the given effort tier (PNG_EFFORT_TIERS entry)"""
+        try:
+            effort = effort or PNG_EFFORT_TIERS['balanced']
+            pngquant_path = self.engines.path('pngquant')
             quality_min = max(1, quality - 15)
             cmd = [pngquant_path, '--quality', f'{quality_min}-{quality}',
+                   '--speed', str(effort['pngquant_speed']), '--force',
                    '--output', output_path, input_path]
-            subprocess.run(cmd, check=True, capture_output=True)
+            self.run_tool(cmd, self.image_tool_timeout(input_path), self.log_to_image_terminal, check=True)
             return True
         except:
             return False
 
-    def compress_image_pil(self, img, output_path, extension, quality):
-        """Fallback compression using PIL/Pillow"""
+    def compress_image_pil(self, img, output_path, extension, quality, meta=None):
+        """Fallback compression using PIL/Pillow (meta: source metadata for WebP/TIFF outputs)"""
+        # Multi-frame GIF/WebP/APNG must be re-encoded frame by frame, never flattened
+        if getattr(img, 'is_animated', False) and extension in ['.gif', '.webp', '.png']:
+            return self.compress_animated_pil(img, output_path, extension, quality)
+
         if extension in ['.jpg', '.jpeg']:
             img = img.convert('RGB')
             img.save(output_path, format='JPEG', quality=quality,
@@ -792,123 +2823,941 @@ class EnterpriseMediaOptimizer:
                 img = img.convert('RGB').convert('P', palette=Image.ADAPTIVE, colors=256)
             img.save(output_path, format='PNG', optimize=True, compress_level=9)
         elif extension == '.webp':
-            img.save(output_path, format='WEBP', quality=quality, method=6, optimize=True)
+            img.save(output_path, format='WEBP', quality=quality, method=6, optimize=True,
+                     **self.metadata_save_kwargs(meta, extension))
         elif extension in ['.bmp']:
             img = img.convert('RGB')
             output_path = str(Path(output_path).with_suffix('.jpg'))
             img.save(output_path, format='JPEG', quality=quality, optimize=True, progressive=True)
         elif extension in ['.tiff', '.tif']:
-            img.save(output_path, format='TIFF', compression='tiff_lzw')
+            img.save(output_path, format='TIFF', compression='tiff_lzw',
+                     **self.metadata_save_kwargs(meta, extension))
         else:
             img = img.convert('RGB')
             output_path = str(Path(output_path).with_suffix('.jpg'))
             img.save(output_path, format='JPEG', quality=quality, optimize=True)
         return output_path
 
-    def calculate_optimal_settings(self, metadata, mode):
-        width = metadata['width']
-        height = metadata['height']
-        fps = metadata['fps']
-        source_bitrate = metadata['bitrate']
+    def compress_animated_pil(self, img, output_path, extension, quality, colors=None):
+        """Re-encode an animation in its own format, streaming one frame at a time.
+
+        colors: for GIF, remap every frame to one shared palette of that size.
+        """
+        # Per-frame timing has to be collected up front; WebP only honours a list
+        durations = []
+        for idx in range(img.n_frames):
+            img.seek(idx)
+            img.load()  # WebP only reports a frame's duration once it is decoded
+            durations.append(img.info.get('duration', 100))
+        img.seek(0)
+        loop = img.info.get('loop', 0)
+
+        if extension == '.gif' and colors:
+            frames = self.shared_palette_frames(img, colors)
+            next(frames).save(output_path, format='GIF', save_all=True, append_images=frames, optimize=True,
+                              duration=durations, loop=loop)
+        elif extension == '.gif':
+            img.save(output_path, format='GIF', save_all=True, optimize=True,
+                     duration=durations, loop=loop)
+        elif extension == '.webp':
+            img.save(output_path, format='WEBP', save_all=True, quality=quality, method=6,
+                     duration=durations, loop=loop)
+        else:
+            img.save(output_path, format='PNG', save_all=True, optimize=True,
+                     duration=durations, loop=loop)
+        return output_path
 
-        should_downscale = False
-        is_portrait = height > width
+    def shared_palette_frames(self, img, colors):
+        """Yield every frame of an opaque animation remapped to one palette, without dithering.
+
+        One global palette replaces per-frame local ones, and undithered frames leave
+        unchanged areas identical, so the GIF writer can crop each frame to what moved.
+        """
+        step = max(1, img.n_frames // GIF_PALETTE_SAMPLE_FRAMES)
+        indices = list(range(0, img.n_frames, step))[:GIF_PALETTE_SAMPLE_FRAMES]
+        sheet = Image.new('RGB', (img.width, img.height * len(indices)))
+        for row, idx in enumerate(indices):
+            img.seek(idx)
+            sheet.paste(img.convert('RGB'), (0, img.height * row))
+        palette = sheet.quantize(colors, method=Image.Quantize.MEDIANCUT)
+        for idx in range(img.n_frames):
+            img.seek(idx)
+            yield img.convert('RGB').quantize(palette=palette, dither=Image.Dither.NONE)
+
+    def animation_has_alpha(self, img):
+        """Whether the first frame shows any transparent pixels."""
+        if img.mode not in ('RGBA', 'LA', 'PA') and 'transparency' not in img.info:
+            return False
+        img.seek(0)
+        return img.convert('RGBA').getchannel('A').getextrema()[0] < 255
+
+    def compress_animation(self, input_path, output_path, metadata, mode, transfers, move):
+        """Re-encode a multi-frame GIF/APNG/WebP as animated WebP, an MP4/WebM clip, or in its own format.
+
+        Follows the Animations setting; a clip that cannot be made falls back to WebP.
+        Returns a result dict (the original is kept when nothing is smaller).
+        """
+        ext = Path(input_path).suffix.lower()
+        original_size = metadata['file_size']
+        target = self.animated_output.get()
+        settings = self.get_profile_settings(mode, metadata['complexity'])
+        quality = (settings['floor'] + settings['ceiling']) // 2
+        with Image.open(input_path) as img:
+            has_alpha = self.animation_has_alpha(img)
+        self.log_to_image_terminal(f"[ROUTE] Animation -> {target.upper()}")
+
+        if target in ANIMATED_ENCODERS:
+            reason = self.animation_clip_blocker(target, ext, has_alpha)
+            if reason is None:
+                crf = ANIMATED_CRF[target][mode]
+                clip_path = str(Path(output_path).with_suffix(f".{target}"))
+                if self.encode_animation_clip(input_path, clip_path, target, crf, has_alpha):
+                    return self._finish_image_result(input_path, clip_path, original_size,
+                                                     f"FFmpeg-{ANIMATED_ENCODERS[target]}", crf, transfers, move)
+                reason = "encode failed"
+            self.log_to_image_terminal(f"[WARN] No {target.upper()} clip ({reason}). Using animated WebP.")
+            target = 'webp'
+
+        with Image.open(input_path) as img:
+            if target == 'webp':
+                output_path = self.compress_animated_pil(img, str(Path(output_path).with_suffix('.webp')),
+                                                         '.webp', quality)
+                method = "WebP-Anim"
+            else:
+                colors = GIF_PALETTE_COLORS.get(mode) if ext == '.gif' and not has_alpha else None
+                output_path = self.compress_animated_pil(img, output_path, ext, quality, colors)
+                method = {'.gif': "GIF", '.png': "APNG"}.get(ext, "WebP-Anim")
+                if colors:
+                    self.log_to_image_terminal(f"[GIF] Shared {colors}-colour palette")
+        return self._finish_image_result(input_path, output_path, original_size, method, quality, transfers, move)
+
+    def animation_clip_blocker(self, target, ext, has_alpha):
+        """Why an animation cannot become an MP4/WebM clip here, or None if it can."""
+        if not self.has_ffmpeg:
+            return "ffmpeg not found"
+        if ext == '.webp':
+            return "ffmpeg cannot decode animated WebP"
+        if target == 'mp4' and has_alpha:
+            return "MP4 has no transparency"
+        if not self.engines.has_feature('ffmpeg', ANIMATED_ENCODERS[target]):
+            return f"ffmpeg has no {ANIMATED_ENCODERS[target]}"
+        return None
 
-        if max(width, height) > 3840:
-            should_downscale = True
-            orientation = "Portrait" if is_portrait else "Landscape"
-            self.log_to_video_terminal(f"[WARN] High Resolution ({orientation}) Detected. Downscaling to 1080p for GPU compatibility.")
+    def encode_animation_clip(self, input_path, output_path, target, crf, has_alpha):
+        """Encode a GIF/APNG to a silent MP4 (x264) or WebM (VP9) clip."""
+        ffmpeg_path = self.engines.path('ffmpeg')
+        # 4:2:0 needs even dimensions; one thread matches the image slot this runs in
+        cmd = [ffmpeg_path, '-y', '-i', input_path, '-an', '-threads', '1',
+               '-vf', 'scale=trunc(iw/2)*2:trunc(ih/2)*2']
+        if target == 'mp4':
+            cmd += ['-c:v', 'libx264', '-crf', str(crf), '-preset', 'slow', '-pix_fmt', 'yuv420p',
+                    '-movflags', '+faststart']
+        else:
+            cmd += ['-c:v', 'libvpx-vp9', '-crf', str(crf), '-b:v', '0',
+                    '-pix_fmt', 'yuva420p' if has_alpha else 'yuv420p']
+        cmd.append(output_path)
+        process = self.run_tool(cmd, self.image_tool_timeout(input_path), self.log_to_image_terminal)
+        if process.returncode == 0 and os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+            return True
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        return False
 
-        # Determine resolution category
-        if width >= 3840 or height >= 2160: res_cat = '4k'
-        elif width >= 1920 or height >= 1080: res_cat = '1080p'
-        elif width >= 1280 or height >= 720: res_cat = '720p'
-        else: res_cat = 'default'
+    # =========================================================================
+    # METADATA POLICY
+    # =========================================================================
 
-        # Calculate source quality indicator (bits per pixel per frame)
-        pixels = width * height
-        bpp = (source_bitrate / (pixels * fps)) if (pixels > 0 and fps > 0) else 0
-        
-        # Determine source quality level
-        # High quality: bpp > 0.15, Medium: 0.08-0.15, Low: < 0.08
-        if bpp > 0.15:
-            source_quality = "high"
-        elif bpp > 0.08:
-            source_quality = "medium"
+    def policy_drops_metadata(self, source_meta):
+        """True when the metadata policy would remove blocks the source carries."""
+        policy = self.metadata_policy.get()
+        if policy == 'all':
+            return False
+        return bool(source_meta['exif'] or source_meta['xmp'] or source_meta['text']
+                    or (policy == 'strip' and source_meta['icc']))
+
+    def read_image_metadata(self, img):
+        """Collect the metadata blocks the policy stage may carry over (header only, no decode)."""
+        orientation = img.getexif().get(EXIF_ORIENTATION, 1)
+        if orientation not in JPEGTRAN_TRANSFORMS:
+            orientation = 1
+
+        exif = img.info.get('exif')
+        if exif and exif.startswith(b'Exif\x00\x00'):
+            exif = exif[6:]
+        if exif and orientation != 1:
+            exif = self._reset_exif_orientation(exif)
+
+        xmp = img.info.get('xmp') or img.info.get('XML:com.adobe.xmp')
+        if isinstance(xmp, str):
+            xmp = xmp.encode('utf-8')
+
+        text = {}
+        if img.format == 'PNG':
+            text = {k: v for k, v in img.info.items()
+                    if isinstance(v, str) and k not in ('xmp', 'XML:com.adobe.xmp')}
+
+        return {'orientation': orientation, 'icc': img.info.get('icc_profile') or None,
+                'exif': exif or None, 'xmp': xmp or None, 'text': text}
+
+    def _reset_exif_orientation(self, tiff):
+        """Set the orientation tag of raw EXIF (TIFF) bytes to 1, leaving everything else as is."""
+        try:
+            order = '<' if tiff[:2] == b'II' else '>'
+            ifd = struct.unpack(order + 'I', tiff[4:8])[0]
+            count = struct.unpack(order + 'H', tiff[ifd:ifd + 2])[0]
+            data = bytearray(tiff)
+            for i in range(count):
+                entry = ifd + 2 + i * 12
+                if struct.unpack(order + 'H', tiff[entry:entry + 2])[0] == EXIF_ORIENTATION:
+                    data[entry + 8:entry + 10] = struct.pack(order + 'H', 1)
+            return bytes(data)
+        except struct.error:
+            return tiff
+
+    def orient_image(self, img, metadata, output_path):
+        """Bake EXIF orientation into the pixels.
+
+        Returns (upright image, path external engines should read). The path is a
+        lossless temporary file next to the output when the pixels had to move.
+        """
+        ext = Path(output_path).suffix.lower()
+        if metadata['orientation'] == 1 or metadata['is_animated']:
+            return img, None
+        img = ImageOps.exif_transpose(img)
+        if ext in ['.jpg', '.jpeg']:
+            # cjpeg reads PPM/PGM directly
+            temp_path = str(Path(output_path).with_suffix('.oriented.ppm'))
+            img.convert('L' if img.mode in ('1', 'L') else 'RGB').save(temp_path, format='PPM')
+        elif ext == '.png':
+            temp_path = str(Path(output_path).with_suffix('.oriented.png'))
+            img.save(temp_path, format='PNG', compress_level=1)
         else:
-            source_quality = "low"
-
-        # For AUTO mode, dynamically adjust based on source quality
-        if mode == 'auto':
-            self.log_to_video_terminal(f"[ANALYZE] Source Quality: {source_quality.upper()} (BPP: {bpp:.3f})")
-            
-            if source_quality == 'low':
-                # Poor quality source - be very gentle, minimal compression
-                mode = 'quality'  # Use quality preset
-                self.log_to_video_terminal("[DECISION] Low quality source detected. Using gentle compression.")
-            elif source_quality == 'medium':
-                # Medium quality - use balanced compression
-                mode = 'balanced'
-                self.log_to_video_terminal("[DECISION] Medium quality source. Using balanced compression.")
+            return img, None
+        return img, temp_path
+
+    def metadata_save_kwargs(self, meta, extension):
+        """Pillow save() arguments that embed metadata per the policy (WebP/TIFF outputs)."""
+        policy = self.metadata_policy.get()
+        kwargs = {}
+        if extension in ['.tiff', '.tif']:
+            kwargs['icc_profile'] = meta['icc'] if meta and policy != 'strip' else None
+        elif extension == '.webp' and meta:
+            if policy != 'strip' and meta['icc']:
+                kwargs['icc_profile'] = meta['icc']
+            if policy == 'all':
+                if meta['exif']:
+                    kwargs['exif'] = meta['exif']
+                if meta['xmp']:
+                    kwargs['xmp'] = meta['xmp']
+        return kwargs
+
+    def apply_metadata_policy(self, output_path, meta):
+        """Rewrite the metadata of a finished JPEG/PNG so every engine ends up with the same blocks.
+
+        Only container segments/chunks are touched; image data is copied byte for byte.
+        """
+        ext = Path(output_path).suffix.lower()
+        if meta is None or ext not in ['.jpg', '.jpeg', '.png']:
+            return
+        policy = self.metadata_policy.get()
+        try:
+            with open(output_path, 'rb') as f:
+                data = f.read()
+            if ext == '.png':
+                data = self._splice_png_metadata(data, meta, policy)
             else:
-                # High quality source - can compress more aggressively
-                mode = 'balanced'
-                self.log_to_video_terminal("[DECISION] High quality source. Using standard compression.")
+                data = self._splice_jpeg_metadata(data, meta, policy)
+            if data:
+                with open(output_path, 'wb') as f:
+                    f.write(data)
+        except OSError as e:
+            self.log_to_image_terminal(f"[WARN] Metadata policy not applied: {e}")
+
+    def _splice_jpeg_metadata(self, data, meta, policy):
+        if data[:2] != b'\xff\xd8':
+            return None
+        segments = []
+        if policy == 'all' and meta['exif']:
+            segments.append((0xE1, b'Exif\x00\x00' + meta['exif']))
+        if policy == 'all' and meta['xmp']:
+            segments.append((0xE1, XMP_JPEG_HEADER + meta['xmp']))
+        if policy != 'strip' and meta['icc']:
+            chunk = 65519
+            parts = [meta['icc'][i:i + chunk] for i in range(0, len(meta['icc']), chunk)]
+            for idx, part in enumerate(parts):
+                segments.append((0xE2, b'ICC_PROFILE\x00' + bytes([idx + 1, len(parts)]) + part))
+        new_segments = [b'\xff' + bytes([marker]) + struct.pack('>H', len(body) + 2) + body
+                        for marker, body in segments if len(body) + 2 <= 0xFFFF]
+
+        # Keep JFIF (APP0) first and Adobe (APP14, colour transform) anywhere; drop other APPn and comments
+        head, kept, pos = [], [], 2
+        while pos + 4 <= len(data) and data[pos] == 0xFF:
+            marker = data[pos + 1]
+            if marker == 0xDA:  # Start of scan: entropy-coded data follows
+                break
+            length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+            segment = data[pos:pos + 2 + length]
+            if marker == 0xE0 and not kept:
+                head.append(segment)
+            elif not (0xE1 <= marker <= 0xEF and marker != 0xEE) and marker != 0xFE:
+                kept.append(segment)
+            pos += 2 + length
+        return b'\xff\xd8' + b''.join(head + new_segments + kept) + data[pos:]
+
+    def _splice_png_metadata(self, data, meta, policy):
+        if data[:8] != b'\x89PNG\r\n\x1a\n':
+            return None
 
-        crf_map = {
-            'fast': {'4k': 23, '1080p': 23, '720p': 23, 'default': 23},
-            'balanced': {'4k': 20, '1080p': 20, '720p': 21, 'default': 22},
-            'quality': {'4k': 18, '1080p': 18, '720p': 19, 'default': 20},
-            'maximum': {'4k': 28, '1080p': 28, '720p': 30, 'default': 30}
-        }
+        def chunk(chunk_type, body):
+            return struct.pack('>I', len(body)) + chunk_type + body + struct.pack('>I', zlib.crc32(chunk_type + body))
+
+        new_chunks = []
+        if policy != 'strip' and meta['icc']:
+            new_chunks.append(chunk(b'iCCP', b'icc\x00\x00' + zlib.compress(meta['icc'], 9)))
+        if policy == 'all':
+            if meta['exif']:
+                new_chunks.append(chunk(b'eXIf', meta['exif']))
+            if meta['xmp']:
+                new_chunks.append(chunk(b'iTXt', b'XML:com.adobe.xmp\x00\x00\x00\x00\x00' + meta['xmp']))
+            for key, value in meta['text'].items():
+                keyword = key.encode('latin-1', 'replace')[:79]
+                if keyword:
+                    new_chunks.append(chunk(b'tEXt', keyword + b'\x00' + value.encode('latin-1', 'replace')))
+
+        out, pos = [data[:8]], 8
+        while pos + 8 <= len(data):
+            length, chunk_type = struct.unpack('>I4s', data[pos:pos + 8])
+            end = pos + 12 + length
+            # An embedded ICC profile replaces the sRGB shortcut chunk
+            drop = chunk_type in PNG_METADATA_CHUNKS or (chunk_type == b'sRGB' and policy != 'strip' and meta['icc'])
+            if not drop:
+                out.append(data[pos:end])
+            if chunk_type == b'IHDR':
+                out.extend(new_chunks)
+            pos = end
+        return b''.join(out)
 
-        crf = crf_map[mode][res_cat]
-        
-        # For low quality sources, use even lower CRF (better quality)
-        if source_quality == 'low':
-            crf = max(crf - 3, 15)  # Lower CRF = better quality
-            self.log_to_video_terminal(f"[ADJUST] CRF reduced to {crf} to preserve quality")
-        
-        preset_map = {'fast': 'veryfast', 'balanced': 'medium', 'quality': 'slow', 'maximum': 'slow'}
-        preset = preset_map[mode]
+    # =========================================================================
+    # WATCH MODE
+    # =========================================================================
+
+    def _watch_loop(self, watcher, stop_event, process_batch, log):
+        """Poll until stopped, handing each group of settled files to process_batch.
+
+        process_batch returns the files it finished, which are the only ones recorded as done.
+        """
+        log(f"[WATCH] Watching {watcher.folder} (poll {WATCH_POLL_SECONDS:.0f}s, settle {WATCH_SETTLE_SECONDS:.0f}s)")
+        while not stop_event.is_set():
+            try:
+                ready = watcher.poll()
+                if ready:
+                    log(f"\n[WATCH] {len(ready)} new/changed file(s) ready.")
+                    # Only files that were actually processed; the rest come back on the next start
+                    watcher.mark_done(process_batch(ready))
+            except Exception as e:
+                log(f"[ERR] Watch cycle failed: {e}")
+            stop_event.wait(WATCH_POLL_SECONDS)
+        log("[WATCH] Stopped.")
+
+    def toggle_image_watch(self):
+        if self.image_watch_stop is not None:
+            self.image_watch_stop.set()
+            self.image_watch_btn.config(state='disabled', text="Stopping...")
+            return
+        if self.busy['images']: return
+        if not self.batch_input_folder.get() or not self.batch_output_folder.get():
+            messagebox.showerror("Error", "Select image and output folder.")
+            return
+        if self.batch_input_folder.get() == self.batch_output_folder.get():
+            messagebox.showerror("Error", "Input and Output folders must be different.")
+            return
+
+        self.busy['images'] = True
+        self.set_pipeline_status('images', "watching")
+        self.image_watch_stop = threading.Event()
+        self.batch_compress_btn.config(state='disabled')
+        self.image_watch_btn.config(text="Stop Watching")
+        threading.Thread(target=self._image_watch_worker, args=(self.image_watch_stop,), daemon=True).start()
+
+    def _image_watch_worker(self, stop_event):
+        try:
+            out_dir = Path(self.batch_output_folder.get())
+            out_dir.mkdir(parents=True, exist_ok=True)
+            mode = self.image_compression_mode.get()
+            watcher = FolderWatcher(self.batch_input_folder.get(), IMAGE_EXTENSIONS,
+                                    out_dir / ".shrinkify_watch_images.json")
+
+            def process_batch(files):
+                batch = self.run_image_batch(files, out_dir, mode, stop_event)
+                saved = batch['total_orig'] - batch['total_new']
+                self.log_to_image_terminal(f"[WATCH] Batch done: {batch['compressed']} compressed, {batch['failed']} failed, saved {self.format_bytes(saved)}")
+                self.set_pipeline_status('images', "watching")
+                return batch['finished']
+
+            self._watch_loop(watcher, stop_event, process_batch, self.log_to_image_terminal)
+        except Exception as e:
+            self.log_to_image_terminal(f"[FATAL] {str(e)}")
+        finally:
+            self.busy['images'] = False
+            self.set_pipeline_status('images', "idle")
+            self.image_watch_stop = None
+            self.root.after(0, lambda: self.batch_compress_btn.config(state='normal'))
+            self.root.after(0, lambda: self.image_watch_btn.config(state='normal', text="Watch Folder"))
+
+    def toggle_video_watch(self):
+        if self.video_watch_stop is not None:
+            self.video_watch_stop.set()
+            self.video_watch_btn.config(state='disabled', text="Stopping...")
+            return
+        if self.busy['videos']: return
+        if not self.video_input_folder.get() or not self.video_output_folder.get():
+            messagebox.showerror("Error", "Please select input and output folders.")
+            return
+        if self.video_input_folder.get() == self.video_output_folder.get():
+            messagebox.showerror("Error", "Input and Output folders must be different.")
+            return
+
+        self.busy['videos'] = True
+        self.set_pipeline_status('videos', "watching")
+        self.video_watch_stop = threading.Event()
+        self.video_compress_btn.config(state='disabled')
+        self.video_watch_btn.config(text="Stop Watching")
+        threading.Thread(target=self._video_watch_worker, args=(self.video_watch_stop,), daemon=True).start()
+
+    def _video_watch_worker(self, stop_event):
+        try:
+            output_folder = Path(self.video_output_folder.get())
+            output_folder.mkdir(parents=True, exist_ok=True)
+            mode = self.video_compression_mode.get()
+            watcher = FolderWatcher(self.video_input_folder.get(), VIDEO_EXTENSIONS,
+                                    output_folder / ".shrinkify_watch_videos.json")
+
+            def process_batch(files):
+                temp_work_folder = output_folder / "_temp_work"
+                temp_work_folder.mkdir(exist_ok=True)
+                files, _ = self.plan_by_cost(files, lambda f: self.estimate_video_cost(f, mode))
+                finished = []
+                for video_path in files:
+                    if stop_event.is_set():
+                        break
+                    self.log_to_video_terminal(f"\n[VIDEO] Processing: {video_path.name}")
+                    self.set_pipeline_status('videos', video_path.name)
+                    result = self.process_video_file(video_path, output_folder, temp_work_folder, mode)
+                    self.log_to_video_terminal(f"[WATCH] {video_path.name}: {result['status'].upper()}")
+                    finished.append(video_path)
+                self.set_pipeline_status('videos', "watching")
+                try: temp_work_folder.rmdir()
+                except: pass
+                return finished
+
+            self._watch_loop(watcher, stop_event, process_batch, self.log_to_video_terminal)
+        except Exception as e:
+            self.log_to_video_terminal(f"[FATAL] {str(e)}")
+        finally:
+            self.busy['videos'] = False
+            self.set_pipeline_status('videos', "idle")
+            self.video_watch_stop = None
+            self.root.after(0, lambda: self.video_compress_btn.config(state='normal'))
+            self.root.after(0, lambda: self.video_watch_btn.config(state='normal', text="Watch Folder"))
+
+    # =========================================================================
+    # WATCHDOG
+    # =========================================================================
+
+    def run_tool(self, cmd, timeout=None, log=None, check=False, progress=False):
+        """Run an external tool under the watchdog, returning a CompletedProcess.
+
+        The tool gets its own process group and is killed with everything it
+        spawned once it runs past timeout seconds or, for ffmpeg with
+        progress=True, once its reported position and output size stop moving
+        for STALL_SECONDS. The result's 'killed' is then 'timeout' or 'stall'
+        (None otherwise) and the kill is logged and kept in watchdog_events.
+        A job that is cancelled stops its tool the same way ('cancelled').
+        """
+        if progress:
+            cmd = [cmd[0], '-nostats', '-progress', 'pipe:1'] + cmd[1:]
+        if os.name == 'nt':
+            group = {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            group = {'start_new_session': True}
+
+        start = time.monotonic()
+        last_progress = [start]
+        stdout, stderr = [], []
+        proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE, **group)
+
+        def read_progress(stream):
+            seen = {}
+            for line in stream:
+                key, _, value = line.strip().partition(b'=')
+                if key in (b'out_time_us', b'total_size') and seen.get(key) != value:
+                    seen[key] = value
+                    last_progress[0] = time.monotonic()
+
+        readers = [threading.Thread(target=read_progress if progress else lambda s: stdout.append(s.read()),
+                                    args=(proc.stdout,), daemon=True),
+                   threading.Thread(target=lambda s: stderr.append(s.read()), args=(proc.stderr,), daemon=True)]
+        for reader in readers:
+            reader.start()
+
+        killed = None
+        cancel = getattr(self._tool_cancel, 'event', None)
+        while proc.poll() is None:
+            now = time.monotonic()
+            if timeout and now - start > timeout:
+                killed = 'timeout'
+            elif progress and now - last_progress[0] > STALL_SECONDS:
+                killed = 'stall'
+            elif cancel is not None and cancel.is_set():
+                killed = 'cancelled'
+            if killed:
+                kill_process_tree(proc)
+                break
+            try:
+                proc.wait(timeout=WATCHDOG_POLL_SECONDS)
+            except subprocess.TimeoutExpired:
+                pass
+        proc.wait()
+        for reader in readers:
+            reader.join(WATCHDOG_POLL_SECONDS)
+        if any(reader.is_alive() for reader in readers):
+            # Something the tool spawned outlived it and still holds its output pipes
+            kill_process_tree(proc)
+            for reader in readers:
+                reader.join()
+
+        result = subprocess.CompletedProcess(cmd, proc.returncode, b''.join(stdout), b''.join(stderr))
+        result.killed = killed
+        if killed == 'cancelled':
+            if log:
+                log(f"[STOP] Cancelled {Path(cmd[0]).stem}.")
+        elif killed:
+            target = cmd[cmd.index('-i') + 1] if '-i' in cmd else cmd[-1]
+            event = {'path': cmd[0], 'tool': Path(cmd[0]).stem, 'target': Path(target).name,
+                     'reason': killed, 'seconds': time.monotonic() - start, 'time': time.time()}
+            self.watchdog_events.append(event)
+            if log:
+                log(f"[WATCHDOG] Killed {event['tool']} on {event['target']}: "
+                    f"{'no progress' if killed == 'stall' else 'timed out'} after {event['seconds']:.0f}s")
+        if check and result.returncode != 0:
+            raise subprocess.CalledProcessError(result.returncode, cmd, result.stdout, result.stderr)
+        return result
+
+    def image_tool_timeout(self, input_path, factor=1):
+        """Deadline for an image tool: a base allowance plus time per decoded megapixel."""
+        megapixels = (self.estimate_image_cost(input_path) or 0) / 1e6
+        return TOOL_BASE_TIMEOUT + megapixels * IMAGE_SECONDS_PER_MEGAPIXEL * factor
+
+    def video_tool_timeout(self, metadata, settings=None):
+        """Deadline for an ffmpeg encode, in clip durations scaled by resolution and preset.
+
+        Returns None when the duration is unknown; stall detection still applies.
+        """
+        if not metadata or metadata['duration'] <= 0:
+            return None
+        scale = max(1.0, metadata['width'] * metadata['height'] / DOWNSCALE_PIXELS)
+        preset = X264_PRESET_COST.get(settings['preset'], 1.0) if settings else 1.0
+        return TOOL_BASE_TIMEOUT + metadata['duration'] * VIDEO_TIMEOUT_REALTIME * scale * max(preset, 1.0)
+
+    def remux_timeout(self, input_path):
+        """Deadline for a stream copy, which only has to move the file's bytes."""
+        return TOOL_BASE_TIMEOUT + os.path.getsize(input_path) / REMUX_BYTES_PER_SECOND
+
+    def record_history(self, pipeline, source, profile, started, **fields):
+        """Add one processed file to the results history (never fails the file)."""
+        if self.history is None:
+            return
+        try:
+            self.history.record(pipeline=pipeline, source=os.path.abspath(source), profile=profile,
+                                seconds=time.time() - started, **fields)
+        except Exception as e:
+            print(f"[WARN] Could not record history for {source}: {e}")
+
+    def source_hash(self, path):
+        try:
+            return self.hash_file(path)
+        except OSError:
+            return None
+
+    def log_watchdog_summary(self, tools, since, log):
+        paths = {self.engines.path(name) for name in tools}
+        events = [e for e in self.watchdog_events if e['path'] in paths and e['time'] >= since]
+        if events:
+            listed = ", ".join(f"{e['target']} ({e['tool']} {e['reason']})" for e in events[:10])
+            log(f"[WATCHDOG] {len(events)} hung tool runs killed: {listed}{' ...' if len(events) > 10 else ''}")
+
+    # =========================================================================
+    # FILE TRANSFER
+    # =========================================================================
+
+    def transfer_file(self, source, dest, stats=None, move=False):
+        """Place a byte-identical copy of source at dest as cheaply as the filesystem allows.
+
+        Tries a rename (when move is set), a copy-on-write reflink, a hardlink,
+        a kernel-side copy (copy_file_range / sendfile) and finally a plain
+        copy. Returns the method used.
+        """
+        source, dest = str(source), str(dest)
+        if os.path.abspath(source) == os.path.abspath(dest):
+            return 'none'
+        nbytes = os.path.getsize(source)
+        start = time.perf_counter()
+        if os.path.lexists(dest):
+            os.remove(dest)
+
+        method = None
+        if move:
+            try:
+                os.replace(source, dest)
+                method = 'move'
+            except OSError:
+                pass  # Different filesystem: copy below, then drop the source
+        if method is None:
+            method = self._reflink(source, dest)
+        if method is None:
+            try:
+                os.link(source, dest)
+                method = 'link'
+            except OSError:
+                pass
+        if method is None:
+            method = self._kernel_copy(source, dest, nbytes)
+        if method is None:
+            shutil.copyfile(source, dest)
+            method = 'copy'
+        if method != 'move':
+            if method != 'link':
+                shutil.copystat(source, dest)
+            if move:
+                os.remove(source)
+                method = f"move/{method}"
+
+        if stats is not None:
+            stats.record(method, nbytes, time.perf_counter() - start)
+        return method
+
+    def _reflink(self, source, dest):
+        """Clone source's extents into a new dest file (Linux CoW filesystems only)."""
+        try:
+            import fcntl
+        except ImportError:
+            return None
+        try:
+            with open(source, 'rb') as src, open(dest, 'wb') as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return 'reflink'
+        except OSError:
+            if os.path.exists(dest):
+                os.remove(dest)
+            return None
+
+    def _kernel_copy(self, source, dest, nbytes):
+        """Copy without moving the data through Python (copy_file_range, then sendfile)."""
+        for method in ('copy_file_range', 'sendfile'):
+            if not hasattr(os, method):
+                continue
+            try:
+                with open(source, 'rb') as src, open(dest, 'wb') as dst:
+                    offset = 0
+                    while offset < nbytes:
+                        if method == 'copy_file_range':
+                            sent = os.copy_file_range(src.fileno(), dst.fileno(), nbytes - offset)
+                        else:
+                            sent = os.sendfile(dst.fileno(), src.fileno(), offset, nbytes - offset)
+                        if sent == 0:
+                            break
+                        offset += sent
+                if offset == nbytes:
+                    return method
+            except OSError:
+                pass
+            if os.path.exists(dest):
+                os.remove(dest)
+        return None
+
+    def release_output(self, output_path, source):
+        """Unlink a previous output before it is rewritten.
+
+        Encoders truncate their output in place, which would also rewrite the
+        original if an earlier run linked the output to it.
+        """
+        if os.path.abspath(output_path) == os.path.abspath(source):
+            return
+        try:
+            if os.path.lexists(output_path):
+                os.remove(output_path)
+        except OSError:
+            pass
 
-        target_fps = fps
-        if mode == 'maximum' and fps > 30: target_fps = 30
+    def log_transfer_summary(self, stats, log):
+        summary = stats.summary(self.format_bytes)
+        if summary:
+            log(f"[TRANSFER] {summary}")
 
-        audio_bitrate = min(metadata.get('audio_bitrate', 128000), 128000)
-        if mode == 'maximum': audio_bitrate = 96000
+    # =========================================================================
+    # DEDUPLICATION
+    # =========================================================================
 
-        # Adjust reduction factor based on source quality
-        reduction_factors = {'fast': 0.80, 'balanced': 0.70, 'quality': 0.85, 'maximum': 0.50}
-        factor = reduction_factors[mode]
-        
-        # For low quality sources, don't compress as much
-        if source_quality == 'low':
-            factor = min(factor + 0.15, 0.95)  # Less reduction
-            self.log_to_video_terminal(f"[ADJUST] Reduction factor set to {int(factor*100)}% to preserve quality")
+    def hash_file(self, path, chunk_size=1024 * 1024):
+        """Content hash of a file, read in chunks so large videos stay out of memory."""
+        digest = hashlib.blake2b(digest_size=20)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def perceptual_hash(self, path):
+        """64-bit difference hash (dHash) of an image's luma."""
+        with Image.open(path) as img:
+            img.draft('L', (64, 64))  # JPEGs decode at a fraction of full size
+            px = list(img.convert('L').resize((9, 8), Image.BOX).tobytes())
+        bits = 0
+        for row in range(8):
+            for col in range(8):
+                bits = (bits << 1) | (px[row * 9 + col] > px[row * 9 + col + 1])
+        return bits
+
+    def find_duplicates(self, files, perceptual=False, max_distance=4):
+        """Split files into unique items and duplicates of them.
+
+        Byte-identical files are found by size, then content hash. With
+        perceptual=True, images of the same dimensions whose dHash differs by at
+        most max_distance bits are treated as re-saved copies of the largest one.
+        Returns (unique_files, {duplicate: representative}).
+        """
+        duplicates = {}
+        by_size = {}
+        for f in files:
+            by_size.setdefault(os.path.getsize(f), []).append(f)
+
+        for group in by_size.values():
+            if len(group) < 2:
+                continue  # A unique size cannot have a byte-identical twin
+            by_hash = {}
+            for f in group:
+                by_hash.setdefault(self.hash_file(f), []).append(f)
+            for same in by_hash.values():
+                for dup in same[1:]:
+                    duplicates[dup] = same[0]
+
+        if perceptual:
+            representatives = {}  # (width, height) -> [(dhash, file)]
+            candidates = sorted((f for f in files if f not in duplicates), key=os.path.getsize, reverse=True)
+            for f in candidates:
+                try:
+                    with Image.open(f) as img:
+                        dims = img.size
+                    dhash = self.perceptual_hash(f)
+                except Exception:
+                    continue
+                bucket = representatives.setdefault(dims, [])
+                match = next((rep for rep_hash, rep in bucket if bin(rep_hash ^ dhash).count('1') <= max_distance), None)
+                if match:
+                    duplicates[f] = match
+                else:
+                    bucket.append((dhash, f))
+
+        unique = [f for f in files if f not in duplicates]
+        return unique, duplicates
+
+    def materialize_duplicates(self, duplicates, outputs, out_dir, log, stats=None):
+        """Create outputs for every duplicate from its representative's result.
+
+        Returns (count, input_bytes_skipped, output_bytes_shared).
+        """
+        count, skipped_bytes, shared_bytes = 0, 0, 0
+        for dup, rep in duplicates.items():
+            rep_output = outputs.get(rep)
+            if not rep_output or not os.path.exists(rep_output):
+                continue
+            dest = Path(out_dir) / (Path(dup).stem + Path(rep_output).suffix)
+            try:
+                how = self.transfer_file(rep_output, dest, stats)
+                count += 1
+                skipped_bytes += os.path.getsize(dup)
+                if how in TransferStats.ZERO_COPY:
+                    shared_bytes += os.path.getsize(rep_output)
+                log(f"[DEDUP] {Path(dup).name} -> {how} of {Path(rep_output).name}")
+            except Exception as e:
+                log(f"[ERR] Failed to materialize {Path(dup).name}: {e}")
+        return count, skipped_bytes, shared_bytes
 
-        max_bitrate = 0
-        buf_size = 0
+    # =========================================================================
+    # DRY RUN
+    # =========================================================================
 
-        if source_bitrate > 100000:
-            target_bitrate = int(source_bitrate * factor)
-            max_bitrate = target_bitrate
-            buf_size = target_bitrate * 2
-            self.log_to_video_terminal(f"[INFO] Source Bitrate: {source_bitrate//1000} kbps")
-            self.log_to_video_terminal(f"[DECISION] Capping output to {max_bitrate//1000} kbps")
+    def dry_run(self, kind):
+        """Estimate the selected image or video batch without writing anything."""
+        if self.busy[kind]: return
+        folder = self.batch_input_folder.get() if kind == 'images' else self.video_input_folder.get()
+        if not folder:
+            messagebox.showerror("Error", "Select an input folder.")
+            return
+        if kind == 'videos' and self.use_target_size.get() and self.target_size_bytes() is None:
+            messagebox.showerror("Error", "Enter a target size in MB greater than 0.")
+            return
+
+        self.busy[kind] = True
+        button = self.image_dry_run_btn if kind == 'images' else self.video_dry_run_btn
+        button.config(state='disabled', text="Estimating...")
+        (self.image_stats_text if kind == 'images' else self.video_stats_text).delete(1.0, tk.END)
+        threading.Thread(target=self._dry_run_worker, args=(kind, Path(folder), button), daemon=True).start()
+
+    def _dry_run_worker(self, kind, folder, button):
+        log = self.log_to_image_terminal if kind == 'images' else self.log_to_video_terminal
+        try:
+            extensions = IMAGE_EXTENSIONS if kind == 'images' else VIDEO_EXTENSIONS
+            files = [f for f in folder.iterdir() if f.is_file() and f.suffix.lower() in extensions]
+            if not files:
+                self.root.after(0, messagebox.showwarning, "Warning", "No supported files found.")
+                return
+            mode = (self.image_compression_mode if kind == 'images' else self.video_compression_mode).get()
+            self.log_estimate(self.estimate_batch(kind, files, mode), log)
+        except Exception as e:
+            self.root.after(0, messagebox.showerror, "Error", f"Estimate failed: {str(e)}")
+        finally:
+            self.busy[kind] = False
+            self.root.after(0, lambda: button.config(state='normal', text="Estimate (Dry Run)"))
+
+    def estimate_batch(self, kind, files, mode, samples=0):
+        """Predict each file's output size and processing time without touching the output folder.
+
+        Only headers are read and videos probed. With samples > 0, that many files spread
+        across the batch are really encoded into a temp folder (videos: a short mid-clip
+        cut) and their measured ratio and speed are applied to the rest. Otherwise the
+        results history for this profile is used, then the profile's target reduction
+        and default speeds. Returns a dict with per-file rows and batch totals.
+        """
+        if kind == 'images':
+            estimate_file, sample_file = self.estimate_image_file, self.sample_image
+            default_speed, lanes = IMAGE_PIXELS_PER_SECOND, IMAGE_BATCH_WORKERS
         else:
-            self.log_to_video_terminal("[INFO] Low/Unknown bitrate. Using CRF only.")
+            estimate_file, sample_file = self.estimate_video_file, self.sample_video
+            default_speed, lanes = VIDEO_PIXELS_PER_SECOND, 1
+        rows = [estimate_file(f, mode) for f in files]
+
+        measured = {}
+        candidates = sorted((row for row in rows if row['cost'] and not row['skip']),
+                            key=lambda row: row['cost'], reverse=True)
+        count = min(samples, len(candidates))
+        if count:
+            with tempfile.TemporaryDirectory(prefix="shrinkify_dry_run_") as work:
+                for i in range(count):
+                    row = candidates[i * len(candidates) // count]
+                    sample = sample_file(row, mode, Path(work))
+                    if sample:
+                        measured[row['path']] = sample
+        sampled = throughput_rates([(row['path'], row['original'], *measured[row['path']], row['cost'])
+                                    for row in rows if row['path'] in measured])
+        history = {}
+        if self.history is not None:
+            try:
+                history = self.history.rates(kind, mode)
+            except sqlite3.Error:
+                pass
+
+        for row in rows:
+            if row['skip']:
+                row.update(new=row['original'], seconds=0, basis=row['skip'])
+                continue
+            if row['path'] in measured:
+                new, seconds = measured[row['path']]
+                basis = 'sampled'
+            else:
+                ext = Path(row['path']).suffix.lower()
+                rate, basis = next(((rates[key], name) for rates, name in ((sampled, 'samples'), (history, 'history'))
+                                    for key in (ext, '*') if key in rates), (None, 'profile'))
+                new = row['original'] * (rate['ratio'] if rate else row['ratio'])
+                per_cost = rate['seconds_per_cost'] if rate and rate['seconds_per_cost'] else 1 / default_speed
+                seconds = row['cost'] * per_cost
+            row.update(new=int(min(new, row['limit'])), seconds=seconds, basis=basis)
 
         return {
-            'crf': crf, 'preset': preset, 'target_fps': target_fps,
-            'audio_bitrate': audio_bitrate // 1000, 'use_fps_filter': target_fps != fps,
-            'max_bitrate': max_bitrate, 'buf_size': buf_size,
-            'should_downscale': should_downscale, 'is_portrait': is_portrait,
-            'source_quality': source_quality
+            'kind': kind, 'mode': mode, 'files': rows, 'lanes': lanes,
+            'total_orig': sum(row['original'] for row in rows),
+            'total_new': sum(row['new'] for row in rows),
+            'seconds': sum(row['seconds'] for row in rows) / lanes,
         }
 
+    def estimate_image_file(self, path, mode):
+        original = os.path.getsize(path)
+        row = {'path': path, 'original': original, 'limit': original, 'cost': None, 'ratio': 1.0, 'skip': None}
+        metadata = self.analyze_image(str(path))
+        if not metadata:
+            row['skip'] = 'unreadable'
+            return row
+        profile = self.get_profile_settings(mode, metadata['complexity'])
+        row.update(cost=metadata['pixels'] * metadata['frames'], ratio=1 - profile['reduction'])
+        return row
+
+    def estimate_video_file(self, path, mode):
+        original = os.path.getsize(path)
+        row = {'path': path, 'original': original, 'limit': original, 'cost': None, 'ratio': 1.0, 'skip': None}
+        if self.skip_small_videos.get() and original < SMALL_VIDEO_BYTES:
+            row['skip'] = 'small'
+            return row
+        metadata = self.get_video_metadata(str(path)) if self.has_ffmpeg else None
+        if not metadata or metadata['duration'] <= 0:
+            row['skip'] = 'unreadable'
+            return row
+        settings = self.calculate_optimal_settings(metadata, mode, log=lambda message: None)
+        # Outputs at or above the source size are discarded, so the bitrate cap bounds the result
+        row.update(metadata=metadata, settings=settings, cost=self.video_cost(metadata, mode),
+                   ratio=settings['reduction_factor'], limit=min(original, self.target_size_bytes() or original))
+        return row
+
+    def sample_image(self, row, mode, work):
+        """Compress one image into the work folder; returns (new size, seconds)."""
+        self._log_buffer.lines = []  # Keep the engine log out of the estimate
+        try:
+            started = time.time()
+            with self.governor.slot(PRIORITY_IMAGES):
+                result = self.compress_image_intelligent(str(row['path']), str(work / Path(row['path']).name), mode,
+                                                         transfers=TransferStats(), move=False)
+            return (result['new_size'] if result else row['original']), time.time() - started
+        finally:
+            self._log_buffer.lines = None
 
-
+    def sample_video(self, row, mode, work):
+        """Encode a mid-clip cut and scale it to the whole clip; returns (new size, seconds) or None."""
+        metadata, settings = row['metadata'], dict(row['settings'])
+        duration = metadata['duration']
+        if settings['should_downscale'] or duration < DRY_RUN_SAMPLE_SECONDS * 2:
+            return None
+        output = work / f"{Path(row['path']).stem}.mp4"
+        settings['streams'] = self.plan_streams(metadata, settings, output.suffix)
+        cmd = self.build_ffmpeg_command(str(row['path']), str(output), metadata, settings)
+        cmd[2:2] = ['-ss', f"{(duration - DRY_RUN_SAMPLE_SECONDS) / 2:.2f}", '-t', str(DRY_RUN_SAMPLE_SECONDS)]
+        timeout = self.video_tool_timeout(dict(metadata, duration=DRY_RUN_SAMPLE_SECONDS), settings)
+        started = time.time()
+        with self.governor.slot(PRIORITY_VIDEOS, *self.video_slot_size()):
+            process = self.run_tool(cmd, timeout, progress=True)
+        elapsed = time.time() - started
+        if process.returncode != 0 or not output.exists():
+            return None
+        scale = duration / DRY_RUN_SAMPLE_SECONDS
+        return os.path.getsize(output) * scale, elapsed * scale
+
+    def log_estimate(self, estimate, log):
+        files = estimate['files']
+        log(f"[DRY RUN] {len(files)} {estimate['kind']} | Profile: {estimate['mode'].upper()} | Nothing is written")
+        log("-" * 60)
+        for row in sorted(files, key=lambda row: row['seconds'], reverse=True):
+            saved = (row['original'] - row['new']) / row['original'] * 100 if row['original'] else 0
+            log(f"{Path(row['path']).name}: {self.format_bytes(row['original'])} -> ~{self.format_bytes(row['new'])} "
+                f"(-{saved:.0f}%) | ~{self.format_duration(row['seconds'])} [{row['basis']}]")
+        total_orig, total_new = estimate['total_orig'], estimate['total_new']
+        saved = (total_orig - total_new) / total_orig * 100 if total_orig else 0
+        basis = {}
+        for row in files:
+            basis[row['basis']] = basis.get(row['basis'], 0) + 1
+        log("-" * 60)
+        log(f"[ESTIMATE] {self.format_bytes(total_orig)} -> ~{self.format_bytes(total_new)} "
+            f"(Saved ~{self.format_bytes(total_orig - total_new)}, {saved:.0f}%)")
+        lanes = f" with {estimate['lanes']} workers" if estimate['lanes'] > 1 else ""
+        log(f"[ESTIMATE] Processing time: ~{self.format_duration(estimate['seconds'])}{lanes}")
+        log("[BASIS] " + ", ".join(f"{name}: {count}" for name, count in sorted(basis.items())))
 
     # =========================================================================
     # UI CONSTRUCTION
@@ -948,23 +3797,51 @@ class EnterpriseMediaOptimizer:
                                    font=("Segoe UI", 9, "bold"), relief=tk.FLAT, padx=10, cursor="hand2")
         self.theme_btn.pack(side=tk.RIGHT, padx=10, pady=5)
 
+        lbl = tk.Label(status_frame, text=self.engine_status_text(), font=("Segoe UI", 9),
+                 bg=self.theme["header_bg"], fg=self.theme["fg_secondary"], padx=10, pady=5)
+        lbl.is_header = True
+        lbl.pack(side=tk.LEFT)
+        self.engine_status_label = lbl
+
+        lbl = tk.Label(status_frame, text=self.pipeline_status_text(), font=("Segoe UI", 9),
+                 bg=self.theme["header_bg"], fg=self.theme["fg_secondary"], padx=10, pady=5)
+        lbl.is_header = True
+        lbl.pack(side=tk.RIGHT)
+        self.pipeline_status_label = lbl
+
+    def pipeline_status_text(self):
+        parts = [f"{name.title()}: {self.pipeline_status[name]}" for name in PIPELINES]
+        parts.append(self.governor.status())
+        return " | ".join(parts)
+
+    def set_pipeline_status(self, pipeline, text, fraction=None):
+        """Show what one pipeline is doing in the status bar, next to the shared core usage.
+
+        fraction is the share of the batch's estimated work finished, when known.
+        """
+        self.pipeline_status[pipeline] = text
+        if self.status_sinks[pipeline]:
+            self.status_sinks[pipeline](text, fraction)
+        self.root.after(0, lambda: self.pipeline_status_label.config(text=self.pipeline_status_text()))
+
+    def engine_status_text(self):
         tools = []
         tools.append(f"Pillow (✓)")
         if self.has_mozjpeg: tools.append("MozJPEG (✓)")
+        if self.has_jpegtran: tools.append("JPEGTran (✓)")
         if self.has_oxipng: tools.append("OxiPNG (✓)")
         if self.has_pngquant: tools.append("PNGQuant (✓)")
         
         if self.has_ffmpeg:
-            hw = f"({self.hw_accel_type.upper()})" if self.hw_accel_type else "(CPU)"
+            if self.engines_probing:
+                hw = "(probing...)"
+            else:
+                hw = f"({self.hw_accel_type.upper()})" if self.hw_accel_type else "(CPU)"
             tools.append(f"FFmpeg {hw} (✓)")
         else:
             tools.append("FFmpeg (Missing)")
 
-        status_text = "Active Engines: " + " | ".join(tools)
-        lbl = tk.Label(status_frame, text=status_text, font=("Segoe UI", 9),
-                 bg=self.theme["header_bg"], fg=self.theme["fg_secondary"], padx=10, pady=5)
-        lbl.is_header = True
-        lbl.pack(side=tk.LEFT)
+        return "Active Engines: " + " | ".join(tools)
 
     def setup_image_panel(self, parent):
         # Header
@@ -981,6 +3858,19 @@ class EnterpriseMediaOptimizer:
         self.create_file_input(content, "Source Folder:", self.batch_input_folder, self.browse_batch_input)
         self.create_file_input(content, "Output Folder:", self.batch_output_folder, self.browse_batch_output)
 
+        # Single Image (runs beside any batch, ahead of it in the core queue)
+        self.create_file_input(content, "Single Image:", self.single_image_path, self.browse_single_image)
+        single_frame = tk.Frame(content, bg=self.theme["panel_bg"])
+        single_frame.is_panel = True
+        single_frame.pack(fill=tk.X, pady=(0, 5))
+        self.single_compress_btn = tk.Button(single_frame, text="Compress Single Image", command=self.compress_single_image,
+                                             bg=self.theme["btn_bg"], fg=self.theme["btn_fg"], font=("Segoe UI", 9),
+                                             relief=tk.FLAT, padx=10, pady=3, cursor="hand2")
+        self.single_compress_btn.btn_type = 'primary'
+        self.single_compress_btn.pack(side=tk.LEFT)
+        tk.Label(single_frame, textvariable=self.compression_details, font=("Segoe UI", 8),
+                 bg=self.theme["panel_bg"], fg=self.theme["fg_secondary"]).pack(side=tk.LEFT, padx=10)
+
         # Settings Group
         settings_frame = tk.LabelFrame(content, text="Configuration", font=("Segoe UI", 9, "bold"), 
                                        bg=self.theme["panel_bg"], fg=self.theme["fg"], padx=10, pady=10)
@@ -1001,13 +3891,73 @@ class EnterpriseMediaOptimizer:
                            selectcolor=self.theme["panel_bg"],
                            font=("Segoe UI", 9), cursor="hand2").pack(side=tk.LEFT, padx=(0, 8))
 
+        # Metadata Policy
+        tk.Label(settings_frame, text="Metadata:", font=("Segoe UI", 9), 
+                 bg=self.theme["panel_bg"], fg=self.theme["fg"]).pack(anchor="w")
+        metadata_frame = tk.Frame(settings_frame, bg=self.theme["panel_bg"])
+        metadata_frame.pack(fill=tk.X, pady=5)
+
+        policies = [("Strip all", "strip"), ("Keep color profile", "safe"), ("Keep all", "all")]
+        for text, val in policies:
+            tk.Radiobutton(metadata_frame, text=text, variable=self.metadata_policy, value=val,
+                           command=self.save_metadata_policy,
+                           bg=self.theme["panel_bg"], fg=self.theme["fg"], 
+                           activebackground=self.theme["panel_bg"], activeforeground=self.theme["fg"],
+                           selectcolor=self.theme["panel_bg"],
+                           font=("Segoe UI", 9), cursor="hand2").pack(side=tk.LEFT, padx=(0, 8))
+
+        # Animated GIF/APNG/WebP output
+        tk.Label(settings_frame, text="Animations:", font=("Segoe UI", 9), 
+                 bg=self.theme["panel_bg"], fg=self.theme["fg"]).pack(anchor="w")
+        animated_frame = tk.Frame(settings_frame, bg=self.theme["panel_bg"])
+        animated_frame.pack(fill=tk.X, pady=5)
+
+        outputs = [("Animated WebP", "webp"), ("MP4", "mp4"), ("WebM", "webm"), ("Keep format", "keep")]
+        for text, val in outputs:
+            tk.Radiobutton(animated_frame, text=text, variable=self.animated_output, value=val,
+                           command=self.save_animated_output,
+                           bg=self.theme["panel_bg"], fg=self.theme["fg"], 
+                           activebackground=self.theme["panel_bg"], activeforeground=self.theme["fg"],
+                           selectcolor=self.theme["panel_bg"],
+                           font=("Segoe UI", 9), cursor="hand2").pack(side=tk.LEFT, padx=(0, 8))
+
         # Toggles
+        tk.Checkbutton(settings_frame, text="Quality-driven (SSIM target instead of size target)",
+                       variable=self.perceptual_target,
+                       bg=self.theme["panel_bg"], fg=self.theme["fg"], 
+                       activebackground=self.theme["panel_bg"], activeforeground=self.theme["fg"],
+                       selectcolor=self.theme["panel_bg"],
+                       font=("Segoe UI", 9), cursor="hand2").pack(anchor="w", pady=(5, 0))
+        tk.Checkbutton(settings_frame, text="Skip files that are already optimal (cheap pre-check)",
+                       variable=self.skip_optimal_images,
+                       bg=self.theme["panel_bg"], fg=self.theme["fg"], 
+                       activebackground=self.theme["panel_bg"], activeforeground=self.theme["fg"],
+                       selectcolor=self.theme["panel_bg"],
+                       font=("Segoe UI", 9), cursor="hand2").pack(anchor="w")
+        tk.Checkbutton(settings_frame, text="Compress duplicate images once (link copies)",
+                       variable=self.dedup_images,
+                       bg=self.theme["panel_bg"], fg=self.theme["fg"], 
+                       activebackground=self.theme["panel_bg"], activeforeground=self.theme["fg"],
+                       selectcolor=self.theme["panel_bg"],
+                       font=("Segoe UI", 9), cursor="hand2").pack(anchor="w")
+        tk.Checkbutton(settings_frame, text="Also treat visually identical re-saves as duplicates",
+                       variable=self.dedup_similar_images,
+                       bg=self.theme["panel_bg"], fg=self.theme["fg"], 
+                       activebackground=self.theme["panel_bg"], activeforeground=self.theme["fg"],
+                       selectcolor=self.theme["panel_bg"],
+                       font=("Segoe UI", 9), cursor="hand2").pack(anchor="w", padx=(20, 0))
         tk.Checkbutton(settings_frame, text="Move found videos to 'your_videos' folder", 
                        variable=self.copy_videos_in_image_batch,
                        bg=self.theme["panel_bg"], fg=self.theme["fg"], 
                        activebackground=self.theme["panel_bg"], activeforeground=self.theme["fg"],
                        selectcolor=self.theme["panel_bg"],
                        font=("Segoe UI", 9), cursor="hand2").pack(anchor="w", pady=(5, 0))
+        tk.Checkbutton(settings_frame, text="Move untouched originals instead of linking/copying",
+                       variable=self.move_passthrough_images,
+                       bg=self.theme["panel_bg"], fg=self.theme["fg"], 
+                       activebackground=self.theme["panel_bg"], activeforeground=self.theme["fg"],
+                       selectcolor=self.theme["panel_bg"],
+                       font=("Segoe UI", 9), cursor="hand2").pack(anchor="w")
 
         # Terminal / Process Log
         tk.Label(content, text="Process Log:", font=("Segoe UI", 9, "bold"), 
@@ -1030,7 +3980,19 @@ class EnterpriseMediaOptimizer:
                                             bg=self.theme["btn_batch"], fg="white", font=("Segoe UI", 10, "bold"),
                                             relief=tk.FLAT, padx=15, pady=10, cursor="hand2")
         self.batch_compress_btn.btn_type = 'batch'
-        self.batch_compress_btn.pack(pady=15, fill=tk.X)
+        self.batch_compress_btn.pack(pady=(15, 5), fill=tk.X)
+
+        self.image_dry_run_btn = tk.Button(content, text="Estimate (Dry Run)", command=lambda: self.dry_run('images'),
+                                           bg=self.theme["btn_bg"], fg=self.theme["btn_fg"], font=("Segoe UI", 9),
+                                           relief=tk.FLAT, padx=15, pady=5, cursor="hand2")
+        self.image_dry_run_btn.btn_type = 'primary'
+        self.image_dry_run_btn.pack(pady=(0, 5), fill=tk.X)
+
+        self.image_watch_btn = tk.Button(content, text="Watch Folder", command=self.toggle_image_watch,
+                                         bg=self.theme["btn_bg"], fg=self.theme["btn_fg"], font=("Segoe UI", 9),
+                                         relief=tk.FLAT, padx=15, pady=5, cursor="hand2")
+        self.image_watch_btn.btn_type = 'primary'
+        self.image_watch_btn.pack(pady=(0, 15), fill=tk.X)
 
 
     def setup_video_panel(self, parent):
@@ -1070,6 +4032,19 @@ class EnterpriseMediaOptimizer:
                            selectcolor=self.theme["entry_bg"],
                            font=("Segoe UI", 9), cursor="hand2").pack(side=tk.LEFT, padx=(0, 10))
 
+        # Output: one file per video, or an adaptive-streaming ladder
+        tk.Label(settings_frame, text="Web Streaming:", font=("Segoe UI", 9), bg=self.theme["panel_bg"], fg=self.theme["fg"]).pack(anchor="w")
+        streaming_frame = tk.Frame(settings_frame, bg=self.theme["panel_bg"])
+        streaming_frame.pack(fill=tk.X, pady=5)
+
+        outputs = [("Off (single file)", "off"), ("HLS ladder", "hls"), ("DASH ladder", "dash")]
+        for text, val in outputs:
+            tk.Radiobutton(streaming_frame, text=text, variable=self.streaming_output, value=val,
+                           bg=self.theme["panel_bg"], fg=self.theme["fg"], 
+                           activebackground=self.theme["panel_bg"], activeforeground=self.theme["fg"],
+                           selectcolor=self.theme["entry_bg"],
+                           font=("Segoe UI", 9), cursor="hand2").pack(side=tk.LEFT, padx=(0, 10))
+
         # Toggles
         tk.Checkbutton(settings_frame, text="Copy videos smaller than 5MB directly", variable=self.skip_small_videos,
                        bg=self.theme["panel_bg"], fg=self.theme["fg"], 
@@ -1077,12 +4052,28 @@ class EnterpriseMediaOptimizer:
                        selectcolor=self.theme["entry_bg"],
                        font=("Segoe UI", 9), cursor="hand2").pack(anchor="w", pady=(5, 0))
 
-        if self.hw_accel_type:
-            tk.Checkbutton(settings_frame, text=f"Enable Hardware Acceleration ({self.hw_accel_type.upper()})",
+        # Shown once the hardware probe (possibly still running) finds an encoder
+        hw_label = self.hw_accel_type.upper() if self.hw_accel_type else ""
+        self.hw_accel_check = tk.Checkbutton(settings_frame, text=f"Enable Hardware Acceleration ({hw_label})",
                            variable=self.use_hardware_accel, bg=self.theme["panel_bg"], fg=self.theme["fg"], 
                            activebackground=self.theme["panel_bg"], activeforeground=self.theme["fg"],
                            selectcolor=self.theme["entry_bg"],
-                           font=("Segoe UI", 9), cursor="hand2").pack(anchor="w")
+                           font=("Segoe UI", 9), cursor="hand2")
+        if self.hw_accel_type:
+            self.hw_accel_check.pack(anchor="w")
+
+        self.dedup_videos_check = tk.Checkbutton(settings_frame, text="Compress duplicate videos once (link copies)",
+                       variable=self.dedup_videos, bg=self.theme["panel_bg"], fg=self.theme["fg"], 
+                       activebackground=self.theme["panel_bg"], activeforeground=self.theme["fg"],
+                       selectcolor=self.theme["entry_bg"],
+                       font=("Segoe UI", 9), cursor="hand2")
+        self.dedup_videos_check.pack(anchor="w")
+
+        tk.Checkbutton(settings_frame, text="Move untouched originals instead of linking/copying",
+                       variable=self.move_passthrough_videos, bg=self.theme["panel_bg"], fg=self.theme["fg"], 
+                       activebackground=self.theme["panel_bg"], activeforeground=self.theme["fg"],
+                       selectcolor=self.theme["entry_bg"],
+                       font=("Segoe UI", 9), cursor="hand2").pack(anchor="w")
 
         tk.Checkbutton(settings_frame, text="Convert .ts to MP4 before compressing",
                        variable=self.convert_ts_to_mp4, bg=self.theme["panel_bg"], fg=self.theme["fg"], 
@@ -1090,6 +4081,30 @@ class EnterpriseMediaOptimizer:
                        selectcolor=self.theme["entry_bg"],
                        font=("Segoe UI", 9), cursor="hand2").pack(anchor="w")
 
+        tk.Checkbutton(settings_frame, text="Poster + seek-preview sprite (from the same encode)",
+                       variable=self.video_previews, bg=self.theme["panel_bg"], fg=self.theme["fg"], 
+                       activebackground=self.theme["panel_bg"], activeforeground=self.theme["fg"],
+                       selectcolor=self.theme["entry_bg"],
+                       font=("Segoe UI", 9), cursor="hand2").pack(anchor="w")
+
+        tk.Checkbutton(settings_frame, text="Scene-aware CRF (sample motion/detail per title)",
+                       variable=self.scene_aware_crf, bg=self.theme["panel_bg"], fg=self.theme["fg"], 
+                       activebackground=self.theme["panel_bg"], activeforeground=self.theme["fg"],
+                       selectcolor=self.theme["entry_bg"],
+                       font=("Segoe UI", 9), cursor="hand2").pack(anchor="w")
+
+        # Audio & Subtitles
+        audio_frame = tk.Frame(settings_frame, bg=self.theme["panel_bg"])
+        audio_frame.pack(fill=tk.X)
+        for text, var in [("Keep all audio/subtitle tracks", self.keep_all_streams),
+                          ("Downmix to stereo", self.downmix_audio),
+                          ("Opus in MKV", self.prefer_opus_audio)]:
+            tk.Checkbutton(audio_frame, text=text, variable=var,
+                           bg=self.theme["panel_bg"], fg=self.theme["fg"], 
+                           activebackground=self.theme["panel_bg"], activeforeground=self.theme["fg"],
+                           selectcolor=self.theme["entry_bg"],
+                           font=("Segoe UI", 9), cursor="hand2").pack(side=tk.LEFT, padx=(0, 8))
+
         # Unify Extensions Frame
         unify_frame = tk.Frame(settings_frame, bg=self.theme["panel_bg"])
         unify_frame.pack(fill=tk.X, pady=(5, 0))
@@ -1106,6 +4121,22 @@ class EnterpriseMediaOptimizer:
                                  width=6, state="readonly", font=("Segoe UI", 9))
         ext_combo.pack(side=tk.LEFT, padx=5)
 
+        # Target Size Frame
+        target_frame = tk.Frame(settings_frame, bg=self.theme["panel_bg"])
+        target_frame.pack(fill=tk.X, pady=(5, 0))
+
+        tk.Checkbutton(target_frame, text="Fit each video under (two-pass):",
+                       variable=self.use_target_size,
+                       bg=self.theme["panel_bg"], fg=self.theme["fg"], 
+                       activebackground=self.theme["panel_bg"], activeforeground=self.theme["fg"],
+                       selectcolor=self.theme["entry_bg"],
+                       font=("Segoe UI", 9), cursor="hand2").pack(side=tk.LEFT)
+        tk.Entry(target_frame, textvariable=self.target_size_mb, width=6, font=("Segoe UI", 9),
+                 bg=self.theme["entry_bg"], fg=self.theme["fg"], insertbackground=self.theme["fg"],
+                 relief=tk.FLAT).pack(side=tk.LEFT, padx=5, ipady=2)
+        tk.Label(target_frame, text="MB", font=("Segoe UI", 9),
+                 bg=self.theme["panel_bg"], fg=self.theme["fg"]).pack(side=tk.LEFT)
+
 
         # Terminal
         tk.Label(content, text="Process Log:", font=("Segoe UI", 9, "bold"), bg=self.theme["panel_bg"], fg=self.theme["fg"]).pack(anchor="w")
@@ -1125,7 +4156,19 @@ class EnterpriseMediaOptimizer:
                                             bg=self.theme["btn_video"], fg="white", font=("Segoe UI", 10, "bold"),
                                             relief=tk.FLAT, padx=15, pady=10, cursor="hand2")
         self.video_compress_btn.btn_type = 'video'
-        self.video_compress_btn.pack(pady=15, fill=tk.X)
+        self.video_compress_btn.pack(pady=(15, 5), fill=tk.X)
+
+        self.video_dry_run_btn = tk.Button(content, text="Estimate (Dry Run)", command=lambda: self.dry_run('videos'),
+                                           bg=self.theme["btn_bg"], fg=self.theme["btn_fg"], font=("Segoe UI", 9),
+                                           relief=tk.FLAT, padx=15, pady=5, cursor="hand2")
+        self.video_dry_run_btn.btn_type = 'primary'
+        self.video_dry_run_btn.pack(pady=(0, 5), fill=tk.X)
+
+        self.video_watch_btn = tk.Button(content, text="Watch Folder", command=self.toggle_video_watch,
+                                         bg=self.theme["btn_bg"], fg=self.theme["btn_fg"], font=("Segoe UI", 9),
+                                         relief=tk.FLAT, padx=15, pady=5, cursor="hand2")
+        self.video_watch_btn.btn_type = 'primary'
+        self.video_watch_btn.pack(pady=(0, 15), fill=tk.X)
 
     def create_file_input(self, parent, label_text, variable, command):
         frame = tk.Frame(parent, bg=self.theme["panel_bg"])
@@ -1147,7 +4190,7 @@ class EnterpriseMediaOptimizer:
 
     def get_video_metadata(self, video_path):
         try:
-            ffprobe_path = str(self.engine_dir / 'ffprobe.exe')
+            ffprobe_path = self.engines.path('ffprobe')
             cmd = [ffprobe_path, '-v', 'quiet', '-print_format', 'json', '-show_format', '-show_streams', video_path]
             result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', timeout=30)
             data = json.loads(result.stdout)
@@ -1172,6 +4215,17 @@ class EnterpriseMediaOptimizer:
                 size_bits = os.path.getsize(video_path) * 8
                 bitrate = int(size_bits / duration)
 
+            audio_streams = [{
+                'codec': s.get('codec_name', 'unknown'),
+                'bitrate': self.stream_bitrate(s),
+                'channels': int(s.get('channels', 2) or 2),
+                'language': s.get('tags', {}).get('language', 'und'),
+            } for s in data.get('streams', []) if s['codec_type'] == 'audio']
+            subtitle_streams = [{
+                'codec': s.get('codec_name', 'unknown'),
+                'language': s.get('tags', {}).get('language', 'und'),
+            } for s in data.get('streams', []) if s['codec_type'] == 'subtitle']
+
             return {
                 'width': int(video_stream.get('width', 0)),
                 'height': int(video_stream.get('height', 0)),
@@ -1181,13 +4235,29 @@ class EnterpriseMediaOptimizer:
                 'duration': duration,
                 'has_audio': audio_stream is not None,
                 'audio_codec': audio_stream.get('codec_name', 'none') if audio_stream else 'none',
-                'audio_bitrate': int(audio_stream.get('bit_rate', 128000)) if audio_stream and 'bit_rate' in audio_stream else 128000
+                'audio_bitrate': int(audio_stream.get('bit_rate', 128000)) if audio_stream and 'bit_rate' in audio_stream else 128000,
+                'audio_streams': audio_streams,
+                'subtitle_streams': subtitle_streams
             }
         except Exception as e:
             self.log_to_video_terminal(f"[ERROR] Metadata read failed: {e}")
             return None
 
-    def calculate_optimal_settings(self, metadata, mode):
+    def rate_source_quality(self, metadata):
+        """Return (bits per pixel per frame, 'high' / 'medium' / 'low') for a source video."""
+        pixels = metadata['width'] * metadata['height']
+        fps = metadata['fps']
+        bpp = (metadata['bitrate'] / (pixels * fps)) if (pixels > 0 and fps > 0) else 0
+
+        # High quality: bpp > 0.15, Medium: 0.08-0.15, Low: < 0.08
+        if bpp > 0.15:
+            return bpp, "high"
+        elif bpp > 0.08:
+            return bpp, "medium"
+        return bpp, "low"
+
+    def calculate_optimal_settings(self, metadata, mode, log=None):
+        log = log or self.log_to_video_terminal
         width = metadata['width']
         height = metadata['height']
         fps = metadata['fps']
@@ -1199,7 +4269,7 @@ class EnterpriseMediaOptimizer:
         if max(width, height) > 3840:
             should_downscale = True
             orientation = "Portrait" if is_portrait else "Landscape"
-            self.log_to_video_terminal(f"[WARN] High Resolution ({orientation}) Detected. Downscaling to 1080p for GPU compatibility.")
+            log(f"[WARN] High Resolution ({orientation}) Detected. Downscaling to 1080p for GPU compatibility.")
 
         # Determine resolution category
         if width >= 3840 or height >= 2160: res_cat = '4k'
@@ -1207,35 +4277,24 @@ class EnterpriseMediaOptimizer:
         elif width >= 1280 or height >= 720: res_cat = '720p'
         else: res_cat = 'default'
 
-        # Calculate source quality indicator (bits per pixel per frame)
-        pixels = width * height
-        bpp = (source_bitrate / (pixels * fps)) if (pixels > 0 and fps > 0) else 0
-        
-        # Determine source quality level
-        # High quality: bpp > 0.15, Medium: 0.08-0.15, Low: < 0.08
-        if bpp > 0.15:
-            source_quality = "high"
-        elif bpp > 0.08:
-            source_quality = "medium"
-        else:
-            source_quality = "low"
+        bpp, source_quality = self.rate_source_quality(metadata)
 
         # For AUTO mode, dynamically adjust based on source quality
         if mode == 'auto':
-            self.log_to_video_terminal(f"[ANALYZE] Source Quality: {source_quality.upper()} (BPP: {bpp:.3f})")
+            log(f"[ANALYZE] Source Quality: {source_quality.upper()} (BPP: {bpp:.3f})")
             
             if source_quality == 'low':
                 # Poor quality source - be very gentle, minimal compression
                 mode = 'quality'  # Use quality preset
-                self.log_to_video_terminal("[DECISION] Low quality source detected. Using gentle compression.")
+                log("[DECISION] Low quality source detected. Using gentle compression.")
             elif source_quality == 'medium':
                 # Medium quality - use balanced compression
                 mode = 'balanced'
-                self.log_to_video_terminal("[DECISION] Medium quality source. Using balanced compression.")
+                log("[DECISION] Medium quality source. Using balanced compression.")
             else:
                 # High quality source - can compress more aggressively
                 mode = 'balanced'
-                self.log_to_video_terminal("[DECISION] High quality source. Using standard compression.")
+                log("[DECISION] High quality source. Using standard compression.")
 
         crf_map = {
             'fast': {'4k': 23, '1080p': 23, '720p': 23, 'default': 23},
@@ -1249,10 +4308,9 @@ class EnterpriseMediaOptimizer:
         # For low quality sources, use even lower CRF (better quality)
         if source_quality == 'low':
             crf = max(crf - 3, 15)  # Lower CRF = better quality
-            self.log_to_video_terminal(f"[ADJUST] CRF reduced to {crf} to preserve quality")
+            log(f"[ADJUST] CRF reduced to {crf} to preserve quality")
         
-        preset_map = {'fast': 'veryfast', 'balanced': 'medium', 'quality': 'slow', 'maximum': 'slow'}
-        preset = preset_map[mode]
+        preset = VIDEO_MODE_PRESETS[mode]
 
         target_fps = fps
         if mode == 'maximum' and fps > 30: target_fps = 30
@@ -1267,7 +4325,7 @@ class EnterpriseMediaOptimizer:
         # For low quality sources, don't compress as much
         if source_quality == 'low':
             factor = min(factor + 0.15, 0.95)  # Less reduction
-            self.log_to_video_terminal(f"[ADJUST] Reduction factor set to {int(factor*100)}% to preserve quality")
+            log(f"[ADJUST] Reduction factor set to {int(factor*100)}% to preserve quality")
 
         max_bitrate = 0
         buf_size = 0
@@ -1276,34 +4334,338 @@ class EnterpriseMediaOptimizer:
             target_bitrate = int(source_bitrate * factor)
             max_bitrate = target_bitrate
             buf_size = target_bitrate * 2
-            self.log_to_video_terminal(f"[INFO] Source Bitrate: {source_bitrate//1000} kbps")
-            self.log_to_video_terminal(f"[DECISION] Capping output to {max_bitrate//1000} kbps")
+            log(f"[INFO] Source Bitrate: {source_bitrate//1000} kbps")
+            log(f"[DECISION] Capping output to {max_bitrate//1000} kbps")
         else:
-            self.log_to_video_terminal("[INFO] Low/Unknown bitrate. Using CRF only.")
+            log("[INFO] Low/Unknown bitrate. Using CRF only.")
 
         return {
             'crf': crf, 'preset': preset, 'target_fps': target_fps,
             'audio_bitrate': audio_bitrate // 1000, 'use_fps_filter': target_fps != fps,
             'max_bitrate': max_bitrate, 'buf_size': buf_size,
             'should_downscale': should_downscale, 'is_portrait': is_portrait,
-            'source_quality': source_quality
+            'source_quality': source_quality, 'reduction_factor': factor
         }
 
 
+    def estimate_video_cost(self, video_path, mode):
+        """Relative encode time of a video file (see video_cost); None when it cannot be probed."""
+        if self.skip_small_videos.get() and os.path.getsize(video_path) < SMALL_VIDEO_BYTES:
+            return 0
+        if not self.has_ffmpeg:
+            return None
+        metadata = self.get_video_metadata(str(video_path))
+        if not metadata or metadata['duration'] <= 0:
+            return None
+        return self.video_cost(metadata, mode)
+
+    def video_cost(self, metadata, mode):
+        """Relative encode time of a video: duration x output pixels x frame rate x preset cost.
+
+        Mirrors the choices calculate_optimal_settings will make without logging them.
+        """
+        if mode == 'auto':
+            mode = 'quality' if self.rate_source_quality(metadata)[1] == 'low' else 'balanced'
+        pixels = metadata['width'] * metadata['height']
+        if max(metadata['width'], metadata['height']) > 3840:
+            pixels = DOWNSCALE_PIXELS
+        fps = metadata['fps'] or 30
+        if mode == 'maximum':
+            fps = min(fps, 30)
+        cost = metadata['duration'] * fps * pixels * X264_PRESET_COST[VIDEO_MODE_PRESETS[mode]]
+        if self.target_size_bytes():
+            cost *= TARGET_SIZE_COST
+        return cost
+
+    def analyze_video_complexity(self, input_path, metadata):
+        """Sample frame pairs across the clip and measure motion, detail and scene cuts.
+
+        Each sample is a fast seek plus two decoded frames at COMPLEXITY_WIDTH, so
+        this costs a fraction of a second regardless of the clip's length.
+        Returns a dict with 'class', 'motion', 'detail', 'cuts', or None.
+        """
+        if np is None or metadata['duration'] <= 1 or not metadata['width']:
+            return None
+        ffmpeg_path = self.engines.path('ffmpeg')
+        width = COMPLEXITY_WIDTH
+        height = max(2, round(width * metadata['height'] / metadata['width'] / 2) * 2)
+        frame_bytes = width * height
+
+        motions, details, cuts = [], [], 0
+        for i in range(COMPLEXITY_SAMPLES):
+            timestamp = metadata['duration'] * (i + 0.5) / COMPLEXITY_SAMPLES
+            cmd = [ffmpeg_path, '-v', 'error', '-ss', f"{timestamp:.2f}", '-i', input_path,
+                   '-frames:v', '2', '-vf', f'scale={width}:{height},format=gray',
+                   '-f', 'rawvideo', '-']
+            try:
+                raw = subprocess.run(cmd, capture_output=True, timeout=30).stdout
+            except Exception:
+                continue
+            if len(raw) < 2 * frame_bytes:
+                continue
+            frames = np.frombuffer(raw[:2 * frame_bytes], dtype=np.uint8).reshape(2, height, width).astype(np.int16)
+            details.append(float(np.abs(np.diff(frames[0], axis=0)).mean() + np.abs(np.diff(frames[0], axis=1)).mean()))
+            diff = float(np.abs(frames[1] - frames[0]).mean())
+            if diff > SCENE_CUT_DIFF:
+                cuts += 1  # A cut says nothing about motion within a scene
+            else:
+                motions.append(diff)
+
+        if not details:
+            return None
+        motion = sum(motions) / len(motions) if motions else SCENE_CUT_DIFF
+        detail = sum(details) / len(details)
+
+        if motion < 0.5 and detail < 12:
+            content_class = 'static'   # Screen recordings, slides, still shots
+        elif motion < 2:
+            content_class = 'low'
+        elif motion > 8 or (motion > 5 and detail > 20):
+            content_class = 'high'     # Sports, handheld action, foliage in wind
+        else:
+            content_class = 'medium'
+        return {'class': content_class, 'motion': motion, 'detail': detail, 'cuts': cuts}
+
+    def apply_complexity(self, settings, complexity):
+        """Shift the CRF by content class so easy titles compress harder and hard ones keep detail."""
+        offset = COMPLEXITY_CRF_OFFSETS[complexity['class']]
+        settings['crf'] = max(15, min(settings['crf'] + offset, 35))
+        settings['complexity'] = complexity['class']
+        self.log_to_video_terminal(
+            f"[SCENE] {complexity['class'].upper()} | Motion: {complexity['motion']:.1f} | "
+            f"Detail: {complexity['detail']:.1f} | Cuts: {complexity['cuts']}/{COMPLEXITY_SAMPLES} -> "
+            f"CRF {'+' if offset >= 0 else ''}{offset} = {settings['crf']}")
+
+    def stream_bitrate(self, stream):
+        """Bitrate of an ffprobe stream in bits/s; MKV only stores it in BPS tags (None if unknown)."""
+        tags = stream.get('tags', {})
+        for value in (stream.get('bit_rate'), tags.get('BPS'), tags.get('BPS-eng')):
+            try:
+                if value and int(value) > 0:
+                    return int(value)
+            except ValueError:
+                pass
+        return None
+
+    def plan_streams(self, metadata, settings, container):
+        """Decide per audio/subtitle track whether to copy, re-encode or drop it.
+
+        Returns {'args': ffmpeg mapping/codec arguments, 'notes': log lines,
+        'audio_bps': estimated total audio bitrate}.
+        """
+        container = container.lower()
+        audio = metadata.get('audio_streams', [])
+        subtitles = metadata.get('subtitle_streams', [])
+        if not self.keep_all_streams.get():
+            audio, subtitles = audio[:1], []
+
+        args, notes, audio_bps = ['-map', '0:V:0'], [], 0
+        copy_codecs = AUDIO_COPY_CODECS.get(container, DEFAULT_AUDIO_COPY_CODECS)
+        use_opus = container == '.webm' or (
+            container == '.mkv' and self.prefer_opus_audio.get() and self.engines.has_feature('ffmpeg', 'libopus'))
+        downmix = self.downmix_audio.get()
+
+        for idx, track in enumerate(audio):
+            args += ['-map', f'0:a:{idx}']
+            channels = 2 if downmix else track['channels']
+            # Budget scales with channel count; settings['audio_bitrate'] is per stereo pair
+            target = settings['audio_bitrate'] * 1000 * max(1, channels / 2)
+            if use_opus:
+                target = max(48000, target * OPUS_BITRATE_FACTOR)
+            needs_downmix = downmix and track['channels'] > 2
+
+            label = f"Track {idx + 1} ({track['language']}): {track['codec']} {track['channels']}ch"
+            label += f" {track['bitrate'] // 1000}k" if track['bitrate'] else ""
+            # Unknown bitrate: trust modern lossy codecs rather than risk a bigger re-encode
+            small_enough = (track['bitrate'] <= target * AUDIO_COPY_HEADROOM if track['bitrate']
+                            else track['codec'] in EFFICIENT_AUDIO_CODECS)
+            if track['codec'] in copy_codecs and not needs_downmix and small_enough:
+                audio_bps += track['bitrate'] or target
+                args += [f'-c:a:{idx}', 'copy']
+                notes.append(f"[AUDIO] {label} -> COPY")
+                continue
+
+            codec = 'libopus' if use_opus else 'aac'
+            audio_bps += int(target)
+            args += [f'-c:a:{idx}', codec, f'-b:a:{idx}', f"{int(target) // 1000}k"]
+            if needs_downmix:
+                args += [f'-ac:a:{idx}', '2']
+            notes.append(f"[AUDIO] {label} -> {'OPUS' if use_opus else 'AAC'} {int(target) // 1000}k"
+                         f"{' stereo' if needs_downmix else ''}")
+
+        if not audio:
+            args.append('-an')
+
+        sub_target = SUBTITLE_TARGETS.get(container, 'drop')
+        kept = 0
+        for idx, track in enumerate(subtitles):
+            is_text = track['codec'] in TEXT_SUBTITLE_CODECS
+            if sub_target == 'drop' or (sub_target and not is_text):
+                notes.append(f"[SUBS] Track {idx + 1} ({track['language']}): {track['codec']} "
+                             f"cannot be stored in {container}. Dropped.")
+                continue
+            args += ['-map', f'0:s:{idx}']
+            # MKV keeps any subtitle codec except MP4's mov_text
+            codec = sub_target or ('srt' if track['codec'] == 'mov_text' else 'copy')
+            args += [f'-c:s:{kept}', codec]
+            kept += 1
+        if kept:
+            notes.append(f"[SUBS] {kept} subtitle track(s) mapped")
+
+        return {'args': args, 'notes': notes, 'audio_bps': audio_bps}
+
     def create_temp_downscaled_file(self, input_path, temp_path, is_portrait):
-        ffmpeg_path = str(self.engine_dir / 'ffmpeg.exe')
+        ffmpeg_path = self.engines.path('ffmpeg')
         scale_filter = 'scale=-2:1920' if is_portrait else 'scale=1920:-2'
         cmd = [
             ffmpeg_path, '-y', '-hwaccel', 'auto', '-i', input_path,
+            '-map', '0:V:0', '-map', '0:a?', '-map', '0:s?',
             '-vf', scale_filter, '-c:v', 'libx264', '-preset', 'ultrafast',
-            '-crf', '20', '-c:a', 'copy', temp_path
+            '-crf', '20', '-c:a', 'copy', '-c:s', 'copy', temp_path
         ]
         return cmd
 
+    def plan_ladder(self, metadata, settings):
+        """Pick the ladder rungs for a video: its own size (at most 1080p), then smaller standard sizes.
+
+        The top rung's bitrate cap is the one calculate_optimal_settings chose from the
+        source BPP (or LADDER_DEFAULT_BPP when the bitrate is unknown), scaled to the rung's
+        pixels; lower rungs scale it by pixel count ** LADDER_BITRATE_EXPONENT.
+        Returns a list of {'label', 'width', 'height', 'bitrate'}, largest first.
+        """
+        width, height = metadata['width'], metadata['height']
+        short_side = min(width, height)
+        fps = settings['target_fps'] or 30
+        source_pixels = width * height
+        base_bitrate = settings['max_bitrate'] or int(source_pixels * fps * LADDER_DEFAULT_BPP)
+
+        sides = [min(short_side, LADDER_HEIGHTS[0]) // 2 * 2]
+        for side in LADDER_HEIGHTS:
+            if side < sides[-1] * LADDER_MIN_STEP and len(sides) < LADDER_MAX_RUNGS:
+                sides.append(side)
+
+        rungs = []
+        for side in sides:
+            # Scale the short side to the rung and keep both dimensions even for 4:2:0
+            long_side = int(round(max(width, height) * side / short_side / 2)) * 2
+            rung_w, rung_h = (long_side, side) if width >= height else (side, long_side)
+            pixels = rung_w * rung_h
+            bitrate = int(base_bitrate * (pixels / source_pixels) ** LADDER_BITRATE_EXPONENT)
+            bitrate = min(bitrate, int(pixels * fps * LADDER_MAX_BPP))
+            rungs.append({'label': f"{side}p", 'width': rung_w, 'height': rung_h, 'bitrate': bitrate})
+        return rungs
+
+    def build_ladder_command(self, input_path, output_path, metadata, settings):
+        """One ffmpeg run that decodes once and encodes every rung to HLS or DASH.
+
+        The decoded frames are split and scaled per rung; all rungs share the GOP
+        length with scene-cut keyframes off, so segment boundaries line up.
+        output_path is the master playlist (HLS) or manifest (DASH).
+        """
+        ffmpeg_path = self.engines.path('ffmpeg')
+        rungs = settings['ladder']
+        package_dir = Path(output_path).parent
+        has_audio = metadata['has_audio']
+        count = len(rungs)
+        gop = max(1, round((settings['target_fps'] or 30) * LADDER_SEGMENT_SECONDS))
+
+        fps_filter = f"fps={settings['target_fps']}," if settings['use_fps_filter'] else ""
+        graph = [f"[0:v:0]{fps_filter}split={count}" + "".join(f"[s{i}]" for i in range(count))]
+        graph += [f"[s{i}]scale={rung['width']}:{rung['height']}[v{i}]" for i, rung in enumerate(rungs)]
+        cmd = [ffmpeg_path, '-y', '-i', input_path, '-filter_complex', ';'.join(graph)]
+        for i in range(count):
+            cmd.extend(['-map', f'[v{i}]'])
+        # HLS variants each carry their own audio copy; DASH shares one audio adaptation set
+        audio_outputs = (count if settings['ladder_format'] == 'hls' else 1) if has_audio else 0
+        for _ in range(audio_outputs):
+            cmd.extend(['-map', '0:a:0'])
+
+        cmd.extend(['-c:v', 'libx264', '-preset', settings['preset'], '-crf', str(settings['crf']),
+                    '-pix_fmt', 'yuv420p', '-threads', str(VIDEO_ENCODE_THREADS),
+                    '-g', str(gop), '-keyint_min', str(gop), '-sc_threshold', '0'])
+        for i, rung in enumerate(rungs):
+            cmd.extend([f'-maxrate:v:{i}', str(rung['bitrate']), f'-bufsize:v:{i}', str(rung['bitrate'] * 2)])
+        if has_audio:
+            cmd.extend(['-c:a', 'aac', '-b:a', f"{settings['audio_bitrate']}k", '-ac', '2'])
+
+        if settings['ladder_format'] == 'hls':
+            stream_map = ' '.join(f"v:{i},a:{i}" if has_audio else f"v:{i}" for i in range(count))
+            cmd.extend(['-f', 'hls', '-hls_time', str(LADDER_SEGMENT_SECONDS), '-hls_playlist_type', 'vod',
+                        '-hls_segment_filename', str(package_dir / 'stream_%v' / 'segment_%05d.ts'),
+                        '-master_pl_name', Path(output_path).name, '-var_stream_map', stream_map,
+                        str(package_dir / 'stream_%v' / 'playlist.m3u8')])
+        else:
+            adaptation_sets = 'id=0,streams=v id=1,streams=a' if has_audio else 'id=0,streams=v'
+            cmd.extend(['-f', 'dash', '-seg_duration', str(LADDER_SEGMENT_SECONDS),
+                        '-use_template', '1', '-use_timeline', '1',
+                        '-adaptation_sets', adaptation_sets, str(output_path)])
+        if settings.get('previews'):
+            cmd.extend(self.preview_output_args(settings['previews']))
+        return cmd
+
+    def package_ladder(self, video_path, output_folder, mode, result):
+        """Encode a video as an HLS/DASH ladder in output_folder/<name>_<format>/; updates result."""
+        package_format = self.streaming_output.get()
+        self.log_to_video_terminal("[SCAN] Analyzing metadata...")
+        metadata = self.get_video_metadata(str(video_path))
+        if not metadata or metadata['duration'] <= 0:
+            self.log_to_video_terminal("[FAIL] Metadata read error. Skipping.")
+            result['error'] = "metadata read failed"
+            return result
+        self.log_to_video_terminal(f"[INFO] {metadata['width']}x{metadata['height']} | {metadata['fps']} FPS | {metadata['codec']}")
+
+        settings = self.calculate_optimal_settings(metadata, mode)
+        if self.scene_aware_crf.get():
+            complexity = self.analyze_video_complexity(str(video_path), metadata)
+            if complexity:
+                self.apply_complexity(settings, complexity)
+        settings['ladder'] = self.plan_ladder(metadata, settings)
+        settings['ladder_format'] = package_format
+        result['cost'] = self.video_cost(metadata, mode)
+        for rung in settings['ladder']:
+            self.log_to_video_terminal(f"[LADDER] {rung['label']}: {rung['width']}x{rung['height']} "
+                                       f"@ CRF {settings['crf']}, cap {rung['bitrate'] // 1000}k")
+
+        package_dir = output_folder / f"{video_path.stem}_{package_format}"
+        if package_dir.exists():
+            shutil.rmtree(package_dir)
+        package_dir.mkdir(parents=True)
+        manifest = package_dir / ('master.m3u8' if package_format == 'hls' else 'manifest.mpd')
+        settings['previews'] = self.plan_previews(metadata, package_dir / "_previews")
+
+        cmd = self.build_ffmpeg_command(str(video_path), str(manifest), metadata, settings)
+        # Every rung is encoded in the same run, so the deadline grows with their total pixels
+        rung_pixels = sum(rung['width'] * rung['height'] for rung in settings['ladder'])
+        timeout = self.video_tool_timeout(metadata, settings)
+        if timeout:
+            timeout *= max(1.0, rung_pixels / (metadata['width'] * metadata['height']))
+        self.log_to_video_terminal(f"[BUSY] Encoding {len(settings['ladder'])} renditions ({package_format.upper()})...")
+        start_time = time.time()
+        process = self.run_tool(cmd, timeout, self.log_to_video_terminal, progress=True)
+        result.update(engine=f"libx264 {package_format} ladder", crf=settings['crf'], preset=settings['preset'], attempts=1)
+
+        if process.returncode != 0 or not manifest.exists():
+            shutil.rmtree(package_dir, ignore_errors=True)  # Preview frames included
+            result['error'] = f"ffmpeg {process.killed}" if process.killed else f"ffmpeg exit {process.returncode}"
+            self.log_to_video_terminal("[FAIL] Ladder encode failed.")
+            return result
+
+        if settings['previews']:
+            self.log_previews(self.finish_previews(settings['previews'], package_dir))
+        package_size = sum(f.stat().st_size for f in package_dir.rglob('*') if f.is_file())
+        result.update(status='compressed', final_size=package_size, output_path=manifest)
+        self.log_to_video_terminal(f"[DONE] Finished in {time.time() - start_time:.1f}s")
+        self.log_to_video_terminal(f"[STAT] {self.format_bytes(result['original_size'])} -> "
+                                   f"{self.format_bytes(package_size)} across all renditions")
+        return result
+
     def build_ffmpeg_command(self, input_path, output_path, metadata, settings, force_cpu=False):
-        ffmpeg_path = str(self.engine_dir / 'ffmpeg.exe')
+        if settings.get('ladder'):
+            return self.build_ladder_command(input_path, output_path, metadata, settings)
+        ffmpeg_path = self.engines.path('ffmpeg')
         cmd = [ffmpeg_path, '-y', '-i', input_path]
-        use_hw = self.use_hardware_accel.get() and self.hw_accel_type and not force_cpu
+        two_pass = settings.get('pass') in (1, 2)
+        use_hw = self.use_hardware_accel.get() and self.hw_accel_type and not force_cpu and not two_pass
 
         if use_hw:
             if self.hw_accel_type == 'nvenc':
@@ -1312,10 +4674,16 @@ class EnterpriseMediaOptimizer:
                 cmd.extend(['-c:v', 'h264_qsv', '-preset', settings['preset'], '-global_quality', str(settings['crf'])])
             elif self.hw_accel_type == 'amf':
                 cmd.extend(['-c:v', 'h264_amf', '-quality', 'balanced', '-qp_i', str(settings['crf'])])
+        elif two_pass:
+            cmd.extend(['-c:v', 'libx264', '-b:v', str(settings['target_bitrate']), '-preset', settings['preset'],
+                        '-pass', str(settings['pass']), '-passlogfile', settings['passlogfile']])
         else:
             cmd.extend(['-c:v', 'libx264', '-crf', str(settings['crf']), '-preset', settings['preset']])
+        if not use_hw:
+            # Stay within the cores the governor granted this encode
+            cmd.extend(['-threads', str(VIDEO_ENCODE_THREADS)])
 
-        if settings['max_bitrate'] > 0:
+        if settings['max_bitrate'] > 0 and not two_pass:
             cmd.extend(['-maxrate', str(settings['max_bitrate']), '-bufsize', str(settings['buf_size'])])
 
         if settings['use_fps_filter']:
@@ -1323,17 +4691,236 @@ class EnterpriseMediaOptimizer:
 
         cmd.extend(['-movflags', '+faststart', '-pix_fmt', 'yuv420p'])
 
-        if metadata['has_audio']:
+        if settings.get('pass') == 1:
+            # Analysis pass: only the video statistics matter
+            cmd.extend(['-an', '-sn', '-f', 'null', '-'])
+            return cmd
+
+        if settings.get('streams'):
+            cmd.extend(settings['streams']['args'])
+        elif metadata['has_audio']:
             cmd.extend(['-c:a', 'aac', '-b:a', f"{settings['audio_bitrate']}k"])
         else:
             cmd.extend(['-an'])
 
         cmd.append(output_path)
+        if settings.get('previews'):
+            cmd.extend(self.preview_output_args(settings['previews']))
         return cmd
 
+    def plan_previews(self, metadata, work_dir):
+        """Poster/sprite plan for an encode, or None when previews are off or the duration is unknown.
+
+        One sprite tile stands for `interval` seconds (at least SPRITE_MIN_INTERVAL, at
+        most SPRITE_MAX_TILES tiles), all on a single sheet.
+        """
+        duration = metadata['duration']
+        if not self.video_previews.get() or duration <= 0:
+            return None
+        fps = metadata['fps'] or 30
+        frames_per_tile = max(1, round(fps * max(SPRITE_MIN_INTERVAL, duration / SPRITE_MAX_TILES)))
+        interval = frames_per_tile / fps
+        tiles = max(1, math.ceil(duration / interval))
+        columns = min(SPRITE_COLUMNS, tiles)
+        work_dir.mkdir(parents=True, exist_ok=True)
+        return {
+            'dir': work_dir, 'duration': duration, 'fps': fps,
+            'spacing': max(POSTER_MIN_SPACING, duration / POSTER_CANDIDATES),
+            'poster_size': self.fit_even(metadata['width'], metadata['height'], POSTER_MAX_SIZE),
+            'tile_size': self.fit_even(metadata['width'], metadata['height'], SPRITE_TILE_SIZE),
+            'frames_per_tile': frames_per_tile, 'interval': interval,
+            'tiles': tiles, 'columns': columns, 'rows': math.ceil(tiles / columns),
+        }
+
+    def fit_even(self, width, height, long_side):
+        """Size with the long side at most long_side (never upscaled) and both sides even."""
+        scale = min(1.0, long_side / max(width, height))
+        return max(2, int(width * scale / 2) * 2), max(2, int(height * scale / 2) * 2)
+
+    def preview_output_args(self, previews):
+        """Extra ffmpeg outputs that tap the encode's decoded frames for the poster and sprite.
+
+        Poster candidates are the first shot change (scene score) after each spacing
+        window, or the window's last frame when the shot never changes. Sprite tiles
+        use the thumbnail filter, which keeps the most representative frame of each
+        interval, so the tiles still map to fixed time ranges for the VTT.
+        """
+        spacing = f"{previews['spacing']:.3f}"
+        select = (f"select='if(gte(t,ld(0))*(gt(scene,{POSTER_SCENE_THRESHOLD})+gte(t,ld(0)+{spacing})),"
+                  f"st(0,t+{spacing}),0)'")
+        poster_w, poster_h = previews['poster_size']
+        tile_w, tile_h = previews['tile_size']
+        sprite = (f"fps={previews['fps']},scale={tile_w}:{tile_h},thumbnail={previews['frames_per_tile']},"
+                  f"tile={previews['columns']}x{previews['rows']}")
+        work = previews['dir']
+        return ['-map', '0:v:0', '-vf', f"{select},scale={poster_w}:{poster_h}", '-fps_mode', 'vfr',
+                '-frames:v', str(POSTER_CANDIDATES * 2), str(work / 'poster_%03d.png'),
+                '-map', '0:v:0', '-vf', sprite, '-frames:v', '1', '-update', '1', str(work / 'sprite.png')]
+
+    def finish_previews(self, previews, dest_dir, prefix=""):
+        """Encode the poster and sprite sheet with the image engines and write the VTT.
+
+        Returns the paths written; the frames ffmpeg left in the work folder are removed.
+        """
+        work = previews['dir']
+        written = []
+        try:
+            poster = self.pick_poster(sorted(work.glob('poster_*.png')))
+            if poster:
+                with Image.open(poster) as img:
+                    written.append(self.encode_preview(img, dest_dir / f"{prefix}poster", PREVIEW_QUALITY['poster'], work))
+            sheet = work / 'sprite.png'
+            if sheet.exists():
+                with Image.open(sheet) as img:
+                    sprite_path = self.encode_preview(img, dest_dir / f"{prefix}sprite", PREVIEW_QUALITY['sprite'], work)
+                vtt_path = dest_dir / f"{prefix}sprite.vtt"
+                self.write_sprite_vtt(previews, Path(sprite_path).name, vtt_path)
+                written += [sprite_path, str(vtt_path)]
+        except Exception as e:
+            self.log_to_video_terminal(f"[WARN] Preview output failed: {e}")
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+        return written
+
+    def pick_poster(self, candidates):
+        """The candidate frame with the most contrast and detail; fades and black/white frames lose."""
+        best, best_score = None, -1.0
+        low, high = POSTER_LUMA_RANGE
+        for path in candidates:
+            with Image.open(path) as img:
+                gray = img.convert('L')
+            stats = ImageStat.Stat(gray)
+            score = stats.stddev[0] + ImageStat.Stat(gray.filter(ImageFilter.FIND_EDGES)).mean[0]
+            if not low <= stats.mean[0] <= high:
+                score *= 0.1  # Only if every candidate is a fade
+            if score > best_score:
+                best, best_score = path, score
+        return best
+
+    def encode_preview(self, img, dest_stem, quality, work):
+        """Write a preview image through the image engines (MozJPEG, or WebP); returns its path."""
+        img = img.convert('RGB')
+        if self.preview_format == 'webp':
+            return self.compress_image_pil(img, f"{dest_stem}.webp", '.webp', quality)
+        output_path = f"{dest_stem}.jpg"
+        if self.has_mozjpeg:
+            source = str(work / f"{Path(dest_stem).name}.ppm")
+            img.save(source, format='PPM')
+            if self.compress_jpeg_mozjpeg(source, output_path, quality):
+                return output_path
+        return self.compress_image_pil(img, output_path, '.jpg', quality)
+
+    def write_sprite_vtt(self, previews, sprite_name, vtt_path):
+        """WebVTT track mapping each tile's time range to its rectangle on the sprite sheet."""
+        def stamp(seconds):
+            minutes, secs = divmod(seconds, 60)
+            return f"{int(minutes // 60):02d}:{int(minutes % 60):02d}:{secs:06.3f}"
+
+        tile_w, tile_h = previews['tile_size']
+        interval, duration = previews['interval'], previews['duration']
+        lines = ["WEBVTT", ""]
+        for idx in range(previews['tiles']):
+            start, end = idx * interval, min((idx + 1) * interval, duration)
+            x, y = (idx % previews['columns']) * tile_w, (idx // previews['columns']) * tile_h
+            lines += [f"{stamp(start)} --> {stamp(end)}", f"{sprite_name}#xywh={x},{y},{tile_w},{tile_h}", ""]
+        with open(vtt_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines))
+
+    def log_previews(self, written):
+        if written:
+            self.log_to_video_terminal(f"[PREVIEW] {', '.join(Path(p).name for p in written)}")
+        else:
+            self.log_to_video_terminal("[WARN] The encode produced no preview frames.")
+
+    def target_size_bytes(self):
+        """Size limit from the UI in bytes, or None when the mode is off or the value is invalid."""
+        if not self.use_target_size.get():
+            return None
+        try:
+            megabytes = float(self.target_size_mb.get())
+        except (TypeError, ValueError):
+            return None
+        return int(megabytes * 1024 * 1024) if megabytes > 0 else None
+
+    def encode_to_target_size(self, input_path, output_path, metadata, settings, target_bytes, work_folder):
+        """Two-pass encode sized to land under target_bytes.
+
+        The video bitrate is the size budget over the duration minus the audio
+        budget. Pass 1 runs once; when the output still overshoots, only pass 2
+        is repeated with a corrected bitrate, reusing the same statistics.
+        Returns True when the output fits, False when it stays too large, and None
+        when the encode fails (nothing is left at output_path; use quality mode).
+        """
+        duration = metadata['duration']
+        if duration <= 0:
+            self.log_to_video_terminal("[TARGET] Unknown duration. Falling back to quality mode.")
+            return None
+
+        audio_bps = settings['streams']['audio_bps'] if settings.get('streams') else (
+            settings['audio_bitrate'] * 1000 if metadata['has_audio'] else 0)
+        budget_bits = target_bytes * 8 * (1 - CONTAINER_OVERHEAD)
+        video_bps = int(budget_bits / duration - audio_bps)
+        if video_bps < MIN_TARGET_VIDEO_BITRATE:
+            self.log_to_video_terminal(f"[TARGET] {self.format_bytes(target_bytes)} leaves only {max(video_bps, 0)//1000} kbps "
+                                       f"for video. Using the {MIN_TARGET_VIDEO_BITRATE//1000} kbps floor.")
+            video_bps = MIN_TARGET_VIDEO_BITRATE
+
+        passlog = str(Path(work_folder) / f"{Path(output_path).stem}_2pass")
+        settings = dict(settings, passlogfile=passlog, target_bitrate=video_bps)
+        self.log_to_video_terminal(f"[TARGET] Budget {self.format_bytes(target_bytes)} over {duration:.1f}s -> "
+                                   f"video {video_bps//1000} kbps + audio {audio_bps//1000} kbps")
+        timeout = self.video_tool_timeout(metadata, settings)
+        log = self.log_to_video_terminal
+        try:
+            self.log_to_video_terminal("[2PASS] Analysis pass...")
+            settings['pass'] = 1
+            process = self.run_tool(self.build_ffmpeg_command(input_path, output_path, metadata, settings),
+                                    timeout, log, progress=True)
+            if process.returncode != 0:
+                self.log_to_video_terminal("[2PASS] Analysis pass failed. Falling back to quality mode.")
+                return None
+
+            settings['pass'] = 2
+            for attempt in range(1, TARGET_SIZE_PASSES + 1):
+                self.log_to_video_terminal(f"[2PASS] Encoding pass at {settings['target_bitrate']//1000} kbps"
+                                           f"{' (reusing analysis)' if attempt > 1 else ''}...")
+                cmd = self.build_ffmpeg_command(input_path, output_path, metadata, settings)
+                process = self.run_tool(cmd, timeout, log, progress=True)
+                if process.returncode != 0 and settings.get('streams') and not process.killed:
+                    settings['streams'] = None
+                    cmd = self.build_ffmpeg_command(input_path, output_path, metadata, settings)
+                    process = self.run_tool(cmd, timeout, log, progress=True)
+                if process.returncode != 0:
+                    # A cut-off or broken output would otherwise pass for the closest result
+                    try: os.remove(output_path)
+                    except OSError: pass
+                    self.log_to_video_terminal("[2PASS] Encoding pass failed. Falling back to quality mode.")
+                    return None
+                if not os.path.exists(output_path):
+                    return False
+
+                size = os.path.getsize(output_path)
+                if size <= target_bytes:
+                    self.log_to_video_terminal(f"[TARGET] Landed at {self.format_bytes(size)} "
+                                               f"({size / target_bytes * 100:.1f}% of budget)")
+                    return True
+
+                # Take the overshoot out of the video bitrate, with a little margin
+                overshoot_bps = (size - target_bytes) * 8 / duration
+                new_bps = int((settings['target_bitrate'] - overshoot_bps) * 0.98)
+                self.log_to_video_terminal(f"[TARGET] Overshot by {self.format_bytes(size - target_bytes)}.")
+                if new_bps < MIN_TARGET_VIDEO_BITRATE:
+                    break
+                settings['target_bitrate'] = new_bps
+            return False
+        finally:
+            for leftover in Path(work_folder).glob(Path(passlog).name + '*'):
+                try: leftover.unlink()
+                except OSError: pass
+
     def compress_videos_batch(self):
-        if self.is_processing:
-            messagebox.showwarning("Busy", "Operation in progress.")
+        if self.busy['videos']:
+            messagebox.showwarning("Busy", "Video optimization already in progress.")
             return
 
         if not self.video_input_folder.get() or not self.video_output_folder.get():
@@ -1344,8 +4931,16 @@ class EnterpriseMediaOptimizer:
             messagebox.showerror("Error", "Input and Output folders must be different.")
             return
 
-        self.is_processing = True
+        if self.use_target_size.get():
+            if self.target_size_bytes() is None:
+                messagebox.showerror("Error", "Enter a target size in MB greater than 0.")
+                return
+            self.config["target_size_mb"] = float(self.target_size_mb.get())
+            self.save_config()
+
+        self.busy['videos'] = True
         self.video_compress_btn.config(state='disabled', text="Processing...")
+        self.video_watch_btn.config(state='disabled')
         self.video_stats_text.delete(1.0, tk.END)
         self.log_to_video_terminal("[INIT] Starting Video Optimization Engine...")
         self.log_to_video_terminal(f"[PATH] Input: {self.video_input_folder.get()}")
@@ -1357,243 +4952,394 @@ class EnterpriseMediaOptimizer:
 
     def _compress_videos_worker(self):
         try:
-            video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm', '.m4v', '.mpg', '.mpeg', '.3gp', '.ogv', '.ts'}
             input_folder = Path(self.video_input_folder.get())
             output_folder = Path(self.video_output_folder.get())
             output_folder.mkdir(parents=True, exist_ok=True)
 
-            temp_work_folder = output_folder / "_temp_work"
-            temp_work_folder.mkdir(exist_ok=True)
-
-            video_files = [f for f in input_folder.iterdir() if f.is_file() and f.suffix.lower() in video_extensions]
+            video_files = [f for f in input_folder.iterdir() if f.is_file() and f.suffix.lower() in VIDEO_EXTENSIONS]
 
             if not video_files:
                 self.root.after(0, messagebox.showwarning, "Warning", "No video files found.")
                 return
 
-            total_files = len(video_files)
-            self.root.after(0, lambda: self.video_progress.configure(maximum=total_files, value=0))
-
-            total_orig = 0
-            total_comp = 0
-            skipped = 0
-            compressed = 0
-            failed = 0
-            mode = self.video_compression_mode.get()
-
-            for idx, video_path in enumerate(video_files):
-                self.log_to_video_terminal(f"\n[VIDEO] Processing [{idx + 1}/{total_files}]: {video_path.name}")
-
-                try:
-                    original_size = os.path.getsize(video_path)
-                    total_orig += original_size
-
-                    # Determine output extension
-                    if self.unify_extension.get() and self.target_extension.get():
-                        target_ext = self.target_extension.get()
-                        output_filename = video_path.stem + target_ext
-                        self.log_to_video_terminal(f"[UNIFY] Target Extension: {target_ext}")
-                    else:
-                        output_filename = video_path.name
-                        if video_path.suffix.lower() == '.ts' and self.convert_ts_to_mp4.get():
-                            output_filename = video_path.stem + '.mp4'
-
-                    output_path = output_folder / output_filename
-
-                    if self.skip_small_videos.get() and original_size < 5 * 1024 * 1024:
-                        ffmpeg_path = str(self.engine_dir / 'ffmpeg.exe')
-                        # If skipping, but unification is on, we still need to convert if extension doesn't match
-                        if self.unify_extension.get() and video_path.suffix.lower() != target_ext:
-                            self.log_to_video_terminal(f"[CONVERT] File < 5MB but needs extension change. converting...")
-                            # Simple remux/convert for small files
-                            convert_cmd = [ffmpeg_path, '-y', '-i', str(video_path), '-c', 'copy', str(output_path)]
-                            subprocess.run(convert_cmd, capture_output=True)
-                        elif video_path.suffix.lower() == '.ts' and self.convert_ts_to_mp4.get():
-                             # Convert TS small files if requested
-                             self.log_to_video_terminal(f"[CONVERT] TS File < 5MB. Converting to MP4...")
-                             convert_cmd = [ffmpeg_path, '-y', '-i', str(video_path), '-c', 'copy', str(output_path)]
-                             subprocess.run(convert_cmd, capture_output=True)
-                        else:
-                             shutil.copy2(video_path, output_path)
-                             self.log_to_video_terminal(f"[SKIP] File < 5MB. Copied/Converted.")
-                        
-                        if output_path.exists():
-                             total_comp += os.path.getsize(output_path)
-                             skipped += 1
-                    else:
-                        current_input_path = str(video_path)
-                        is_temp_file = False
-
-                        # Handle explicit TS conversion OR generic extension unification via temp file
-                        # User strictly wants "convert then compress" workflow for reliability
-                        needs_pre_conversion = False
-                        
-                        if video_path.suffix.lower() == '.ts' and self.convert_ts_to_mp4.get():
-                            needs_pre_conversion = True
-                        elif self.unify_extension.get() and self.target_extension.get():
-                            # Enforce temp conversion for Unify as well
-                            needs_pre_conversion = True
-                        
-                        if needs_pre_conversion:
-                            target_temp_ext = self.target_extension.get() if self.unify_extension.get() else '.mp4'
-                            temp_conv_path = temp_work_folder / (video_path.stem + '_temp' + target_temp_ext)
-                            
-                            self.log_to_video_terminal(f"[PRE-PROC] Standardizing container to {target_temp_ext}...")
-                            
-                            ffmpeg_path = str(self.engine_dir / 'ffmpeg.exe')
-                            # Try remuxing primarily (fast, lossless container swap)
-                            convert_cmd = [ffmpeg_path, '-y', '-i', str(video_path), '-c', 'copy', '-map', '0', str(temp_conv_path)]
-                            
-                            # If input is TS and output is MP4, add bitstream filter for safety
-                            if video_path.suffix.lower() == '.ts' and target_temp_ext == '.mp4':
-                                convert_cmd = [ffmpeg_path, '-y', '-i', str(video_path), '-c', 'copy', '-bsf:a', 'aac_adtstoasc', str(temp_conv_path)]
-                                
-                            proc = subprocess.run(convert_cmd, capture_output=True)
-                            
-                            if temp_conv_path.exists() and os.path.getsize(temp_conv_path) > 0:
-                                current_input_path = str(temp_conv_path)
-                                is_temp_file = True
-                                self.log_to_video_terminal("[DONE] Standardization complete.")
-                            else:
-                                self.log_to_video_terminal("[WARN] Standardization failed (likely codec incompatibility). Using original.")
-
-                        self.log_to_video_terminal("[SCAN] Analyzing metadata...")
-                        metadata = self.get_video_metadata(current_input_path)
-
-                        if not metadata:
-                            self.log_to_video_terminal("[FAIL] Metadata read error. Skipping.")
-                            failed += 1
-                            continue
-
-                        self.log_to_video_terminal(f"[INFO] {metadata['width']}x{metadata['height']} | {metadata['fps']} FPS | {metadata['codec']}")
-                        self.log_to_video_terminal(f"[SIZE] Original: {self.format_bytes(original_size)}")
-
-                        settings = self.calculate_optimal_settings(metadata, mode)
-
-                        if settings['should_downscale']:
-                            temp_file_path = temp_work_folder / f"temp_{video_path.name}"
-                            self.log_to_video_terminal(f"[PROC] Creating 1080p intermediate file...")
-                            downscale_cmd = self.create_temp_downscaled_file(current_input_path, str(temp_file_path), settings['is_portrait'])
-                            subprocess.run(downscale_cmd, capture_output=True)
-
-                            if temp_file_path.exists() and os.path.getsize(temp_file_path) > 0:
-                                # Clean up previous temp file if it existed
-                                if is_temp_file:
-                                    try: os.remove(current_input_path)
-                                    except: pass
-                                
-                                current_input_path = str(temp_file_path)
-                                is_temp_file = True
-                                self.log_to_video_terminal("[DONE] Intermediate file created.")
-                            else:
-                                self.log_to_video_terminal("[WARN] Intermediate creation failed. Attempting direct.")
-
-                        attempts = 0
-                        max_attempts = 3
-                        success_compression = False
-                        comp_size = 0
-                        duration = 0
-
-                        while attempts < max_attempts:
-                            attempts += 1
-                            if attempts > 1:
-                                self.log_to_video_terminal(f"[RETRY] Shot {attempts}/{max_attempts} - Increasing compression...")
-                                # Dynamically increase compression
-                                settings['crf'] += 4 
-                                if settings['max_bitrate'] > 0:
-                                    settings['max_bitrate'] = int(settings['max_bitrate'] * 0.8)
-                                    settings['buf_size'] = int(settings['max_bitrate'] * 2)
-                                else:
-                                    # If no bitrate cap, force one based on previous failure
-                                    pixels = metadata['width'] * metadata['height']
-                                    target_bpp = 0.07 if attempts == 2 else 0.05
-                                    settings['max_bitrate'] = int(pixels * metadata['fps'] * target_bpp)
-                                    settings['buf_size'] = settings['max_bitrate'] * 2
-
-                            cmd = self.build_ffmpeg_command(current_input_path, str(output_path), metadata, settings, force_cpu=False)
-
-
-                            self.log_to_video_terminal(f"[SETT] CRF: {settings['crf']} | Preset: {settings['preset']} {'| Cap: ' + str(settings['max_bitrate']//1000) + 'k' if settings['max_bitrate'] > 0 else ''}")
-                            self.log_to_video_terminal(f"[BUSY] Compressing (Attempt {attempts})...")
-
-                            start_time = time.time()
-                            process = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
-
-                            if process.returncode != 0:
-                                self.log_to_video_terminal(f"[WARN] Encoding error. Retrying with CPU...")
-                                cmd_cpu = self.build_ffmpeg_command(current_input_path, str(output_path), metadata, settings, force_cpu=True)
-                                process = subprocess.run(cmd_cpu, capture_output=True, text=True, encoding='utf-8')
-
-                            duration = time.time() - start_time
-
-                            if output_path.exists() and os.path.getsize(output_path) > 0:
-                                comp_size = os.path.getsize(output_path)
-                                if comp_size < original_size:
-                                    success_compression = True
-                                    break
-                                else:
-                                    self.log_to_video_terminal(f"[WARN] Result larger than source: {self.format_bytes(comp_size)}")
-                                    if attempts < max_attempts:
-                                        try: os.remove(output_path)
-                                        except: pass
-                            else:
-                                self.log_to_video_terminal("[FAIL] Output empty. Breaking loop.")
-                                break
-
-                        if is_temp_file:
-                            try: os.remove(current_input_path)
-                            except: pass
-
-                        if success_compression:
-                            reduction = ((original_size - comp_size) / original_size) * 100
-                            total_comp += comp_size
-                            compressed += 1
-                            self.log_to_video_terminal(f"[DONE] Finished in {duration:.1f}s")
-                            self.log_to_video_terminal(f"[STAT] {self.format_bytes(original_size)} -> {self.format_bytes(comp_size)} (Saved {reduction:.1f}%)")
-                        else:
-                            self.log_to_video_terminal("[GIVEUP] Could not reduce size after 3 shots. Reverting to original.")
-                            # If Unify is on, we must at least remux to the target extension
-                            if self.unify_extension.get() and video_path.suffix.lower() != target_ext:
-                                self.log_to_video_terminal(f"[UNIFY] Remuxing original to {target_ext}...")
-                                ffmpeg_path = str(self.engine_dir / 'ffmpeg.exe')
-                                remux_cmd = [ffmpeg_path, '-y', '-i', str(video_path), '-c', 'copy', '-map', '0', str(output_path)]
-                                subprocess.run(remux_cmd, capture_output=True)
-                            else:
-                                shutil.copy2(video_path, output_path)
-                            
-                            comp_size = os.path.getsize(output_path) if output_path.exists() else original_size
-                            total_comp += comp_size
-                            self.log_to_video_terminal(f"[STAT] Kept original size: {self.format_bytes(comp_size)}")
-
-                except Exception as e:
-                    failed += 1
-                    self.log_to_video_terminal(f"[ERR] {str(e)}")
-
-                self.root.after(0, lambda v=idx+1: self.video_progress.configure(value=v))
-
-            try: temp_work_folder.rmdir()
-            except: pass
+            start_time = time.time()
+            batch = self.run_video_batch(video_files, output_folder, self.video_compression_mode.get())
+            total_orig, total_comp = batch['total_orig'], batch['total_new']
+            dedup_count, dedup_skipped, dedup_shared = batch['dedup']
 
             total_reduction = ((total_orig - total_comp) / total_orig * 100) if total_orig > 0 else 0
 
             summary = (f"\n{'='*60}\n"
                        f"FINAL REPORT\n"
                        f"{'='*60}\n"
-                       f"Total: {total_files} | Compressed: {compressed} | Skipped: {skipped} | Failed: {failed}\n"
+                       f"Total: {batch['total_files']} | Compressed: {batch['compressed']} | Skipped: {batch['skipped']} | Failed: {batch['failed']}\n"
                        f"Original: {self.format_bytes(total_orig)}\n"
                        f"Final: {self.format_bytes(total_comp)}\n"
-                       f"Saved: {self.format_bytes(total_orig - total_comp)} ({total_reduction:.1f}%)\n"
-                       f"{'='*60}\n")
+                       f"Saved: {self.format_bytes(total_orig - total_comp)} ({total_reduction:.1f}%)\n")
+            if dedup_count:
+                summary += (f"Duplicates: {dedup_count} skipped ({self.format_bytes(dedup_skipped)} not re-encoded, "
+                            f"{self.format_bytes(dedup_shared)} shared via links)\n")
+            transfers = self.video_transfers.summary(self.format_bytes)
+            if transfers:
+                summary += f"Transfers: {transfers}\n"
+            summary += f"{'='*60}\n"
 
             self.log_to_video_terminal(summary)
+            self.log_watchdog_summary(['ffmpeg'], start_time, self.log_to_video_terminal)
             self.root.after(0, lambda: self.video_progress_label.config(text="Batch Completed"))
             self.root.after(0, messagebox.showinfo, "Complete", "Video optimization batch finished.")
 
         except Exception as e:
             self.root.after(0, messagebox.showerror, "Error", f"Batch failed: {str(e)}")
         finally:
-            self.is_processing = False
+            self.busy['videos'] = False
+            self.set_pipeline_status('videos', "idle")
             self.root.after(0, lambda: self.video_compress_btn.config(state='normal', text="Start Video Optimization"))
+            self.root.after(0, lambda: self.video_watch_btn.config(state='normal'))
+
+    def run_video_batch(self, video_files, output_folder, mode, stop_event=None):
+        """Deduplicate and compress a list of videos one at a time, returning aggregate stats.
+
+        When stop_event is set the batch stops before the next file.
+        """
+        temp_work_folder = output_folder / "_temp_work"
+        temp_work_folder.mkdir(exist_ok=True)
+
+        # Byte-identical copies are encoded once and linked afterwards
+        video_duplicates = {}
+        # A ladder is a folder of segments, which the duplicate links cannot reproduce
+        if self.dedup_videos.get() and self.streaming_output.get() == 'off' and len(video_files) > 1:
+            self.log_to_video_terminal("[DEDUP] Checking for duplicate videos...")
+            video_files, video_duplicates = self.find_duplicates(video_files)
+            if video_duplicates:
+                self.log_to_video_terminal(f"[DEDUP] {len(video_duplicates)} duplicates will reuse another file's result.")
+
+        self.log_engine_versions(['ffmpeg', 'ffprobe'], self.log_to_video_terminal)
+        self.video_transfers.reset()
+        video_outputs = {}
+        video_files, costs = self.plan_by_cost(video_files, lambda f: self.estimate_video_cost(f, mode))
+        total_cost = sum(costs.values()) or 1
+        done_cost = 0
+        start_time = time.time()
+        total_files = len(video_files)
+        self.log_to_video_terminal(f"[PLAN] {total_files} videos, longest encode first.")
+        self.root.after(0, lambda: self.video_progress.configure(maximum=100, value=0))
+
+        batch = {'total_files': total_files, 'total_orig': 0, 'total_new': 0,
+                 'compressed': 0, 'skipped': 0, 'failed': 0, 'dedup': (0, 0, 0)}
+
+        for idx, video_path in enumerate(video_files):
+            if stop_event is not None and stop_event.is_set():
+                self.log_to_video_terminal(f"[STOP] Batch stopped with {total_files - idx} videos left.")
+                break
+            self.log_to_video_terminal(f"\n[VIDEO] Processing [{idx + 1}/{total_files}]: {video_path.name}")
+            self.set_pipeline_status('videos', f"{idx + 1}/{total_files} {video_path.name}", done_cost / total_cost)
+
+            result = self.process_video_file(video_path, output_folder, temp_work_folder, mode)
+
+            if result['status'] == 'failed':
+                batch['failed'] += 1
+            else:
+                batch['total_orig'] += result['original_size']
+                batch['total_new'] += result['final_size']
+                video_outputs[video_path] = result['output_path']
+                if result['status'] == 'compressed':
+                    batch['compressed'] += 1
+                elif result['status'] == 'skipped':
+                    batch['skipped'] += 1
+
+            done_cost += costs[video_path]
+            eta = self.eta_text(start_time, done_cost, total_cost)
+            self.set_pipeline_status('videos', f"{idx + 1}/{total_files} {eta}".rstrip(), done_cost / total_cost)
+            self.root.after(0, lambda v=done_cost / total_cost * 100: self.video_progress.configure(value=v))
+            self.root.after(0, lambda t=f"Processed {idx + 1}/{total_files}  {eta}".rstrip(): self.video_progress_label.config(text=t))
+
+        try: temp_work_folder.rmdir()
+        except: pass
+
+        if video_duplicates:
+            batch['dedup'] = self.materialize_duplicates(
+                video_duplicates, video_outputs, output_folder, self.log_to_video_terminal, self.video_transfers)
+        batch['outputs'] = video_outputs
+        return batch
+
+    def video_slot_size(self):
+        """Governor share of one encode: (cpu, gpu). Ladders are always encoded in software."""
+        if self.use_hardware_accel.get() and self.hw_accel_type and self.streaming_output.get() == 'off':
+            return 1, 1
+        return VIDEO_ENCODE_THREADS, 0
+
+    def process_video_file(self, video_path, output_folder, temp_work_folder, mode):
+        """Compress one video into output_folder.
+
+        The file waits for the governor to grant its share of the cores, or a
+        hardware encoder session when GPU encoding is on. Returns a dict with
+        'status' (compressed / skipped / kept / failed), 'original_size',
+        'final_size' and 'output_path'.
+        """
+        digest = self.source_hash(video_path)
+        with self.governor.slot(PRIORITY_VIDEOS, *self.video_slot_size()):
+            started = time.time()
+            result = self._process_video_file(video_path, output_folder, temp_work_folder, mode)
+        self.record_history('videos', video_path, mode, started, source_hash=digest, status=result['status'],
+                            output=str(result['output_path']) if result['output_path'] else None,
+                            original_size=result['original_size'], new_size=result['final_size'] or None,
+                            **{key: result.get(key) for key in ('engine', 'crf', 'preset', 'attempts', 'error', 'cost')})
+        return result
+
+    def _process_video_file(self, video_path, output_folder, temp_work_folder, mode):
+        result = {'status': 'failed', 'original_size': 0, 'final_size': 0, 'output_path': None}
+        try:
+            original_size = os.path.getsize(video_path)
+            result['original_size'] = original_size
+
+            if self.streaming_output.get() != 'off':
+                return self.package_ladder(video_path, output_folder, mode, result)
+
+            # Determine output extension
+            if self.unify_extension.get() and self.target_extension.get():
+                target_ext = self.target_extension.get()
+                output_filename = video_path.stem + target_ext
+                self.log_to_video_terminal(f"[UNIFY] Target Extension: {target_ext}")
+            else:
+                output_filename = video_path.name
+                if video_path.suffix.lower() == '.ts' and self.convert_ts_to_mp4.get():
+                    output_filename = video_path.stem + '.mp4'
+
+            output_path = output_folder / output_filename
+            result['output_path'] = output_path
+            self.release_output(output_path, video_path)
+
+            if self.skip_small_videos.get() and original_size < SMALL_VIDEO_BYTES:
+                ffmpeg_path = self.engines.path('ffmpeg')
+                # If skipping, but unification is on, we still need to convert if extension doesn't match
+                if self.unify_extension.get() and video_path.suffix.lower() != target_ext:
+                    self.log_to_video_terminal(f"[CONVERT] File < 5MB but needs extension change. converting...")
+                    # Simple remux/convert for small files
+                    convert_cmd = [ffmpeg_path, '-y', '-i', str(video_path), '-c', 'copy', str(output_path)]
+                    self.run_tool(convert_cmd, self.remux_timeout(video_path), self.log_to_video_terminal, progress=True)
+                elif video_path.suffix.lower() == '.ts' and self.convert_ts_to_mp4.get():
+                     # Convert TS small files if requested
+                     self.log_to_video_terminal(f"[CONVERT] TS File < 5MB. Converting to MP4...")
+                     convert_cmd = [ffmpeg_path, '-y', '-i', str(video_path), '-c', 'copy', str(output_path)]
+                     self.run_tool(convert_cmd, self.remux_timeout(video_path), self.log_to_video_terminal, progress=True)
+                else:
+                     how = self.transfer_file(video_path, output_path, self.video_transfers, self.move_passthrough_videos.get())
+                     self.log_to_video_terminal(f"[SKIP] File < 5MB. Placed via {how}.")
+                
+                if output_path.exists():
+                     result.update(status='skipped', final_size=os.path.getsize(output_path))
+            else:
+                current_input_path = str(video_path)
+                is_temp_file = False
+
+                # Handle explicit TS conversion OR generic extension unification via temp file
+                # User strictly wants "convert then compress" workflow for reliability
+                needs_pre_conversion = False
+                
+                if video_path.suffix.lower() == '.ts' and self.convert_ts_to_mp4.get():
+                    needs_pre_conversion = True
+                elif self.unify_extension.get() and self.target_extension.get():
+                    # Enforce temp conversion for Unify as well
+                    needs_pre_conversion = True
+                
+                if needs_pre_conversion:
+                    target_temp_ext = self.target_extension.get() if self.unify_extension.get() else '.mp4'
+                    temp_conv_path = temp_work_folder / (video_path.stem + '_temp' + target_temp_ext)
+                    
+                    self.log_to_video_terminal(f"[PRE-PROC] Standardizing container to {target_temp_ext}...")
+                    
+                    ffmpeg_path = self.engines.path('ffmpeg')
+                    # Try remuxing primarily (fast, lossless container swap)
+                    convert_cmd = [ffmpeg_path, '-y', '-i', str(video_path), '-c', 'copy', '-map', '0', str(temp_conv_path)]
+                    
+                    # If input is TS and output is MP4, add bitstream filter for safety
+                    if video_path.suffix.lower() == '.ts' and target_temp_ext == '.mp4':
+                        convert_cmd = [ffmpeg_path, '-y', '-i', str(video_path), '-c', 'copy', '-bsf:a', 'aac_adtstoasc', str(temp_conv_path)]
+                        
+                    proc = self.run_tool(convert_cmd, self.remux_timeout(video_path), self.log_to_video_terminal, progress=True)
+                    if proc.killed and temp_conv_path.exists():
+                        temp_conv_path.unlink()
+
+                    if temp_conv_path.exists() and os.path.getsize(temp_conv_path) > 0:
+                        current_input_path = str(temp_conv_path)
+                        is_temp_file = True
+                        self.log_to_video_terminal("[DONE] Standardization complete.")
+                    else:
+                        self.log_to_video_terminal("[WARN] Standardization failed (likely codec incompatibility). Using original.")
+
+                self.log_to_video_terminal("[SCAN] Analyzing metadata...")
+                metadata = self.get_video_metadata(current_input_path)
+
+                if not metadata:
+                    self.log_to_video_terminal("[FAIL] Metadata read error. Skipping.")
+                    result['error'] = "metadata read failed"
+                    return result
+
+                self.log_to_video_terminal(f"[INFO] {metadata['width']}x{metadata['height']} | {metadata['fps']} FPS | {metadata['codec']}")
+                self.log_to_video_terminal(f"[SIZE] Original: {self.format_bytes(original_size)}")
+
+                settings = self.calculate_optimal_settings(metadata, mode)
+                result['cost'] = self.video_cost(metadata, mode) if metadata['duration'] > 0 else None
+
+                # Per-title CRF from sampled motion/detail (a sized encode picks its own bitrate)
+                if self.scene_aware_crf.get() and not self.target_size_bytes():
+                    complexity = self.analyze_video_complexity(current_input_path, metadata)
+                    if complexity:
+                        self.apply_complexity(settings, complexity)
+
+                if settings['should_downscale']:
+                    temp_file_path = temp_work_folder / f"temp_{video_path.name}"
+                    self.log_to_video_terminal(f"[PROC] Creating 1080p intermediate file...")
+                    downscale_cmd = self.create_temp_downscaled_file(current_input_path, str(temp_file_path), settings['is_portrait'])
+                    proc = self.run_tool(downscale_cmd, self.video_tool_timeout(metadata), self.log_to_video_terminal, progress=True)
+                    if proc.killed and temp_file_path.exists():
+                        temp_file_path.unlink()
+
+                    if temp_file_path.exists() and os.path.getsize(temp_file_path) > 0:
+                        # Clean up previous temp file if it existed
+                        if is_temp_file:
+                            try: os.remove(current_input_path)
+                            except: pass
+                        
+                        current_input_path = str(temp_file_path)
+                        is_temp_file = True
+                        self.log_to_video_terminal("[DONE] Intermediate file created.")
+                    else:
+                        self.log_to_video_terminal("[WARN] Intermediate creation failed. Attempting direct.")
+
+                settings['streams'] = self.plan_streams(metadata, settings, output_path.suffix)
+                for note in settings['streams']['notes']:
+                    self.log_to_video_terminal(note)
+                settings['previews'] = self.plan_previews(metadata, temp_work_folder / f"previews_{video_path.stem}")
+
+                attempts = 0
+                max_attempts = 3
+                process_killed = None
+                if self.use_hardware_accel.get() and self.hw_accel_type:
+                    engine = f"h264_{self.hw_accel_type}"
+                else:
+                    engine = "libx264"
+                success_compression = False
+                comp_size = 0
+                duration = 0
+
+                # Target size mode: a sized two-pass encode replaces the CRF retry loop
+                target_bytes = self.target_size_bytes()
+                if target_bytes and target_bytes >= original_size:
+                    self.log_to_video_terminal("[TARGET] Source already fits the size limit. Using quality mode.")
+                elif target_bytes:
+                    start_time = time.time()
+                    fitted = self.encode_to_target_size(current_input_path, str(output_path), metadata,
+                                                        settings, target_bytes, temp_work_folder)
+                    duration = time.time() - start_time
+                    if fitted is not None:
+                        engine = "libx264 2-pass"
+                        attempts = max_attempts  # Skip the CRF loop either way
+                        if output_path.exists() and os.path.getsize(output_path) < original_size:
+                            comp_size = os.path.getsize(output_path)
+                            success_compression = True
+                            if not fitted:
+                                self.log_to_video_terminal("[TARGET] Could not reach the size limit. Keeping the closest result.")
+
+                while attempts < max_attempts:
+                    attempts += 1
+                    if attempts > 1:
+                        self.log_to_video_terminal(f"[RETRY] Shot {attempts}/{max_attempts} - Increasing compression...")
+                        # Dynamically increase compression
+                        settings['crf'] += 4 
+                        if settings['max_bitrate'] > 0:
+                            settings['max_bitrate'] = int(settings['max_bitrate'] * 0.8)
+                            settings['buf_size'] = int(settings['max_bitrate'] * 2)
+                        else:
+                            # If no bitrate cap, force one based on previous failure
+                            pixels = metadata['width'] * metadata['height']
+                            target_bpp = 0.07 if attempts == 2 else 0.05
+                            settings['max_bitrate'] = int(pixels * metadata['fps'] * target_bpp)
+                            settings['buf_size'] = settings['max_bitrate'] * 2
+
+                    cmd = self.build_ffmpeg_command(current_input_path, str(output_path), metadata, settings, force_cpu=False)
+
+
+                    self.log_to_video_terminal(f"[SETT] CRF: {settings['crf']} | Preset: {settings['preset']} {'| Cap: ' + str(settings['max_bitrate']//1000) + 'k' if settings['max_bitrate'] > 0 else ''}")
+                    self.log_to_video_terminal(f"[BUSY] Compressing (Attempt {attempts})...")
+
+                    start_time = time.time()
+                    timeout = self.video_tool_timeout(metadata, settings)
+                    log = self.log_to_video_terminal
+                    process = self.run_tool(cmd, timeout, log, progress=True)
+
+                    if process.returncode != 0 and not process.killed:
+                        self.log_to_video_terminal(f"[WARN] Encoding error. Retrying with CPU...")
+                        cmd_cpu = self.build_ffmpeg_command(current_input_path, str(output_path), metadata, settings, force_cpu=True)
+                        process = self.run_tool(cmd_cpu, timeout, log, progress=True)
+                        engine = "libx264"
+
+                    if process.returncode != 0 and settings.get('streams') and not process.killed:
+                        self.log_to_video_terminal("[WARN] Track mapping rejected. Retrying with the default audio track only...")
+                        settings['streams'] = None
+                        cmd_cpu = self.build_ffmpeg_command(current_input_path, str(output_path), metadata, settings, force_cpu=True)
+                        process = self.run_tool(cmd_cpu, timeout, log, progress=True)
+
+                    process_killed = process.killed
+                    if process.killed:
+                        # Hung on this input: no point retrying at a higher CRF
+                        try: os.remove(output_path)
+                        except OSError: pass
+
+                    duration = time.time() - start_time
+
+                    if output_path.exists() and os.path.getsize(output_path) > 0:
+                        comp_size = os.path.getsize(output_path)
+                        if comp_size < original_size:
+                            success_compression = True
+                            break
+                        else:
+                            self.log_to_video_terminal(f"[WARN] Result larger than source: {self.format_bytes(comp_size)}")
+                            if attempts < max_attempts:
+                                try: os.remove(output_path)
+                                except: pass
+                    else:
+                        self.log_to_video_terminal("[FAIL] Output empty. Breaking loop.")
+                        break
+
+                if is_temp_file:
+                    try: os.remove(current_input_path)
+                    except: pass
+
+                # Made by the encode even when the original is kept below
+                if settings['previews']:
+                    self.log_previews(self.finish_previews(settings['previews'], output_folder, f"{video_path.stem}."))
+
+                result.update(engine=engine, crf=settings['crf'], preset=settings['preset'], attempts=attempts)
+                if process_killed:
+                    result['error'] = f"ffmpeg {process_killed}"
+
+                if success_compression:
+                    reduction = ((original_size - comp_size) / original_size) * 100
+                    result.update(status='compressed', final_size=comp_size)
+                    self.log_to_video_terminal(f"[DONE] Finished in {duration:.1f}s")
+                    self.log_to_video_terminal(f"[STAT] {self.format_bytes(original_size)} -> {self.format_bytes(comp_size)} (Saved {reduction:.1f}%)")
+                else:
+                    self.log_to_video_terminal("[GIVEUP] Could not reduce size after 3 shots. Reverting to original.")
+                    # If Unify is on, we must at least remux to the target extension
+                    if self.unify_extension.get() and video_path.suffix.lower() != target_ext:
+                        self.log_to_video_terminal(f"[UNIFY] Remuxing original to {target_ext}...")
+                        ffmpeg_path = self.engines.path('ffmpeg')
+                        remux_cmd = [ffmpeg_path, '-y', '-i', str(video_path), '-c', 'copy', '-map', '0', str(output_path)]
+                        self.run_tool(remux_cmd, self.remux_timeout(video_path), self.log_to_video_terminal, progress=True)
+                    else:
+                        self.transfer_file(video_path, output_path, self.video_transfers, self.move_passthrough_videos.get())
+                    
+                    comp_size = os.path.getsize(output_path) if output_path.exists() else original_size
+                    result.update(status='kept', final_size=comp_size)
+                    self.log_to_video_terminal(f"[STAT] Kept original size: {self.format_bytes(comp_size)}")
+
+        except Exception as e:
+            self.log_to_video_terminal(f"[ERR] {str(e)}")
+            result['error'] = str(e)
+
+        return result
 
     # =========================================================================
     # HELPERS
@@ -1628,6 +5374,44 @@ if __name__ == "__main__":
     import itertools
     import ctypes
 
+    parser = argparse.ArgumentParser(description="Shrinkify media optimizer")
+    parser.add_argument('--serve', action='store_true', help="run the local job server instead of the window")
+    parser.add_argument('--host', default=JOB_SERVER_HOST)
+    parser.add_argument('--port', type=int, default=JOB_SERVER_PORT)
+    parser.add_argument('--db', default=JOB_DB_FILE, help="job queue database")
+    parser.add_argument('--shard', nargs=2, metavar=('INPUT', 'OUTPUT'),
+                        help="join a distributed batch: claim files from INPUT alongside other workers")
+    parser.add_argument('--type', choices=['images', 'videos'], default='images',
+                        help="media handled by --shard / --estimate")
+    parser.add_argument('--mode', choices=JOB_MODES, default='auto', help="compression profile for --shard / --estimate")
+    parser.add_argument('--worker-id', help="name for this --shard worker (default: host-pid)")
+    parser.add_argument('--estimate', metavar='INPUT', help="dry run: estimate savings and time for a folder")
+    parser.add_argument('--samples', type=int, default=0,
+                        help="files --estimate really encodes (into a temp folder) to calibrate the rest")
+    parser.add_argument('--report', choices=HISTORY_REPORTS, help="print a report from the results history")
+    parser.add_argument('--history', default=HISTORY_DB_FILE, help="results history database")
+    parser.add_argument('--days', type=float, help="only include files from the last N days")
+    parser.add_argument('--limit', type=int, default=20, help="rows for the slowest/failures reports")
+    args = parser.parse_args()
+    if args.estimate:
+        app = EnterpriseMediaOptimizer()
+        extensions = IMAGE_EXTENSIONS if args.type == 'images' else VIDEO_EXTENSIONS
+        files = [f for f in Path(args.estimate).iterdir() if f.is_file() and f.suffix.lower() in extensions]
+        app.log_estimate(app.estimate_batch(args.type, files, args.mode, args.samples), print)
+        sys.exit(0)
+    if args.report:
+        if not os.path.exists(args.history):
+            sys.exit(f"No results history at {args.history}")
+        print_history_report(ResultsHistory(args.history), args.report, args.days, args.limit)
+        sys.exit(0)
+    if args.serve:
+        run_job_server(args.host, args.port, args.db)
+        sys.exit(0)
+    if args.shard:
+        ShardWorker(EnterpriseMediaOptimizer(), args.shard[0], args.shard[1],
+                    args.type, args.mode, args.worker_id).run()
+        sys.exit(0)
+
     # Fix for Windows Taskbar Icon:
     # Forces Windows to use the application icon instead of the Python interpreter icon.
     try:
@@ -1722,40 +5506,32 @@ if __name__ == "__main__":
             print("SHRINKIFY ENGINE STARTUP SCAN")
             print("="*50)
 
-            # 1. Getting Started
-            self.update_status("Getting started...")
-            time.sleep(0.4) 
-
-            # 2. Starting Engine (Scan)
+            # 1. Starting Engine (Scan)
             self.update_status("Starting engine...")
             print("[SCAN] Checking engine directory...")
             
             # PyInstaller compatible path scan
-            if getattr(sys, 'frozen', False):
-                base_path = Path(sys.executable).parent
-            else:
-                base_path = Path(__file__).parent
-                
-            engine_dir = base_path / "engine"
+            engine_dir = get_engine_dir()
             if engine_dir.exists():
                  print(f"[OK] Engine Check: Folder found at {engine_dir}")
             else:
-                 print("[ERR] Engine Check: Folder NOT found!")
+                 print("[WARN] Engine Check: Folder NOT found! Falling back to PATH.")
 
-            tools = ['ffmpeg.exe', 'ffprobe.exe', 'cjpeg.exe', 'oxipng.exe', 'pngquant.exe']
-            for tool in tools:
-                tool_path = engine_dir / tool
-                if tool_path.exists():
-                    print(f"[OK] Tool Found: {tool}")
+            try:
+                with open(CONFIG_FILE, 'r') as f:
+                    engine_paths = json.load(f).get("engine_paths")
+            except Exception:
+                engine_paths = None
+            engines = EngineRegistry(engine_dir, engine_paths)
+            for tool in ENGINE_TOOLS:
+                if engines.available(tool):
+                    print(f"[OK] Tool Found: {tool} -> {engines.path(tool)}")
                 else:
                     print(f"[MISSING] Tool: {tool}")
-            
-            time.sleep(0.5)
 
-            # 3. Opening GUI
+            # 2. Opening GUI (slow probes run in the background once it is up)
             self.update_status("Opening Gui...")
             print("[INIT] Loading Interface...")
-            time.sleep(0.3) 
 
             # Finish
             self.is_running = False
@@ -17,7 +17,7 @@ taskkill /F /IM "Shrinkify.exe" /T >nul 2>&1
 
 REM 3. Install PyInstaller
 echo [INIT] Ensuring PyInstaller is installed...
-pip install pyinstaller pillow
+pip install pyinstaller pillow numpy
 
 REM 3. Run PyInstaller
 echo [BUILD] Starting PyInstaller build...
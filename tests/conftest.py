@@ -0,0 +1,27 @@
+"""Shared fixtures.
+
+The app is a single script, so it is loaded from its file. Every test that builds
+the app runs from its own temporary folder, because the app reads and writes its
+config, engine cache and results history in the working directory.
+"""
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+SCRIPT = Path(__file__).resolve().parent.parent / "Production-Ready-ts-darkMode.py"
+
+
+@pytest.fixture(scope="session")
+def shrinkify():
+    spec = importlib.util.spec_from_file_location("shrinkify", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def app(shrinkify, tmp_path, monkeypatch):
+    """Headless app (no window), working in a temporary folder."""
+    monkeypatch.chdir(tmp_path)
+    return shrinkify.EnterpriseMediaOptimizer(None)
@@ -0,0 +1,47 @@
+"""Batch duplicate detection: byte-identical copies and re-saved near-duplicates."""
+import shutil
+
+import numpy as np
+from PIL import Image
+
+
+def photo(seed, size=(96, 64)):
+    rng = np.random.default_rng(seed)
+    # Smooth content, so a re-save keeps the same dHash
+    small = rng.integers(0, 256, (size[1] // 16, size[0] // 16, 3), dtype=np.uint8)
+    return Image.fromarray(small).resize(size, Image.BICUBIC)
+
+
+def test_byte_identical_copies(app, tmp_path):
+    original = tmp_path / "a.png"
+    photo(1).save(original)
+    copy = tmp_path / "b.png"
+    shutil.copy(original, copy)
+    other = tmp_path / "c.png"
+    photo(2).save(other)
+
+    unique, duplicates = app.find_duplicates([original, copy, other])
+    assert unique == [original, other]
+    assert duplicates == {copy: original}
+
+
+def test_resaved_copy_needs_perceptual(app, tmp_path):
+    best, resaved = tmp_path / "best.jpg", tmp_path / "resaved.jpg"
+    photo(3).save(best, quality=95)
+    photo(3).save(resaved, quality=60)
+
+    assert app.find_duplicates([resaved, best])[1] == {}
+    unique, duplicates = app.find_duplicates([resaved, best], perceptual=True)
+    assert unique == [best]  # The largest copy represents the group
+    assert duplicates == {resaved: best}
+
+
+def test_different_images_or_sizes_stay_apart(app, tmp_path):
+    first, second, scaled = tmp_path / "1.png", tmp_path / "2.png", tmp_path / "3.png"
+    photo(4).save(first)
+    photo(5).save(second)
+    photo(4).resize((48, 32)).save(scaled)
+
+    unique, duplicates = app.find_duplicates([first, second, scaled], perceptual=True)
+    assert duplicates == {}
+    assert unique == [first, second, scaled]
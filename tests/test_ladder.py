@@ -0,0 +1,62 @@
+"""Adaptive-streaming ladder planning and the single-decode ffmpeg command."""
+import pytest
+
+SETTINGS = {'target_fps': 30, 'max_bitrate': 5000000, 'use_fps_filter': False,
+            'preset': 'medium', 'crf': 23, 'audio_bitrate': 128}
+
+
+def sizes(rungs):
+    return [(rung['width'], rung['height']) for rung in rungs]
+
+
+def test_full_hd_gets_the_standard_ladder(app):
+    rungs = app.plan_ladder({'width': 1920, 'height': 1080}, SETTINGS)
+    assert sizes(rungs) == [(1920, 1080), (1280, 720), (854, 480), (640, 360)]
+    assert [rung['label'] for rung in rungs] == ['1080p', '720p', '480p', '360p']
+    bitrates = [rung['bitrate'] for rung in rungs]
+    assert bitrates == sorted(bitrates, reverse=True)
+
+
+@pytest.mark.parametrize("width, height", [(1279, 719), (719, 1279), (3841, 2161), (853, 479), (101, 57)])
+def test_every_rung_has_even_dimensions(app, width, height):
+    for rung_w, rung_h in sizes(app.plan_ladder({'width': width, 'height': height}, SETTINGS)):
+        assert rung_w % 2 == 0 and rung_h % 2 == 0
+
+
+def test_portrait_keeps_orientation_and_caps_top_rung(app):
+    rungs = app.plan_ladder({'width': 2160, 'height': 3840}, SETTINGS)
+    assert sizes(rungs)[0] == (1080, 1920)
+    assert all(rung_w < rung_h for rung_w, rung_h in sizes(rungs))
+
+
+def test_small_source_is_never_upscaled(app, shrinkify):
+    rungs = app.plan_ladder({'width': 640, 'height': 360}, SETTINGS)
+    assert sizes(rungs) == [(640, 360)]
+    assert rungs[0]['bitrate'] <= 640 * 360 * 30 * shrinkify.LADDER_MAX_BPP
+
+
+def test_near_sizes_are_not_duplicated(app, shrinkify):
+    rungs = app.plan_ladder({'width': 1366, 'height': 768}, SETTINGS)
+    assert sizes(rungs)[:2] == [(1366, 768), (854, 480)]  # 720p is within LADDER_MIN_STEP of 768p
+    assert len(rungs) <= shrinkify.LADDER_MAX_RUNGS
+
+
+@pytest.mark.parametrize("package_format", ['hls', 'dash'])
+def test_command_decodes_once_and_maps_every_rung(app, tmp_path, package_format):
+    metadata = {'width': 1920, 'height': 1080, 'has_audio': True}
+    settings = dict(SETTINGS, ladder=app.plan_ladder(metadata, SETTINGS), ladder_format=package_format)
+    manifest = tmp_path / ('master.m3u8' if package_format == 'hls' else 'manifest.mpd')
+    cmd = app.build_ladder_command('in.mp4', str(manifest), metadata, settings)
+
+    assert cmd.count('-i') == 1
+    graph = cmd[cmd.index('-filter_complex') + 1]
+    assert graph.startswith('[0:v:0]split=4[s0][s1][s2][s3]')
+    assert [cmd[i + 1] for i, arg in enumerate(cmd) if arg == '-map'][:4] == ['[v0]', '[v1]', '[v2]', '[v3]']
+    assert cmd[cmd.index('-sc_threshold') + 1] == '0'
+    assert cmd[cmd.index('-g') + 1] == cmd[cmd.index('-keyint_min') + 1] == '120'
+    if package_format == 'hls':
+        assert cmd.count('0:a:0') == 4
+        assert cmd[cmd.index('-var_stream_map') + 1] == 'v:0,a:0 v:1,a:1 v:2,a:2 v:3,a:3'
+    else:
+        assert cmd.count('0:a:0') == 1
+        assert cmd[-1] == str(manifest)
@@ -0,0 +1,119 @@
+"""Metadata policy splicing for JPEG (APPn segments) and PNG (chunks), and the skip gate."""
+import io
+import struct
+
+import numpy as np
+import pytest
+from PIL import Image, ImageCms, PngImagePlugin
+
+SRGB = ImageCms.ImageCmsProfile(ImageCms.createProfile('sRGB')).tobytes()
+XMP = b'<x:xmpmeta xmlns:x="adobe:ns:meta/"/>'
+
+
+def picture():
+    rng = np.random.default_rng(3)
+    return Image.fromarray(rng.integers(0, 256, (40, 60, 3), dtype=np.uint8))
+
+
+def exif_block():
+    exif = Image.Exif()
+    exif[0x010F] = "Camera"  # Make
+    return exif.tobytes()
+
+
+def jpeg_segments(data):
+    """APPn/COM markers up to the first scan, plus the bytes from the scan on."""
+    markers, pos = [], 2
+    while data[pos + 1] != 0xDA:
+        length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+        markers.append((data[pos + 1], data[pos + 4:pos + 4 + 12]))
+        pos += 2 + length
+    return markers, data[pos:]
+
+
+def png_chunks(data):
+    chunks, pos = [], 8
+    while pos < len(data):
+        length, kind = struct.unpack('>I4s', data[pos:pos + 8])
+        chunks.append(kind)
+        pos += 12 + length
+    return chunks
+
+
+def source_meta(app, path):
+    with Image.open(path) as img:
+        return app.read_image_metadata(img)
+
+
+@pytest.fixture
+def jpeg_pair(tmp_path):
+    source, output = tmp_path / "src.jpg", tmp_path / "out.jpg"
+    picture().save(source, quality=90, exif=exif_block(), icc_profile=SRGB, xmp=XMP, comment=b"note")
+    picture().save(output, quality=70)
+    return source, output
+
+
+@pytest.mark.parametrize("policy, exif, xmp, icc", [('strip', False, False, False),
+                                                   ('safe', False, False, True),
+                                                   ('all', True, True, True)])
+def test_jpeg_policy(app, jpeg_pair, policy, exif, xmp, icc):
+    source, output = jpeg_pair
+    scan_before = jpeg_segments(output.read_bytes())[1]
+    app.metadata_policy.set(policy)
+    app.apply_metadata_policy(str(output), source_meta(app, source))
+
+    data = output.read_bytes()
+    markers, scan = jpeg_segments(data)
+    assert scan == scan_before  # Entropy-coded data is untouched
+    assert markers[0] == (0xE0, b'JFIF\x00' + markers[0][1][5:])
+    assert 0xFE not in [m for m, _ in markers]  # Comments always go
+    with Image.open(io.BytesIO(data)) as out:
+        assert (out.getexif().get(0x010F) == "Camera") == exif
+        assert bool(out.info.get('xmp')) == xmp
+        assert (out.info.get('icc_profile') == SRGB) == icc
+
+
+def test_jpeg_large_icc_is_split_and_reassembled(app, tmp_path):
+    profile = bytes(range(256)) * 400  # Needs two APP2 segments
+    source, output = tmp_path / "src.jpg", tmp_path / "out.jpg"
+    picture().save(source, icc_profile=profile)
+    picture().save(output)
+    app.metadata_policy.set('safe')
+    app.apply_metadata_policy(str(output), source_meta(app, source))
+
+    assert [m for m, _ in jpeg_segments(output.read_bytes())[0]].count(0xE2) == 2
+    with Image.open(output) as out:
+        assert out.info['icc_profile'] == profile
+
+
+@pytest.mark.parametrize("policy, chunks", [('strip', set()),
+                                            ('safe', {b'iCCP'}),
+                                            ('all', {b'iCCP', b'eXIf', b'iTXt', b'tEXt'})])
+def test_png_policy(app, shrinkify, tmp_path, policy, chunks):
+    source, output = tmp_path / "src.png", tmp_path / "out.png"
+    text = PngImagePlugin.PngInfo()
+    text.add_text("Author", "someone")
+    picture().save(source, pnginfo=text, exif=exif_block(), icc_profile=SRGB)
+    picture().save(output)
+    app.metadata_policy.set(policy)
+    meta = source_meta(app, source)
+    meta['xmp'] = XMP
+    app.apply_metadata_policy(str(output), meta)
+
+    found = png_chunks(output.read_bytes())
+    assert found[0] == b'IHDR' and found[-1] == b'IEND'
+    assert set(found) & shrinkify.PNG_METADATA_CHUNKS == chunks
+    with Image.open(output) as out:
+        assert np.array_equal(np.array(out), np.array(picture()))
+        assert (out.info.get('Author') == "someone") == (policy == 'all')
+
+
+def test_skip_prediction_respects_policy(app, tmp_path):
+    small = tmp_path / "small.png"
+    Image.new('RGB', (8, 8)).save(small, exif=exif_block())
+    metadata = app.analyze_image(str(small))
+
+    app.metadata_policy.set('strip')
+    assert app.predict_no_gain(str(small), metadata, 'auto') is None
+    app.metadata_policy.set('all')
+    assert app.predict_no_gain(str(small), metadata, 'auto')
@@ -0,0 +1,84 @@
+"""Audio/subtitle track planning: copy vs re-encode, downmix, Opus and subtitle conversion."""
+import pytest
+
+SETTINGS = {'audio_bitrate': 128}
+
+
+def track(codec='aac', channels=2, bitrate=128000, language='eng'):
+    return {'codec': codec, 'channels': channels, 'bitrate': bitrate, 'language': language}
+
+
+def sub(codec, language='eng'):
+    return {'codec': codec, 'language': language}
+
+
+@pytest.fixture
+def plan(app):
+    app.keep_all_streams.set(True)
+    app.downmix_audio.set(False)
+    app.prefer_opus_audio.set(False)
+
+    def run(audio=(), subtitles=(), container='.mp4'):
+        metadata = {'audio_streams': list(audio), 'subtitle_streams': list(subtitles)}
+        return app.plan_streams(metadata, SETTINGS, container)
+    return run
+
+
+def test_efficient_track_is_copied(plan):
+    result = plan([track(bitrate=140000)])
+    assert result['args'] == ['-map', '0:V:0', '-map', '0:a:0', '-c:a:0', 'copy']
+    assert result['audio_bps'] == 140000
+
+
+def test_oversized_track_is_reencoded_to_budget(plan):
+    result = plan([track(codec='pcm_s16le', bitrate=1536000)])
+    assert result['args'][-4:] == ['-c:a:0', 'aac', '-b:a:0', '128k']
+    assert result['audio_bps'] == 128000
+
+
+def test_surround_budget_scales_and_downmix_forces_stereo(app, plan):
+    surround = track(codec='ac3', channels=6, bitrate=640000)
+    assert plan([surround])['args'][-2:] == ['-b:a:0', '384k']  # 128k per stereo pair
+
+    app.downmix_audio.set(True)
+    args = plan([surround])['args']
+    assert args[-6:] == ['-c:a:0', 'aac', '-b:a:0', '128k', '-ac:a:0', '2']
+
+
+def test_webm_uses_opus_at_reduced_bitrate(plan):
+    args = plan([track(codec='pcm_s16le', bitrate=1536000)], container='.webm')['args']
+    assert args[-4:] == ['-c:a:0', 'libopus', '-b:a:0', '96k']
+
+
+def test_mkv_opus_needs_the_encoder(app, plan, monkeypatch):
+    pcm = track(codec='flac', bitrate=900000)
+    app.prefer_opus_audio.set(True)
+    monkeypatch.setattr(app.engines, 'has_feature', lambda name, feature: False)
+    assert 'aac' in plan([pcm], container='.mkv')['args']
+    monkeypatch.setattr(app.engines, 'has_feature', lambda name, feature: True)
+    assert 'libopus' in plan([pcm], container='.mkv')['args']
+
+
+def test_only_first_audio_track_without_keep_all(app, plan):
+    app.keep_all_streams.set(False)
+    result = plan([track(language='eng'), track(language='fra')], [sub('subrip')])
+    assert result['args'].count('-map') == 2
+    assert '0:a:1' not in result['args'] and '0:s:0' not in result['args']
+
+
+def test_no_audio_disables_audio(plan):
+    assert plan()['args'] == ['-map', '0:V:0', '-an']
+
+
+def test_subtitles_per_container(plan):
+    subtitles = [sub('subrip'), sub('hdmv_pgs_subtitle')]
+    mp4 = plan(subtitles=subtitles)
+    assert mp4['args'][-4:] == ['-map', '0:s:0', '-c:s:0', 'mov_text']
+    assert any('hdmv_pgs_subtitle' in note and 'Dropped' in note for note in mp4['notes'])
+
+    mkv = plan(subtitles=subtitles + [sub('mov_text')], container='.mkv')['args']
+    assert mkv[-12:] == ['-map', '0:s:0', '-c:s:0', 'copy', '-map', '0:s:1', '-c:s:1', 'copy',
+                         '-map', '0:s:2', '-c:s:2', 'srt']
+
+    avi = plan(subtitles=subtitles, container='.avi')['args']
+    assert '0:s:0' not in avi
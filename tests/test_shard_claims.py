@@ -0,0 +1,46 @@
+"""Lease-based claiming of shared batch files between shard workers."""
+import os
+import time
+
+import pytest
+
+
+@pytest.fixture
+def workers(app, shrinkify, tmp_path):
+    inputs, outputs = tmp_path / "in", tmp_path / "out"
+    inputs.mkdir()
+    made = [shrinkify.ShardWorker(app, inputs, outputs, 'images', 'auto', worker_id=name)
+            for name in ("node-a", "node-b")]
+    made[0].state_dir.mkdir(parents=True)
+    photo = inputs / "photo.jpg"
+    photo.write_bytes(b'jpeg')
+    return made, photo
+
+
+def test_only_one_worker_wins_a_file(workers):
+    (first, second), photo = workers
+    assert first.claim(photo)
+    assert not second.claim(photo)
+    assert first.held == {photo} and second.held == set()
+
+
+def test_expired_lease_is_taken_over(workers, shrinkify):
+    (first, second), photo = workers
+    assert first.claim(photo)
+    stale = time.time() - shrinkify.SHARD_LEASE_TIMEOUT - 5
+    os.utime(first._marker(photo, '.lease'), (stale, stale))
+
+    assert second.claim(photo)
+    assert not first.claim(photo)  # The new lease is fresh
+    assert not list(first.state_dir.glob('*.expired-*'))
+
+
+def test_finished_file_is_never_claimed_again(workers):
+    (first, second), photo = workers
+    assert first.claim(photo)
+    first.finish(photo, {'file': photo.name, 'worker': first.worker_id, 'status': 'compressed'})
+
+    assert not first._marker(photo, '.lease').exists()
+    assert not second.claim(photo)
+    assert first.counts == {'compressed': 1}
+    assert first.results_path.read_text().count('"compressed"') == 1
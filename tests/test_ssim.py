@@ -0,0 +1,38 @@
+"""SSIM on luma planes: identity, ordering by distortion, and measuring encoded files."""
+import numpy as np
+from PIL import Image
+
+
+def gradient_image(size=(128, 96)):
+    x = np.linspace(0, 255, size[0])
+    y = np.linspace(0, 255, size[1])[:, None]
+    rgb = np.stack([np.broadcast_to(x, (size[1], size[0])), np.broadcast_to(y, (size[1], size[0])),
+                    (x + y) / 2], axis=-1)
+    return Image.fromarray(rgb.astype(np.uint8))
+
+
+def test_identical_planes_score_one(app):
+    luma = app.luma_plane(gradient_image())
+    assert app.compute_ssim(luma, luma) == 1.0
+
+
+def test_more_noise_scores_lower(app):
+    luma = app.luma_plane(gradient_image())
+    rng = np.random.default_rng(7)
+    noise = rng.normal(0, 1, luma.shape)
+    light = app.compute_ssim(luma, np.clip(luma + 4 * noise, 0, 255))
+    heavy = app.compute_ssim(luma, np.clip(luma + 40 * noise, 0, 255))
+    assert 1.0 > light > heavy > 0.0
+
+
+def test_luma_plane_downsamples_long_side(app, shrinkify):
+    plane = app.luma_plane(Image.new('RGB', (2000, 1000)))
+    assert plane.shape == (shrinkify.SSIM_MAX_SIDE // 2, shrinkify.SSIM_MAX_SIDE)
+
+
+def test_measure_ssim_of_encoded_file(app, tmp_path):
+    img = gradient_image()
+    path = tmp_path / "out.jpg"
+    img.save(path, quality=30)
+    score = app.measure_ssim(app.luma_plane(img), str(path))
+    assert 0.8 < score < 1.0
@@ -0,0 +1,70 @@
+"""Strip-by-strip TIFF repacking: pixels, byte order and metadata policy."""
+import struct
+
+import numpy as np
+import pytest
+from PIL import Image, ImageCms
+
+SRGB = ImageCms.ImageCmsProfile(ImageCms.createProfile('sRGB')).tobytes()
+
+
+def repack(app, tmp_path, img, policy='safe', **save_args):
+    source, output = tmp_path / "in.tif", tmp_path / "out.tif"
+    img.save(source, **save_args)
+    app.metadata_policy.set(policy)
+    assert app.compress_tiff_strips(str(source), str(output))
+    return source, output
+
+
+def test_big_endian_16bit_round_trip(app, tmp_path):
+    values = (np.arange(64 * 64, dtype=np.uint16) * 13).reshape(64, 64)
+    img = Image.frombytes('I;16B', (64, 64), values.astype('>u2').tobytes())
+    source, output = repack(app, tmp_path, img)
+
+    assert source.read_bytes()[:4] == b'MM\x00*'
+    assert output.read_bytes()[:4] == b'MM\x00*'
+    with Image.open(output) as out:
+        assert out.info['compression'] == 'tiff_adobe_deflate'
+        assert np.array_equal(np.array(out), np.array(img))
+
+
+def test_little_endian_rgb_round_trip(app, tmp_path):
+    rng = np.random.default_rng(1)
+    img = Image.fromarray(rng.integers(0, 256, (50, 70, 3), dtype=np.uint8))
+    _, output = repack(app, tmp_path, img, dpi=(300, 300))
+
+    assert output.read_bytes()[:4] == b'II*\x00'
+    with Image.open(output) as out:
+        assert np.array_equal(np.array(out), np.array(img))
+        assert out.info['dpi'] == pytest.approx((300, 300))
+
+
+@pytest.mark.parametrize("policy, icc, descriptive", [('strip', False, False),
+                                                      ('safe', True, False),
+                                                      ('all', True, True)])
+def test_metadata_follows_policy(app, tmp_path, policy, icc, descriptive):
+    img = Image.new('RGB', (32, 24), (200, 100, 50))
+    tags = {305: 'Scanner 1.0', 700: b'<x:xmpmeta/>', 34665: {0x9003: '2020:01:01 00:00:00'}}
+    _, output = repack(app, tmp_path, img, policy, icc_profile=SRGB, tiffinfo=tags)
+
+    with Image.open(output) as out:
+        assert bool(out.info.get('icc_profile')) == icc
+        assert (out.tag_v2.get(305) == 'Scanner 1.0') == descriptive
+        assert (700 in out.tag_v2) == descriptive
+        assert bool(out.getexif().get_ifd(0x8769)) == descriptive
+        assert out.getpixel((5, 5)) == (200, 100, 50)
+
+
+def test_exif_sub_ifd_rewritten_for_big_endian(app, tmp_path):
+    img = Image.frombytes('I;16B', (16, 8), bytes(range(256)))
+    _, output = repack(app, tmp_path, img, 'all', tiffinfo={34665: {0x9003: '2021:02:03 04:05:06'}})
+
+    with Image.open(output) as out:
+        assert out.getexif().get_ifd(0x8769)[0x9003] == '2021:02:03 04:05:06'
+
+
+def test_unrecognised_header_is_left_to_pillow(app, tmp_path):
+    source, output = tmp_path / "big.tif", tmp_path / "out.tif"
+    source.write_bytes(b'II+\x00' + struct.pack('<HHQ', 8, 0, 16) + bytes(16))  # BigTIFF
+    assert not app.compress_tiff_strips(str(source), str(output))
+    assert not output.exists()
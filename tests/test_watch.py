@@ -0,0 +1,60 @@
+"""Watch-folder state: settling, persistence across restarts, and stopping mid-batch."""
+import os
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def folder(tmp_path):
+    path = tmp_path / "in"
+    path.mkdir()
+    return path
+
+
+def make_watcher(shrinkify, folder, tmp_path):
+    return shrinkify.FolderWatcher(folder, {'.jpg'}, tmp_path / "state.json", settle_seconds=0)
+
+
+def test_files_are_ready_once_settled(shrinkify, folder, tmp_path):
+    (folder / "a.jpg").write_bytes(b'a')
+    (folder / "notes.txt").write_bytes(b'x')
+    watcher = make_watcher(shrinkify, folder, tmp_path)
+
+    assert watcher.poll() == []  # First sighting only starts the settle timer
+    assert watcher.poll() == [folder / "a.jpg"]
+
+
+def test_done_files_survive_a_restart_until_changed(shrinkify, folder, tmp_path):
+    photo = folder / "a.jpg"
+    photo.write_bytes(b'a')
+    watcher = make_watcher(shrinkify, folder, tmp_path)
+    watcher.poll()
+    watcher.mark_done(watcher.poll())
+
+    restarted = make_watcher(shrinkify, folder, tmp_path)
+    restarted.poll()
+    assert restarted.poll() == []
+
+    photo.write_bytes(b'changed')
+    os.utime(photo, ns=(0, 10 ** 18))
+    restarted.poll()
+    assert restarted.poll() == [photo]
+
+
+def test_stopping_mid_batch_records_only_finished_files(app, shrinkify, folder, tmp_path, monkeypatch):
+    monkeypatch.setattr(shrinkify, 'WATCH_POLL_SECONDS', 0.01)
+    for name in ("a.jpg", "b.jpg", "c.jpg"):
+        (folder / name).write_bytes(name.encode())
+    watcher = make_watcher(shrinkify, folder, tmp_path)
+    stop = threading.Event()
+
+    def process_batch(files):
+        stop.set()  # Stop pressed after the first file
+        return sorted(files)[:1]
+
+    app._watch_loop(watcher, stop, process_batch, lambda line: None)
+
+    restarted = make_watcher(shrinkify, folder, tmp_path)
+    restarted.poll()
+    assert sorted(p.name for p in restarted.poll()) == ["b.jpg", "c.jpg"]